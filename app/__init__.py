@@ -1,8 +1,9 @@
 from flask import Flask
 from config import Config
-from .database import init_app, engine
+from .database import init_app
 from .middleware import init_middleware
 from .security import limiter
+from .cli import init_cli
 
 def create_app(test_config=None):
     app = Flask(__name__)
@@ -17,14 +18,10 @@ def create_app(test_config=None):
     init_app(app)
     limiter.init_app(app)
     init_middleware(app)
+    init_cli(app)
     
     # Register blueprints
     from .routes import bp
     app.register_blueprint(bp)
     
-    # Create tables
-    with app.app_context():
-        from .models import Base
-        Base.metadata.create_all(bind=engine)
-    
     return app
\ No newline at end of file
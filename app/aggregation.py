@@ -0,0 +1,132 @@
+"""
+Unit-normalizing ingredient aggregation.
+
+Ingredient amounts are converted to a base unit per dimension (grams for
+mass, millilitres for volume, whole items for counts) using a precomputed
+conversion table, and ingredient names are canonicalized, so "500 g
+chicken breast" and "1 kg Chicken Breast" add up to one line. Summing is
+done by the compiled recipe vectors in app.compiled; totals are reported
+in a preferred display unit.
+"""
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+import numpy as np
+import re
+
+# unit alias -> (dimension, factor to the dimension's base unit)
+UNIT_CONVERSIONS: Dict[str, Tuple[str, float]] = {}
+
+def _register(dimension: str, factor: float, *aliases: str) -> None:
+    for alias in aliases:
+        UNIT_CONVERSIONS[alias] = (dimension, factor)
+
+_register('mass', 1.0, 'g', 'gr', 'gram', 'grams', 'gramme', 'grammes')
+_register('mass', 1000.0, 'kg', 'kgs', 'kilo', 'kilos', 'kilogram', 'kilograms')
+_register('mass', 0.001, 'mg', 'milligram', 'milligrams')
+_register('mass', 28.349523125, 'oz', 'ounce', 'ounces')
+_register('mass', 453.59237, 'lb', 'lbs', 'pound', 'pounds')
+_register('volume', 1.0, 'ml', 'millilitre', 'millilitres', 'milliliter', 'milliliters')
+_register('volume', 10.0, 'cl', 'centilitre', 'centilitres', 'centiliter', 'centiliters')
+_register('volume', 100.0, 'dl', 'decilitre', 'decilitres', 'deciliter', 'deciliters')
+_register('volume', 1000.0, 'l', 'litre', 'litres', 'liter', 'liters')
+_register('volume', 5.0, 'tsp', 'teaspoon', 'teaspoons')
+_register('volume', 15.0, 'tbsp', 'tablespoon', 'tablespoons')
+_register('volume', 240.0, 'cup', 'cups')
+_register('volume', 29.5735295625, 'fl oz', 'floz', 'fluid ounce', 'fluid ounces')
+_register('count', 1.0, 'whole', 'piece', 'pieces', 'pc', 'pcs', 'each', 'ea', 'item', 'items', 'x', '')
+
+# dimension -> (threshold in base units, display unit, factor), largest first
+DISPLAY_UNITS: Dict[str, List[Tuple[float, str, float]]] = {
+    'mass': [(1000.0, 'kg', 1000.0), (0.0, 'g', 1.0)],
+    'volume': [(1000.0, 'l', 1000.0), (0.0, 'ml', 1.0)],
+    'count': [(0.0, 'whole', 1.0)]
+}
+
+_WHITESPACE = re.compile(r'\s+')
+
+def canonical_name(name: str) -> str:
+    """Canonicalize an ingredient name for grouping (case and spacing)."""
+    return _WHITESPACE.sub(' ', name.strip()).lower()
+
+def canonical_unit(unit: str) -> Tuple[str, float]:
+    """
+    Resolve a unit to its dimension and conversion factor.
+
+    Units missing from the conversion table form their own dimension (e.g.
+    "can" or "clove") so they are only ever summed with themselves.
+    """
+    key = _WHITESPACE.sub(' ', unit.strip()).lower().rstrip('.')
+    if key in UNIT_CONVERSIONS:
+        return UNIT_CONVERSIONS[key]
+    return f'unit:{key}', 1.0
+
+def display_amount(dimension: str, amount: float, unit: str) -> Tuple[float, str]:
+    """Express a base-unit amount in the preferred display unit for its dimension."""
+    for threshold, display_unit, factor in DISPLAY_UNITS.get(dimension, []):
+        if amount >= threshold:
+            return amount / factor, display_unit
+    return amount, unit
+
+class IngredientIndex:
+    """
+    Assigns dense integer ids to canonical (name, dimension) groups.
+
+    Raw (name, unit) pairs are resolved once and memoized, so repeated
+    ingredients cost a dict lookup.
+
+    Nothing is ever removed: compiled vectors hold group ids, so ids must
+    stay stable for as long as any vector may refer to them. Only
+    ingredient rows read from the database are resolved, never request
+    input, so the index grows with the distinct ingredient spellings the
+    worker has compiled (a few hundred bytes each), on the order of the
+    catalog's own ingredient table, and is reset when the worker restarts.
+    """
+
+    def __init__(self) -> None:
+        self.groups: List[Tuple[str, str]] = []
+        self.display_names: List[str] = []
+        self.display_units: List[str] = []
+        self._ids: Dict[Tuple[str, str], int] = {}
+        self._resolved: Dict[Tuple[str, str], Tuple[int, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def resolve(self, name: str, unit: str) -> Tuple[int, float]:
+        """Return the group id and base-unit factor for a raw ingredient."""
+        resolved = self._resolved.get((name, unit))
+        if resolved is not None:
+            return resolved
+        dimension, factor = canonical_unit(unit)
+        group = (canonical_name(name), dimension)
+        group_id = self._ids.get(group)
+        if group_id is None:
+            group_id = self._ids[group] = len(self.groups)
+            self.groups.append(group)
+            self.display_names.append(name.strip())
+            self.display_units.append(unit.strip())
+        self._resolved[(name, unit)] = (group_id, factor)
+        return group_id, factor
+
+def format_totals(index: IngredientIndex, totals: Union[np.ndarray, Mapping[int, float]],
+                  group_ids: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Build shopping list lines in display units.
+
+    Args:
+        index: Index the totals were computed against
+        totals: Base-unit totals indexed by group id (an array, or a mapping
+            when only some groups have totals)
+        group_ids: Groups to report, in output order (all groups by default)
+    """
+    if group_ids is None:
+        group_ids = range(len(totals))
+    lines = []
+    for group_id in group_ids:
+        _, dimension = index.groups[group_id]
+        amount, unit = display_amount(dimension, float(totals[group_id]), index.display_units[group_id])
+        lines.append({
+            'name': index.display_names[group_id],
+            'amount': round(amount, 2),
+            'unit': unit
+        })
+    return lines
@@ -0,0 +1,378 @@
+"""
+ASGI read path for the high-concurrency endpoints.
+
+``create_asgi_app`` serves ``GET /recipes``, ``GET /categories``,
+``POST /calculate-ingredients`` and ``GET /metrics`` from one event loop per
+worker, with async SQLAlchemy (aiosqlite or asyncpg) and ``redis.asyncio``.
+A worker keeps thousands of slow connections open without a thread each,
+where the WSGI deployment is bounded by its worker threads.
+
+Everything but the I/O is shared with the Flask app: the page query,
+category filter, serialization, compiled recipe vectors and shopping list
+result cache, the CSRF token and the response cache format. Both apps read
+and write the same Redis entries, and writes made through the WSGI app bump
+the generation that invalidates them. Writes and every other route stay on
+the WSGI app; route the three paths above to the ASGI workers at the proxy.
+
+Rate limits match the WSGI routes but always use the in-process token
+buckets from ``app.ratelimit`` (reconciled with Redis in RATELIMIT_MODE
+redis or local), since a Redis round-trip per request would stall the loop.
+The Redis stampede lock of ``app.cache.cache`` is not used: concurrent
+misses wait on an in-process lock, so each worker computes a key once.
+
+Run with ``uvicorn asgi:app --workers 4`` (see asgi.py at the repository
+root).
+"""
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, cast
+from urllib.parse import parse_qsl, urlencode
+from limits import RateLimitItem, parse
+from limits.storage import Storage, storage_from_string
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from config import Config
+from . import metrics
+from .cache import (
+    GENERATION_KEY, build_entry, cache_key, current_entry, local_cache, record_lookup, redis_breaker
+)
+from .database import create_async_db_engine, get_category_names
+from .ratelimit import TOKEN_BUCKET, TokenBucketRateLimiter
+from .routes import parse_fields, plan_shopping_list, recipe_page_query
+from .security import csrf_token
+from .serialization import dumps, recipes_json
+from .validation import parse_selections
+import asyncio
+import hmac
+import itertools
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class Request:
+    """The parts of an ASGI HTTP request the read routes use."""
+
+    __slots__ = ('method', 'path', 'args', 'headers', 'remote_addr', 'body')
+
+    def __init__(self, scope: Dict[str, Any], body: bytes = b''):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True)
+        self.headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        self.remote_addr = (scope.get('client') or ('127.0.0.1', 0))[0]
+        self.body = body
+
+    def arg(self, name: str, default: Any = None, type: Optional[Callable[[str], Any]] = None) -> Any:
+        """First value of a query argument; like werkzeug, unparseable values give the default."""
+        for key, value in self.args:
+            if key == name:
+                try:
+                    return type(value) if type else value
+                except ValueError:
+                    return default
+        return default
+
+    def arg_list(self, name: str) -> List[str]:
+        return [value for key, value in self.args if key == name]
+
+class Response:
+    __slots__ = ('body', 'status', 'mimetype', 'headers')
+
+    def __init__(self, body: str = '', status: int = 200, mimetype: str = 'application/json',
+                 headers: Iterable[Tuple[str, str]] = ()):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.headers = list(headers)
+
+def json_response(value: Any, status: int = 200) -> Response:
+    return Response(dumps(value), status)
+
+def error_response(message: str, status: int, **extra: Any) -> Response:
+    return json_response({'status': 'error', 'message': message, **extra}, status)
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+class AsyncResponseCache:
+    """
+    Async counterpart of ``app.cache.cache`` for GET responses.
+
+    Keys, entry format, generations, the local tier and the circuit breaker
+    are the ones the WSGI app uses, so a response cached by either app is
+    served by both.
+    """
+
+    def __init__(self, redis_client: Callable[[], Any], timeout: int):
+        self.redis_client = redis_client
+        self.timeout = timeout
+        # Striped so concurrent misses for a key inside one worker recompute once
+        self._locks = [asyncio.Lock() for _ in range(64)]
+
+    async def _redis_call(self, command: str, *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a Redis command through the shared circuit breaker.
+
+        Raises:
+            ConnectionError: If the breaker is open or the call failed
+        """
+        if not redis_breaker.allow():
+            record_lookup('redis', 'skipped')
+            raise ConnectionError('Redis circuit open')
+        try:
+            result = await getattr(self.redis_client(), command)(*args, **kwargs)
+        except Exception as e:
+            record_lookup('redis', 'errors')
+            redis_breaker.record_failure()
+            raise ConnectionError(str(e)) from e
+        redis_breaker.record_success()
+        return result
+
+    async def _lookup(self, key: str) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[str]]:
+        """Look key up in the local tier, then Redis (see ``app.cache._lookup``)."""
+        entry = local_cache.get(key)
+        if entry is not None:
+            record_lookup('local', 'hits')
+            return entry['generation'], entry, 'local'
+        record_lookup('local', 'misses')
+
+        try:
+            generation, entry = current_entry(*await self._redis_call('mget', GENERATION_KEY, key))
+        except ConnectionError:
+            return None, None, None
+        if entry is None:
+            record_lookup('redis', 'misses')
+            return generation, None, None
+        record_lookup('redis', 'hits')
+        local_cache.set(key, entry)
+        return generation, entry, 'redis'
+
+    async def respond(self, name: str, request: Request, handler: Handler) -> Response:
+        key = cache_key(name, request.path, request.args)
+        generation, entry, tier = await self._lookup(key)
+        if entry is None:
+            async with self._locks[hash(key) % len(self._locks)]:
+                generation, entry, tier = await self._lookup(key)
+                if entry is None:
+                    response = await handler(request)
+                    if response.status != 200:
+                        return response
+                    entry = build_entry(generation, response.body, response.status, response.mimetype, response.headers)
+                    local_cache.set(key, entry, self.timeout)
+                    if generation is not None:
+                        try:
+                            await self._redis_call('setex', key, self.timeout, json.dumps(entry))
+                        except ConnectionError as e:
+                            logger.warning(f"Could not cache {name} response in Redis: {e}")
+
+        etag = f'"{entry["etag"]}"'
+        headers = [('ETag', etag), ('X-Cache', 'HIT' if tier else 'MISS')]
+        if tier:
+            headers.append(('X-Cache-Tier', tier))
+        if etag in request.headers.get('if-none-match', ''):
+            return Response('', 304, headers=headers)
+        return Response(entry['body'], entry['status'], entry['mimetype'], [*entry.get('headers', []), *headers])
+
+class AsyncReadApp:
+    """ASGI application serving the read-heavy routes of the API."""
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self._engines: List[AsyncEngine] = []
+        self._primary: Optional[async_sessionmaker] = None
+        self._replicas: Iterator[async_sessionmaker] = iter(())
+        self._redis: Any = None
+        self.cache = AsyncResponseCache(self.get_redis, settings['CACHE_DEFAULT_TIMEOUT'])
+        self.limiter = self._create_limiter() if settings.get('RATELIMIT_ENABLED', True) else None
+        # (method, path) -> handler, rate limit, limiter scope
+        self.routes: Dict[Tuple[str, str], Tuple[Handler, Optional[RateLimitItem], str]] = {
+            ('GET', '/recipes'): (self.get_recipes, parse('100 per minute'), 'main.get_recipes'),
+            ('GET', '/categories'): (self.get_categories, parse('200 per minute'), 'main.get_categories'),
+            ('POST', '/calculate-ingredients'): (self.calculate_ingredients, parse('50 per minute'), 'main.calculate_ingredients'),
+            ('GET', '/metrics'): (self.get_metrics, None, 'main.get_metrics')
+        }
+
+    def _create_limiter(self) -> TokenBucketRateLimiter:
+        uri = self.settings['RATELIMIT_STORAGE_URI']
+        options = self.settings['RATELIMIT_STORAGE_OPTIONS']
+        if self.settings['RATELIMIT_STRATEGY'] != TOKEN_BUCKET:
+            # Fixed windows in Redis would cost a blocking round-trip per request
+            uri = f'local+{uri}'
+            options = {
+                'sync_interval': self.settings['RATELIMIT_SYNC_INTERVAL'],
+                'socket_timeout': self.settings['REDIS_SOCKET_TIMEOUT']
+            }
+        return TokenBucketRateLimiter(cast(Storage, storage_from_string(uri, **options)))
+
+    def _sessionmakers(self) -> async_sessionmaker:
+        settings = SimpleNamespace(**self.settings)
+        for uri in [self.settings['DATABASE_URL'], *self.settings['DATABASE_REPLICA_URLS']]:
+            self._engines.append(create_async_db_engine(uri, settings))
+        makers = [async_sessionmaker(engine, expire_on_commit=False) for engine in self._engines]
+        self._primary = makers[0]
+        self._replicas = itertools.cycle(makers[1:] or makers[:1])
+        return self._primary
+
+    def session(self, readonly: bool = False) -> AsyncSession:
+        """A new session on the primary, or on the next replica when readonly."""
+        primary = self._primary or self._sessionmakers()
+        return next(self._replicas)() if readonly else primary()
+
+    def get_redis(self) -> Any:
+        """The worker's async Redis client; no connection is made until the first command."""
+        if self._redis is None:
+            import redis.asyncio
+
+            self._redis = redis.asyncio.Redis(
+                host=self.settings['REDIS_HOST'],
+                port=self.settings['REDIS_PORT'],
+                db=self.settings['REDIS_DB'],
+                decode_responses=True,
+                socket_connect_timeout=self.settings['REDIS_SOCKET_TIMEOUT'],
+                socket_timeout=self.settings['REDIS_SOCKET_TIMEOUT']
+            )
+        return self._redis
+
+    async def close(self) -> None:
+        for engine in self._engines:
+            await engine.dispose()
+        self._engines, self._primary = [], None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def get_recipes(self, request: Request) -> Response:
+        """One page of recipes; the same parameters and headers as the WSGI route."""
+        async def page(request: Request) -> Response:
+            categories = request.arg_list('category')
+            filter_type = request.arg('filter_type', 'OR')
+            ingredient = request.arg('ingredient')
+            try:
+                fields = parse_fields(request.arg('fields'))
+            except ValueError as e:
+                return error_response(str(e), 400)
+            limit = request.arg('limit', self.settings['RECIPES_PAGE_SIZE'], type=int)
+            limit = max(1, min(limit, self.settings['RECIPES_MAX_PAGE_SIZE']))
+            after = request.arg('after', type=int)
+
+            try:
+                async with self.session(readonly=True) as session:
+                    query = recipe_page_query(categories, filter_type, ingredient, after, limit, fields)
+                    recipes = (await session.execute(query)).scalars().all()
+                    has_more = len(recipes) > limit
+                    recipes = recipes[:limit]
+                    response = Response(recipes_json(recipes, fields))
+            except Exception as e:
+                logger.error(f"Error fetching recipes: {str(e)}")
+                return error_response('Failed to fetch recipes', 500)
+
+            if has_more:
+                next_cursor = recipes[-1].id
+                args = [(key, value) for key, value in request.args if key not in ('after', 'limit')]
+                args += [('after', str(next_cursor)), ('limit', str(limit))]
+                response.headers.append(('X-Next-Cursor', str(next_cursor)))
+                response.headers.append(('Link', f'<{request.path}?{urlencode(args)}>; rel="next"'))
+            return response
+
+        return await self.cache.respond('get_recipes', request, page)
+
+    async def get_categories(self, request: Request) -> Response:
+        async def categories(request: Request) -> Response:
+            try:
+                async with self.session(readonly=True) as session:
+                    return json_response(await session.run_sync(get_category_names, use_cache=False))
+            except Exception as e:
+                logger.error(f"Error fetching categories: {str(e)}")
+                return error_response('Failed to fetch categories', 500)
+
+        return await self.cache.respond('get_categories', request, categories)
+
+    async def calculate_ingredients(self, request: Request) -> Response:
+        token = request.headers.get('x-csrf-token')
+        if not token:
+            return error_response('CSRF token missing', 403)
+        if not hmac.compare_digest(token, csrf_token(self.settings['CSRF_SECRET_KEY'])):
+            return error_response('Invalid CSRF token', 403)
+
+        try:
+            data = json.loads(request.body)
+            servings_by_id = parse_selections(data.get('recipes') if isinstance(data, dict) else None)
+        except ValueError as e:
+            logger.error(f"Invalid calculation request: {e}")
+            return error_response(str(e), 400)
+
+        if not servings_by_id:
+            return json_response([])
+
+        try:
+            async with self.session() as session:
+                # Compiled vectors and the result cache are the WSGI app's, run on a sync session facade
+                missing, total_ingredients, key, hit = await session.run_sync(plan_shopping_list, servings_by_id)
+        except Exception as e:
+            logger.error(f"Error calculating ingredients: {str(e)}")
+            return error_response('Failed to calculate ingredients', 500)
+
+        if missing:
+            logger.error(f"Recipes {missing} not found")
+            return error_response(
+                f'Recipes not found: {", ".join(str(recipe_id) for recipe_id in missing)}', 404, missing_ids=missing
+            )
+        response = json_response(total_ingredients)
+        response.headers += [('X-Result-Cache', 'HIT' if hit else 'MISS'), ('X-Result-Cache-Key', key)]
+        return response
+
+    async def get_metrics(self, request: Request) -> Response:
+        """Request, database and cache metrics of this worker in Prometheus text format."""
+        return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+    async def dispatch(self, request: Request) -> Tuple[Response, str]:
+        route = self.routes.get((request.method, request.path))
+        if route is None:
+            return error_response('Not found', 404), 'unmatched'
+        handler, limit, scope = route
+        if limit is not None and self.limiter is not None and not self.limiter.hit(limit, request.remote_addr, scope):
+            return error_response(f'Rate limit exceeded: {limit}', 429), request.path
+        return await handler(request), request.path
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await self.close()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return
+
+        start = time.perf_counter()
+        body = b''
+        more_body = scope['method'] == 'POST'
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+        request = Request(scope, body)
+
+        response, route = await self.dispatch(request)
+        payload = response.body.encode() if isinstance(response.body, str) else response.body
+        content_type = response.mimetype
+        if content_type == 'application/json':
+            content_type += '; charset=utf-8'
+        headers = [(b'content-type', content_type.encode()), (b'content-length', str(len(payload)).encode())]
+        headers += [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in response.headers]
+        await send({'type': 'http.response.start', 'status': response.status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+        elapsed = time.perf_counter() - start
+        metrics.request_duration.observe(elapsed, method=request.method, route=route)
+        metrics.requests_total.inc(method=request.method, route=route, status=str(response.status))
+        logger.info(f"Request: {request.method} {request.path} Status: {response.status} Duration: {elapsed * 1000:.2f}ms")
+
+def create_asgi_app(test_config: Optional[Dict[str, Any]] = None) -> AsyncReadApp:
+    """Create the ASGI read app from Config, with test_config overriding any settings."""
+    settings = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    if test_config is not None:
+        settings.update(test_config)
+    return AsyncReadApp(settings)
@@ -0,0 +1,349 @@
+from flask import current_app, request, Response
+from functools import wraps
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+from config import Config
+from .database import get_redis, on_recipes_changed
+from .metrics import format_family, register_collector
+import hashlib
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'cache:generation'
+
+class LocalCache:
+    """Bounded in-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + min(ttl or self.ttl, self.ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class CircuitBreaker:
+    """
+    Skip a failing dependency for a while after repeated errors.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``allow()`` returns False until ``reset_timeout`` seconds have passed.
+    Then a single trial call is let through; success closes the breaker and
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half-open: let one caller try, keep the rest local
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Redis failed {self.failures} times, using local cache only")
+                self.opened_at = time.monotonic()
+
+local_cache = LocalCache(Config.CACHE_LOCAL_MAX_ENTRIES, Config.CACHE_LOCAL_TTL)
+redis_breaker = CircuitBreaker(Config.REDIS_FAILURE_THRESHOLD, Config.REDIS_RETRY_AFTER)
+
+_stats = {
+    'local': {'hits': 0, 'misses': 0},
+    'redis': {'hits': 0, 'misses': 0, 'errors': 0, 'skipped': 0}
+}
+_stats_lock = threading.Lock()
+
+def record_lookup(tier: str, counter: str) -> None:
+    with _stats_lock:
+        _stats[tier][counter] += 1
+
+def cache_stats() -> Dict[str, Any]:
+    """Return hit/miss counters per cache tier plus tier state."""
+    with _stats_lock:
+        stats = {tier: dict(counters) for tier, counters in _stats.items()}
+    stats['local']['entries'] = len(local_cache)
+    stats['redis']['circuit_open'] = redis_breaker.is_open
+    return stats
+
+@register_collector
+def _cache_metrics():
+    stats = cache_stats()
+    yield from format_family('cache_requests_total', 'counter', 'Response cache lookups by tier and result.', [
+        ({'tier': tier, 'result': result}, stats[tier][counter])
+        for tier in ('local', 'redis') for result, counter in (('hit', 'hits'), ('miss', 'misses'))
+    ])
+    yield from format_family('cache_redis_errors_total', 'counter', 'Failed Redis cache calls.', [
+        ({}, stats['redis']['errors'])
+    ])
+    yield from format_family('cache_redis_skipped_total', 'counter', 'Redis cache calls skipped while the circuit was open.', [
+        ({}, stats['redis']['skipped'])
+    ])
+    yield from format_family('cache_local_entries', 'gauge', 'Entries in the local response cache tier.', [
+        ({}, stats['local']['entries'])
+    ])
+
+def _redis_call(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Call Redis through the circuit breaker.
+
+    Raises:
+        ConnectionError: If the breaker is open or the call failed
+    """
+    if not redis_breaker.allow():
+        record_lookup('redis', 'skipped')
+        raise ConnectionError('Redis circuit open')
+    try:
+        result = func(*args, **kwargs)
+    except Exception as e:
+        record_lookup('redis', 'errors')
+        redis_breaker.record_failure()
+        raise ConnectionError(str(e)) from e
+    redis_breaker.record_success()
+    return result
+
+def bump_generation(recipe_ids: Optional[Set[int]] = None) -> None:
+    """Invalidate every cached response by moving to a new generation."""
+    # Other workers' local tiers expire within CACHE_LOCAL_TTL
+    local_cache.clear()
+    try:
+        _redis_call(get_redis().incr, GENERATION_KEY)
+    except ConnectionError as e:
+        logger.warning(f"Could not bump cache generation: {e}")
+
+on_recipes_changed(bump_generation)
+
+# Response headers that are recomputed rather than replayed from the cache
+_UNCACHED_HEADERS = {'content-length', 'content-type', 'etag', 'x-cache', 'x-cache-tier'}
+
+# Striped locks so concurrent misses for a key inside one worker recompute once
+_local_locks = [threading.Lock() for _ in range(64)]
+
+def _local_lock(key: str) -> threading.Lock:
+    return _local_locks[hash(key) % len(_local_locks)]
+
+def cache_key(name: str, path: str, args: Iterable[Tuple[str, str]]) -> str:
+    """Build a cache key from the view name, path and query arguments."""
+    raw = f'{path}?{json.dumps(sorted(args))}'
+    return f'cache:{name}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+def make_cache_key(name: str) -> str:
+    """Build a cache key from the view name, path and full query string."""
+    return cache_key(name, request.path, request.args.items(multi=True))
+
+def _load(key: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """
+    Fetch the current generation and the entry for key in one round-trip.
+
+    Returns:
+        The generation and the cached entry, or None if the entry is missing
+        or was computed under an older generation.
+
+    Raises:
+        ConnectionError: If Redis is unavailable
+    """
+    return current_entry(*_redis_call(get_redis().mget, GENERATION_KEY, key))
+
+def current_entry(generation: Optional[str], cached: Optional[str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Decode a Redis entry, dropping it if it predates the current generation."""
+    generation = generation or '0'
+    if cached is None:
+        return generation, None
+    entry = json.loads(cached)
+    if entry.get('generation') != generation:
+        return generation, None
+    return generation, entry
+
+def build_entry(generation: Optional[str], body: str, status: int, mimetype: Optional[str],
+                headers: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+    """Build a cache entry; the format is shared with the ASGI read path."""
+    # Tag the entry with the generation read before computing it; a write that
+    # bumps the generation concurrently makes this entry stale immediately.
+    return {
+        'generation': generation,
+        'body': body,
+        'status': status,
+        'mimetype': mimetype,
+        'headers': [(k, v) for k, v in headers if k.lower() not in _UNCACHED_HEADERS],
+        'etag': hashlib.sha1(body.encode()).hexdigest()
+    }
+
+def _build_entry(generation: Optional[str], response: Response) -> Dict[str, Any]:
+    return build_entry(
+        generation, response.get_data(as_text=True), response.status_code,
+        response.mimetype, response.headers.items()
+    )
+
+def _to_response(entry: Dict[str, Any], tier: Optional[str]) -> Response:
+    """Build a response from a cache entry, answering 304 when the ETag matches."""
+    if entry['etag'] in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(entry['body'], status=entry['status'], mimetype=entry['mimetype'])
+        response.headers.extend(entry.get('headers', []))
+    response.set_etag(entry['etag'])
+    response.headers['X-Cache'] = 'HIT' if tier else 'MISS'
+    if tier:
+        response.headers['X-Cache-Tier'] = tier
+    return response
+
+def _lookup(key: str) -> Tuple[Optional[str], Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Look key up in the local tier, then Redis.
+
+    Returns:
+        The Redis generation (None when Redis was not reachable), the entry
+        if found, and the tier it came from.
+    """
+    entry = local_cache.get(key)
+    if entry is not None:
+        record_lookup('local', 'hits')
+        return entry['generation'], entry, 'local'
+    record_lookup('local', 'misses')
+
+    try:
+        generation, entry = _load(key)
+    except ConnectionError:
+        return None, None, None
+    if entry is None:
+        record_lookup('redis', 'misses')
+        return generation, None, None
+    record_lookup('redis', 'hits')
+    local_cache.set(key, entry)
+    return generation, entry, 'redis'
+
+def _wait_for_entry(key: str, lock_timeout: float) -> Optional[Dict[str, Any]]:
+    """Poll Redis for an entry another worker is computing, up to lock_timeout."""
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        _, entry = _load(key)
+        if entry is not None:
+            local_cache.set(key, entry)
+            return entry
+    return None
+
+def cache(timeout: Optional[int] = None) -> Callable:
+    """
+    Cache successful GET responses in process memory and Redis.
+
+    Lookups hit a bounded local LRU first (entries live for at most
+    CACHE_LOCAL_TTL seconds), then Redis. Keys include the request path and
+    full query string. Redis entries are tagged with a generation counter
+    that every commit touching recipes bumps, so writes invalidate all
+    cached responses at once. Responses carry an ETag and conditional
+    requests get a 304. Concurrent misses for the same key recompute once:
+    other workers wait on a short-lived Redis lock and other threads in the
+    worker on a local lock. Only 200 responses are cached. Repeated Redis failures open a circuit
+    breaker and the cache runs on the local tier alone until Redis recovers.
+
+    Args:
+        timeout: Entry lifetime in seconds (defaults to CACHE_DEFAULT_TIMEOUT)
+    """
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def decorated_function(*args: Any, **kwargs: Any) -> Any:
+            if request.method != 'GET':
+                return f(*args, **kwargs)
+
+            ttl = timeout or current_app.config.get('CACHE_DEFAULT_TIMEOUT', 300)
+            lock_timeout = current_app.config.get('CACHE_LOCK_TIMEOUT', 5)
+            key = make_cache_key(f.__name__)
+
+            generation, entry, tier = _lookup(key)
+            if entry is not None:
+                return _to_response(entry, tier)
+
+            # Wait for another worker's entry before taking the stripe lock, so
+            # the wait does not stall unrelated keys sharing the stripe
+            lock_key = f'lock:{key}'
+            acquired = False
+            if generation is not None:
+                try:
+                    acquired = _redis_call(get_redis().set, lock_key, '1', nx=True, px=int(lock_timeout * 1000))
+                    if not acquired:
+                        entry = _wait_for_entry(key, lock_timeout)
+                        if entry is not None:
+                            return _to_response(entry, 'redis')
+                except ConnectionError as e:
+                    logger.warning(f"Redis unavailable while caching {f.__name__}: {e}")
+                    generation = None
+
+            try:
+                with _local_lock(key):
+                    generation, entry, tier = _lookup(key)
+                    if entry is not None:
+                        return _to_response(entry, tier)
+
+                    response = current_app.make_response(f(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+
+                    entry = _build_entry(generation, response)
+                    local_cache.set(key, entry, ttl)
+                    if generation is not None:
+                        try:
+                            _redis_call(get_redis().setex, key, ttl, json.dumps(entry))
+                        except ConnectionError as e:
+                            logger.warning(f"Could not cache {f.__name__} response in Redis: {e}")
+                    return _to_response(entry, None)
+            finally:
+                # Released on errors and non-200 responses too, so other
+                # workers stop waiting and compute the response themselves
+                if acquired:
+                    try:
+                        _redis_call(get_redis().delete, lock_key)
+                    except ConnectionError as e:
+                        logger.warning(f"Could not release cache lock for {f.__name__}: {e}")
+        return decorated_function
+    return decorator
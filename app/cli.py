@@ -0,0 +1,60 @@
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+from .database import db_session, get_engine, init_db, schema_revision
+from .importer import import_recipes, iter_ndjson
+from .jobs import job_worker
+from .profiling import make_profile_token
+import click
+import json
+
+def init_cli(app: Flask) -> None:
+    """Register command line commands with the application."""
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(import_recipes_command)
+    app.cli.add_command(jobs_worker_command)
+    app.cli.add_command(profile_token_command)
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command() -> None:
+    """Create the tables and search index, and stamp the schema revision."""
+    engine = get_engine()
+    revision = schema_revision(engine)
+    if revision is not None:
+        click.echo(f"Database is already initialized at revision {revision}; use `alembic upgrade head` to migrate")
+        return
+    init_db(engine)
+    click.echo(f"Initialized the database at {engine.url.render_as_string(hide_password=True)}")
+
+@click.command('import-recipes')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', type=int, default=None, help='Recipes committed per transaction.')
+@with_appcontext
+def import_recipes_command(path: str, batch_size: int) -> None:
+    """Import recipes from an NDJSON file (or a .json array)."""
+    batch_size = batch_size or current_app.config.get('IMPORT_BATCH_SIZE', 500)
+    with open(path, encoding='utf-8') as f:
+        rows = json.load(f) if path.endswith('.json') else iter_ndjson(f)
+        with db_session() as session:
+            result = import_recipes(session, rows, batch_size)
+
+    for error in result['errors']:
+        click.echo(f"Row {error['row']}: {'; '.join(error['errors'])}", err=True)
+    click.echo(f"Imported {result['imported']} recipes, {result['failed']} failed")
+
+@click.command('jobs-worker')
+@with_appcontext
+def jobs_worker_command() -> None:
+    """Run queued calculation jobs in the foreground until interrupted."""
+    click.echo(f"Processing calculation jobs with {job_worker.processes} pool processes")
+    job_worker.run_forever()
+
+@click.command('profile-token')
+@click.option('--ttl', type=int, default=3600, help='Seconds until the token expires.')
+@with_appcontext
+def profile_token_command(ttl: int) -> None:
+    """Print a token that enables profiling for requests that send it."""
+    secret = current_app.config.get('PROFILING_SECRET')
+    if not secret:
+        raise click.ClickException('PROFILING_SECRET is not set')
+    click.echo(make_profile_token(secret, ttl))
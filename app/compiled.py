@@ -0,0 +1,286 @@
+"""
+Process-level compiled recipe vectors for shopping list calculation.
+
+Each recipe is compiled once into its ingredient group ids and a float
+array of base-unit amounts per serving. Entries are keyed by recipe id and
+validated against the recipe's ``version`` counter, and commits that update or delete a
+recipe evict it, so a shopping list becomes a weighted sum of cached
+vectors instead of a reload of every recipe.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple, Union
+from config import Config
+from .aggregation import IngredientIndex, format_totals
+from .database import on_recipes_changed
+from .metrics import format_family, register_collector
+from .models import Recipe, RecipeIngredient
+import hashlib
+import json
+import numpy as np
+import threading
+
+class CompiledRecipe:
+    """Compact, array-backed ingredient vector for one recipe."""
+
+    __slots__ = ('recipe_id', 'version', 'servings', 'ingredient_ids', 'per_serving', 'digest')
+
+    def __init__(self, recipe_id: int, version: int, servings: int,
+                 ingredient_ids: np.ndarray, per_serving: np.ndarray, digest: str):
+        self.recipe_id = recipe_id
+        self.version = version
+        self.servings = servings
+        self.ingredient_ids = ingredient_ids
+        self.per_serving = per_serving
+        # Hash of the canonical ingredient groups and amounts, for plan keys
+        self.digest = digest
+
+class RecipeVectorCache:
+    """
+    Bounded LRU of compiled recipes shared by all requests in a worker.
+
+    Ingredient group ids come from one process-wide IngredientIndex, so
+    vectors from different recipes can be summed directly.
+    """
+
+    def __init__(self, max_recipes: int):
+        self.max_recipes = max_recipes
+        self.index = IngredientIndex()
+        self._entries: 'OrderedDict[int, CompiledRecipe]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, recipe_ids: Optional[Iterable[int]] = None) -> None:
+        """Evict the given recipes, or everything when recipe_ids is None."""
+        with self._lock:
+            if recipe_ids is None:
+                self._entries.clear()
+                return
+            for recipe_id in recipe_ids:
+                self._entries.pop(recipe_id, None)
+
+    def get_many(self, session, recipe_ids: Iterable[int]) -> Dict[int, CompiledRecipe]:
+        """
+        Return compiled recipes for the ids that exist.
+
+        One query reads (id, servings, version) to validate cached entries;
+        a second loads ingredient rows only for recipes that are missing or
+        stale. Ids absent from the result do not exist.
+        """
+        versions = {
+            recipe_id: (servings, version)
+            for recipe_id, servings, version in session.query(
+                Recipe.id, Recipe.servings, Recipe.version
+            ).filter(Recipe.id.in_(list(recipe_ids)))
+        }
+
+        compiled: Dict[int, CompiledRecipe] = {}
+        with self._lock:
+            for recipe_id, (servings, version) in versions.items():
+                entry = self._entries.get(recipe_id)
+                if entry is not None and entry.version == version and entry.servings == servings:
+                    self._entries.move_to_end(recipe_id)
+                    compiled[recipe_id] = entry
+
+        stale = [recipe_id for recipe_id in versions if recipe_id not in compiled]
+        if stale:
+            compiled.update(self._compile(session, stale, versions))
+        return compiled
+
+    def _compile(self, session, recipe_ids: List[int], versions: Dict[int, Any]) -> Dict[int, CompiledRecipe]:
+        rows: Dict[int, List[Any]] = {recipe_id: [] for recipe_id in recipe_ids}
+        for recipe_id, name, amount, unit in (
+            session.query(RecipeIngredient.recipe_id, RecipeIngredient.name, RecipeIngredient.amount, RecipeIngredient.unit)
+            .filter(RecipeIngredient.recipe_id.in_(recipe_ids))
+            .order_by(RecipeIngredient.recipe_id, RecipeIngredient.position)
+        ):
+            rows[recipe_id].append((name, amount, unit))
+
+        compiled = {}
+        with self._lock:
+            for recipe_id, ingredients in rows.items():
+                servings, version = versions[recipe_id]
+                resolved = [self.index.resolve(name, unit) for name, _, unit in ingredients]
+                ingredient_ids = np.fromiter((group_id for group_id, _ in resolved), dtype=np.intp, count=len(resolved))
+                per_serving = np.fromiter(
+                    (amount * factor / servings for (_, amount, _), (_, factor) in zip(ingredients, resolved)),
+                    dtype=np.float64,
+                    count=len(resolved)
+                )
+                digest = hashlib.sha1(json.dumps([
+                    [*self.index.groups[group_id], amount]
+                    for group_id, amount in zip(ingredient_ids.tolist(), per_serving.tolist())
+                ]).encode()).hexdigest()
+                entry = CompiledRecipe(recipe_id, version, servings, ingredient_ids, per_serving, digest)
+                self._entries[recipe_id] = entry
+                compiled[recipe_id] = entry
+            while len(self._entries) > self.max_recipes:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def weighted_rows(self, compiled: Dict[int, CompiledRecipe],
+                      servings_by_id: Mapping[int, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """Flatten the selected vectors into (group id, base-unit amount) arrays."""
+        selected = [compiled[recipe_id] for recipe_id in servings_by_id]
+        if not selected:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+        ids = np.concatenate([entry.ingredient_ids for entry in selected])
+        weights = np.concatenate([
+            entry.per_serving * servings_by_id[entry.recipe_id] for entry in selected
+        ])
+        return ids, weights
+
+    def format_shopping_list(self, ids: np.ndarray, totals: Union[np.ndarray, Mapping[int, float]]) -> List[Dict[str, Any]]:
+        """Format totals for the groups in ids, in first-seen order."""
+        if not len(ids):
+            return []
+        _, first_seen = np.unique(ids, return_index=True)
+        return format_totals(self.index, totals, ids[np.sort(first_seen)])
+
+    def shopping_list(self, compiled: Dict[int, CompiledRecipe], servings_by_id: Mapping[int, float]) -> List[Dict[str, Any]]:
+        """
+        Sum compiled vectors weighted by requested servings.
+
+        Returns:
+            Shopping list lines in display units, in first-seen order
+        """
+        ids, weights = self.weighted_rows(compiled, servings_by_id)
+        if not len(ids):
+            return []
+        groups, local = np.unique(ids, return_inverse=True)
+        totals = np.bincount(local, weights=weights)
+        return self.format_shopping_list(ids, dict(zip(groups.tolist(), totals.tolist())))
+
+    def batch_shopping_lists(self, compiled: Dict[int, CompiledRecipe], plans: List[Dict[int, float]],
+                             include_total: bool = False) -> Tuple[List[List[Dict[str, Any]]], Optional[List[Dict[str, Any]]]]:
+        """
+        Aggregate several plans, and optionally their grand total, in one pass.
+
+        The rows of every plan are concatenated and summed with a single
+        bincount over (plan, ingredient group) cells, restricted to the
+        groups that actually occur.
+
+        Returns:
+            One shopping list per plan, and the grand total (None unless
+            include_total), each in first-seen order
+        """
+        segments = [self.weighted_rows(compiled, plan) for plan in plans]
+        ids = np.concatenate([segment_ids for segment_ids, _ in segments]) if segments else np.empty(0, dtype=np.intp)
+        if not len(ids):
+            return [[] for _ in plans], [] if include_total else None
+        weights = np.concatenate([segment_weights for _, segment_weights in segments])
+        plan_rows = np.repeat(np.arange(len(plans)), [len(segment_ids) for segment_ids, _ in segments])
+
+        groups, local = np.unique(ids, return_inverse=True)
+        cells = np.bincount(
+            plan_rows * len(groups) + local, weights=weights, minlength=len(plans) * len(groups)
+        ).reshape(len(plans), len(groups))
+
+        group_list = groups.tolist()
+        results = [
+            self.format_shopping_list(segment_ids, dict(zip(group_list, row.tolist())))
+            for (segment_ids, _), row in zip(segments, cells)
+        ]
+        total = self.format_shopping_list(ids, dict(zip(group_list, cells.sum(axis=0).tolist()))) if include_total else None
+        return results, total
+
+def plan_hash(compiled: Dict[int, CompiledRecipe], servings_by_id: Dict[int, float]) -> str:
+    """
+    Content hash identifying a plan's shopping list.
+
+    Built from the sorted (recipe id, requested servings, recipe digest)
+    triples, so the same selections in any order hash alike and any change
+    to a selected recipe's ingredients or servings yields a new hash.
+    """
+    canonical = sorted(
+        (recipe_id, float(servings), compiled[recipe_id].digest)
+        for recipe_id, servings in servings_by_id.items()
+    )
+    return hashlib.sha256(json.dumps(canonical, separators=(',', ':')).encode()).hexdigest()
+
+class ShoppingListCache:
+    """
+    Bounded LRU of computed shopping lists keyed by ``plan_hash``.
+
+    Each entry remembers the recipes it was computed from, so a commit that
+    updates or deletes one of them evicts every plan that included it.
+    Selections differing only in order share an entry, so a hit keeps the
+    line order of the request that computed it. Cached lists are shared
+    between requests and must not be mutated.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[str, Tuple[Tuple[int, ...], List[Dict[str, Any]]]]' = OrderedDict()
+        self._by_recipe: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, recipe_ids: Iterable[int], result: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            recipe_ids = tuple(recipe_ids)
+            self._entries[key] = (recipe_ids, result)
+            self._entries.move_to_end(key)
+            for recipe_id in recipe_ids:
+                self._by_recipe.setdefault(recipe_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def invalidate(self, recipe_ids: Optional[Iterable[int]] = None) -> None:
+        """Evict plans that include the given recipes, or everything when None."""
+        with self._lock:
+            if recipe_ids is None:
+                self._entries.clear()
+                self._by_recipe.clear()
+                return
+            for recipe_id in recipe_ids:
+                for key in list(self._by_recipe.get(recipe_id, ())):
+                    self._evict(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+    def _evict(self, key: str) -> None:
+        recipe_ids, _ = self._entries.pop(key)
+        for recipe_id in recipe_ids:
+            keys = self._by_recipe.get(recipe_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_recipe[recipe_id]
+
+recipe_vectors = RecipeVectorCache(Config.RECIPE_VECTOR_CACHE_SIZE)
+on_recipes_changed(recipe_vectors.invalidate)
+
+shopping_lists = ShoppingListCache(Config.RESULT_CACHE_MAX_ENTRIES)
+on_recipes_changed(shopping_lists.invalidate)
+
+@register_collector
+def _result_cache_metrics():
+    stats = shopping_lists.stats()
+    yield from format_family('result_cache_requests_total', 'counter', 'Shopping list result cache lookups by result.', [
+        ({'result': 'hit'}, stats['hits']),
+        ({'result': 'miss'}, stats['misses'])
+    ])
+    yield from format_family('result_cache_entries', 'gauge', 'Shopping lists held in the result cache.', [
+        ({}, stats['entries'])
+    ])
+    yield from format_family('recipe_vector_cache_entries', 'gauge', 'Compiled recipes held in memory.', [
+        ({}, len(recipe_vectors))
+    ])
@@ -1,50 +1,327 @@
-from sqlalchemy import create_engine
+from sqlalchemy import Column, MetaData, String, Table, create_engine, event, inspect, select
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.pool import QueuePool
-from flask import current_app, g, Response
+from sqlalchemy.pool import QueuePool, StaticPool
+from flask import g
 from contextlib import contextmanager
 from config import Config
-import redis
-from functools import wraps
-import json
-from typing import Any, Callable
-import os
-
-# Create database engine with connection pooling
-engine = create_engine(
-    Config.SQLITE_URI,
-    poolclass=QueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_timeout=30,
-    pool_recycle=1800
-)
+import logging
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+import itertools
+import threading
+import time
+
+if TYPE_CHECKING:
+    import redis
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+SQLITE_JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SQLITE_SYNCHRONOUS_MODES = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
 
-# Create scoped session factory
-Session = scoped_session(sessionmaker(bind=engine))
-
-# Redis connection for caching
-redis_client = redis.Redis(
-    host=os.getenv('REDIS_HOST', 'localhost'),
-    port=int(os.getenv('REDIS_PORT', 6379)),
-    db=int(os.getenv('REDIS_DB', 0)),
-    decode_responses=True,
-    socket_connect_timeout=30,
-    retry_on_timeout=True
+# Alembic's revision table, read by the startup schema check
+alembic_version = Table(
+    'alembic_version',
+    MetaData(),
+    Column('version_num', String(32), primary_key=True)
 )
+
+def _sqlite_pragmas(settings: Any) -> List[str]:
+    """Build the PRAGMA statements applied to every new SQLite connection."""
+    journal_mode = settings.SQLITE_JOURNAL_MODE.upper()
+    synchronous = settings.SQLITE_SYNCHRONOUS.upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Invalid SQLITE_JOURNAL_MODE: {settings.SQLITE_JOURNAL_MODE}")
+    if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f"Invalid SQLITE_SYNCHRONOUS: {settings.SQLITE_SYNCHRONOUS}")
+    return [
+        f'PRAGMA journal_mode={journal_mode}',
+        f'PRAGMA synchronous={synchronous}',
+        f'PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}',
+        f'PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}',
+        f'PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}'
+    ]
+
+def create_db_engine(uri: str, settings: Any = Config) -> Engine:
+    """
+    Create the database engine for a URI.
+    
+    File-backed SQLite gets a QueuePool shared across threads, with WAL,
+    synchronous, mmap, cache size and busy timeout pragmas applied on each
+    new connection so readers do not block behind writers. In-memory SQLite
+    uses a single shared connection. Other backends get a QueuePool with
+    connection recycling.
+    
+    Args:
+        uri: SQLAlchemy database URL
+        settings: Object providing the SQLITE_* and pool settings (Config)
+    """
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite':
+        return create_engine(
+            uri,
+            poolclass=QueuePool,
+            pool_size=5,
+            max_overflow=10,
+            pool_timeout=30,
+            pool_recycle=1800
+        )
+    
+    connect_args = {'check_same_thread': False}
+    if not url.database or url.database == ':memory:':
+        new_engine = create_engine(uri, poolclass=StaticPool, connect_args=connect_args)
+    else:
+        new_engine = create_engine(
+            uri,
+            poolclass=QueuePool,
+            pool_size=settings.SQLITE_POOL_SIZE,
+            max_overflow=settings.SQLITE_MAX_OVERFLOW,
+            pool_timeout=30,
+            connect_args=connect_args
+        )
+    
+    pragmas = _sqlite_pragmas(settings)
+    
+    @event.listens_for(new_engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+    
+    return new_engine
+
+# Async drivers used by the ASGI read path, by sync backend name
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+
+def async_database_url(uri: str) -> str:
+    """Map a sync database URL to the matching async driver."""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for database backend: {backend}")
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}').render_as_string(hide_password=False)
+
+def create_async_db_engine(uri: str, settings: Any = Config) -> 'AsyncEngine':
+    """
+    Create an async engine for a sync database URI.
+    
+    Pooling and SQLite pragmas match create_db_engine. SQLAlchemy's asyncio
+    extension is imported here so the WSGI app never loads it.
+    
+    Args:
+        uri: Sync SQLAlchemy database URL (e.g. the DATABASE_URL setting)
+        settings: Object providing the SQLITE_* and pool settings (Config)
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    
+    url = make_url(uri)
+    if url.get_backend_name() != 'sqlite':
+        return create_async_engine(
+            async_database_url(uri),
+            pool_size=5,
+            max_overflow=10,
+            pool_timeout=30,
+            pool_recycle=1800
+        )
+    
+    if not url.database or url.database == ':memory:':
+        new_engine = create_async_engine(async_database_url(uri), poolclass=StaticPool)
+    else:
+        new_engine = create_async_engine(
+            async_database_url(uri),
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.SQLITE_POOL_SIZE,
+            max_overflow=settings.SQLITE_MAX_OVERFLOW,
+            pool_timeout=30
+        )
+    
+    pragmas = _sqlite_pragmas(settings)
+    
+    @event.listens_for(new_engine.sync_engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+    
+    return new_engine
+
+# Engines are created on first use, one per URL; init_app picks the primary
+# and replicas from the app config and binds Session to the primary
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+_database: Dict[str, Any] = {'primary': None, 'replicas': []}
+
+Session = scoped_session(sessionmaker())
+_replica_sessionmakers: Iterator[sessionmaker] = iter(())
+
+# Redis connection for caching, created on first use
+_redis_settings: Dict[str, Any] = {}
+_redis_client: Optional['redis.Redis'] = None
+
+def get_engine(uri: Optional[str] = None) -> Engine:
+    """
+    Return the engine for a URI, creating it on first use.
+    
+    Args:
+        uri: Database URL; defaults to the primary chosen by init_app, or
+            Config.DATABASE_URL before any app is initialized
+    """
+    uri = uri or _database['primary'] or Config.DATABASE_URL
+    engine = _engines.get(uri)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(uri)
+            if engine is None:
+                engine = _engines[uri] = create_db_engine(uri)
+    return engine
+
+def configure_database(uri: str, replica_uris: Iterable[str] = ()) -> None:
+    """Route Session to the primary at uri and read sessions to the replicas."""
+    global _replica_sessionmakers
+    replica_uris = list(replica_uris)
+    if _database['primary'] == uri and _database['replicas'] == replica_uris:
+        return
+    _database['primary'] = uri
+    _database['replicas'] = replica_uris
+    Session.remove()
+    Session.configure(bind=get_engine(uri))
+    _replica_sessionmakers = itertools.cycle([sessionmaker(bind=get_engine(url)) for url in replica_uris])
+
+def get_redis() -> 'redis.Redis':
+    """Return the shared Redis client; no connection is made until the first command."""
+    global _redis_client
+    if _redis_client is None:
+        import redis
+        
+        settings = _redis_settings or {
+            'host': Config.REDIS_HOST,
+            'port': Config.REDIS_PORT,
+            'db': Config.REDIS_DB,
+            'timeout': Config.REDIS_SOCKET_TIMEOUT
+        }
+        _redis_client = redis.Redis(
+            host=settings['host'],
+            port=settings['port'],
+            db=settings['db'],
+            decode_responses=True,
+            socket_connect_timeout=settings['timeout'],
+            socket_timeout=settings['timeout']
+        )
+    return _redis_client
+
+# In-process registry of category names, invalidated whenever recipes change.
+# The version counts invalidations so a load that raced one is not published.
+_category_cache: dict = {'names': None, 'loaded_at': 0.0, 'version': 0}
+_category_cache_lock = threading.Lock()
+
+def get_category_names(session, use_cache: bool = True) -> List[str]:
+    """
+    Return the sorted names of categories that have at least one recipe.
+
+    Reads the maintained ``categories`` registry rather than scanning recipes,
+    and keeps the result in process memory until a write invalidates it or
+    ``CATEGORY_CACHE_TTL`` expires (so other workers' writes show up too).
+
+    Args:
+        session: Database session
+        use_cache: Serve from process memory when fresh. Views behind the
+            response cache pass False: they only run once another worker's
+            write has moved the cache generation, and a stale list here would
+            be stored under the new generation for every worker.
+    """
+    from .models import Category
+
+    ttl = Config.CATEGORY_CACHE_TTL
+    names = _category_cache['names']
+    if use_cache and names is not None and time.monotonic() - _category_cache['loaded_at'] < ttl:
+        return names
+
+    # The lock is only taken to publish: under the ASGI app this query awaits
+    # inside run_sync, and holding a thread lock across it deadlocks the loop
+    version = _category_cache['version']
+    names = [
+        name for (name,) in session.query(Category.name)
+        .filter(Category.recipe_count > 0)
+        .order_by(Category.name)
+    ]
+    with _category_cache_lock:
+        if _category_cache['version'] == version:
+            _category_cache['names'] = names
+            _category_cache['loaded_at'] = time.monotonic()
+    return names
+
+def invalidate_category_cache(recipe_ids: Optional[Set[int]] = None) -> None:
+    """Drop the cached category names."""
+    with _category_cache_lock:
+        _category_cache['names'] = None
+        _category_cache['version'] += 1
+
+# Callbacks run after any commit that added, changed or deleted recipes
+_recipe_change_listeners: List[Callable[[Set[int]], None]] = [invalidate_category_cache]
+
+def on_recipes_changed(listener: Callable[[Set[int]], None]) -> Callable[[Set[int]], None]:
+    """
+    Register a callback to run after commits that change recipes.
+    
+    The callback receives the ids of the existing recipes that were updated
+    or deleted (newly added recipes are not included).
+    """
+    _recipe_change_listeners.append(listener)
+    return listener
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session) -> None:
+    recipe_ids = session.info.pop('recipes_changed', None)
+    if recipe_ids is not None:
+        for listener in _recipe_change_listeners:
+            try:
+                listener(recipe_ids)
+            except Exception as e:
+                logger.error(f"Error running recipe change listener {listener.__name__}: {e}")
+
+@event.listens_for(Session, 'after_rollback')
+def _clear_after_rollback(session) -> None:
+    session.info.pop('recipes_changed', None)
+
 def get_db():
     """Get database session."""
     if 'db' not in g:
         g.db = Session()
     return g.db
 
+def get_read_db():
+    """Get a read-only database session, on a replica when any are configured."""
+    if not _database['replicas']:
+        return get_db()
+    if 'read_db' not in g:
+        # Replicas are picked round-robin, one per request
+        g.read_db = next(_replica_sessionmakers)()
+    return g.read_db
+
 @contextmanager
-def db_session():
-    """Database session context manager."""
-    session = get_db()
+def db_session(readonly: bool = False):
+    """
+    Database session context manager.
+    
+    Args:
+        readonly: Route the session to a read replica when configured; the
+            transaction is rolled back instead of committed.
+    """
+    session = get_read_db() if readonly else get_db()
     try:
         yield session
-        session.commit()
+        if readonly:
+            session.rollback()
+        else:
+            session.commit()
     except:
         session.rollback()
         raise
@@ -52,19 +329,92 @@ def db_session():
         session.close()
 
 def close_db(e=None):
-    """Close database session."""
-    db = g.pop('db', None)
-    if db is not None:
-        db.close()
+    """Close database sessions."""
+    for key in ('db', 'read_db'):
+        db = g.pop(key, None)
+        if db is not None:
+            db.close()
 
 def init_app(app):
-    """Initialize database with application."""
+    """
+    Initialize database and Redis settings with application.
+    
+    Nothing connects here except the schema check: the engines and the
+    Redis client are created on first use.
+    """
+    global _redis_client
+    configure_database(
+        app.config.get('DATABASE_URL', Config.DATABASE_URL),
+        app.config.get('DATABASE_REPLICA_URLS', Config.DATABASE_REPLICA_URLS)
+    )
+    settings = {
+        'host': app.config.get('REDIS_HOST', Config.REDIS_HOST),
+        'port': app.config.get('REDIS_PORT', Config.REDIS_PORT),
+        'db': app.config.get('REDIS_DB', Config.REDIS_DB),
+        'timeout': app.config.get('REDIS_SOCKET_TIMEOUT', Config.REDIS_SOCKET_TIMEOUT)
+    }
+    if settings != _redis_settings:
+        _redis_settings.update(settings)
+        _redis_client = None
     app.teardown_appcontext(close_db)
+    
+    if app.config.get('DATABASE_CHECK_SCHEMA', True):
+        check_schema(get_engine(), create=app.config.get('DATABASE_AUTO_CREATE', False))
+
+def schema_revision(engine: Engine) -> Optional[str]:
+    """Return the migration revision the database is stamped with, or None."""
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(alembic_version.name):
+            return None
+        return connection.execute(select(alembic_version.c.version_num)).scalar()
 
-def init_db():
-    """Initialize the database."""
-    from .models import Base
+def check_schema(engine: Engine, create: bool = False) -> bool:
+    """
+    Cheap startup check that the database is at SCHEMA_REVISION.
+    
+    Reads the alembic revision (one or two small queries) instead of
+    reflecting or creating tables, and logs what to run when it does not
+    match.
+    
+    Args:
+        engine: Engine to check
+        create: Run init_db when the database has no schema yet
+    
+    Returns:
+        Whether the schema is current
+    """
+    from .models import SCHEMA_REVISION
+    
+    revision = schema_revision(engine)
+    if revision == SCHEMA_REVISION:
+        return True
+    if revision is None and create:
+        init_db(engine)
+        return True
+    if revision is None:
+        logger.warning("Database schema is not initialized; run `flask init-db`")
+    else:
+        logger.warning(f"Database schema is at {revision}, expected {SCHEMA_REVISION}; run `alembic upgrade head`")
+    return False
+
+def init_db(engine: Optional[Engine] = None) -> None:
+    """
+    Initialize the database.
+    
+    Creates the tables and the search index, and stamps the alembic
+    revision if the database was not stamped before, so later migrations
+    apply on top of it.
+    """
+    from .models import Base, SCHEMA_REVISION
+    from .search import ensure_search_index
+    
+    engine = engine or get_engine()
     Base.metadata.create_all(bind=engine)
+    ensure_search_index(engine)
+    if schema_revision(engine) is None:
+        with engine.begin() as connection:
+            alembic_version.create(connection, checkfirst=True)
+            connection.execute(alembic_version.insert().values(version_num=SCHEMA_REVISION))
 
 def load_sample_recipes():
     """Load sample recipes into the database."""
@@ -103,55 +453,3 @@ def load_sample_recipes():
                 session.add(recipe)
             
             session.commit()
-
-def cache(timeout: int = 300) -> Callable:
-    """Cache decorator for routes that handles both JSON and regular responses."""
-    def decorator(f: Callable) -> Callable:
-        @wraps(f)
-        def decorated_function(*args: Any, **kwargs: Any) -> Any:
-            # Create cache key from function name and arguments
-            cache_key = f'{f.__name__}:{str(args)}:{str(kwargs)}'
-            
-            # Try to get cached response
-            cached_data = redis_client.get(cache_key)
-            if cached_data:
-                cached_dict = json.loads(cached_data)
-                if cached_dict.get('_type') == 'template':
-                    # Reconstruct Response object for template responses
-                    return Response(
-                        cached_dict['data'],
-                        status=cached_dict['status'],
-                        headers=cached_dict['headers'],
-                        mimetype=cached_dict['mimetype']
-                    )
-                # Return JSON data directly
-                return cached_dict.get('data')
-            
-            # Get fresh response
-            response = f(*args, **kwargs)
-            
-            # Prepare data for caching based on response type
-            if isinstance(response, Response):
-                cache_data = {
-                    '_type': 'template',
-                    'data': response.get_data(as_text=True),
-                    'status': response.status_code,
-                    'headers': dict(response.headers),
-                    'mimetype': response.mimetype
-                }
-            else:
-                cache_data = {
-                    '_type': 'json',
-                    'data': response
-                }
-            
-            # Cache the prepared data
-            redis_client.setex(
-                cache_key,
-                timeout,
-                json.dumps(cache_data)
-            )
-            
-            return response
-        return decorated_function
-    return decorator
\ No newline at end of file
@@ -0,0 +1,99 @@
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+from .models import Recipe
+from .security import sanitize_input
+from .validation import validate_recipe
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+def iter_ndjson(lines: Iterable[str]) -> Iterator[Any]:
+    """
+    Parse NDJSON lines lazily, skipping blank lines.
+
+    Lines that are not valid JSON are yielded as the ``ValueError`` raised
+    while decoding them, so ``import_recipes`` can report them per row.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield e
+
+def _prepare(row: Any) -> Tuple[Any, List[str]]:
+    """Sanitize and validate one import row, returning the data and any errors."""
+    if isinstance(row, ValueError):
+        return None, [f"Invalid JSON: {row}"]
+    if not isinstance(row, dict):
+        return None, ["Recipe must be a JSON object"]
+    data = sanitize_input(row)
+    return data, validate_recipe(data)
+
+def _insert_batch(session, batch: List[Tuple[int, Dict[str, Any]]], errors: List[Dict[str, Any]]) -> int:
+    """
+    Insert a batch of validated recipes in one transaction.
+
+    If the batch fails as a whole, its rows are retried one by one so a
+    single bad row does not discard the others.
+
+    Returns:
+        Number of recipes inserted
+    """
+    try:
+        session.add_all([Recipe.from_dict(data, validate=False) for _, data in batch])
+        session.commit()
+        return len(batch)
+    except Exception as e:
+        session.rollback()
+        logger.warning(f"Batch insert failed, retrying rows individually: {e}")
+
+    inserted = 0
+    for row_number, data in batch:
+        try:
+            session.add(Recipe.from_dict(data, validate=False))
+            session.commit()
+            inserted += 1
+        except Exception as e:
+            session.rollback()
+            errors.append({'row': row_number, 'errors': [str(e)]})
+    return inserted
+
+def import_recipes(session, rows: Iterable[Any], batch_size: int = 500) -> Dict[str, Any]:
+    """
+    Validate, sanitize and insert recipes in chunked transactions.
+
+    Args:
+        session: Database session used for the inserts
+        rows: Recipe dicts, e.g. a decoded JSON array or ``iter_ndjson`` output
+        batch_size: Number of recipes committed per transaction
+
+    Returns:
+        Dict with ``imported`` and ``failed`` counts and per-row ``errors``
+        (1-based row numbers); invalid rows never abort the import.
+    """
+    imported = 0
+    errors: List[Dict[str, Any]] = []
+    batch: List[Tuple[int, Dict[str, Any]]] = []
+
+    for row_number, row in enumerate(rows, start=1):
+        data, row_errors = _prepare(row)
+        if row_errors:
+            errors.append({'row': row_number, 'errors': row_errors})
+            continue
+        batch.append((row_number, data))
+        if len(batch) >= batch_size:
+            imported += _insert_batch(session, batch, errors)
+            batch = []
+
+    if batch:
+        imported += _insert_batch(session, batch, errors)
+
+    errors.sort(key=lambda error: error['row'])
+    logger.info(f"Imported {imported} recipes, {len(errors)} rows failed")
+    return {
+        'imported': imported,
+        'failed': len(errors),
+        'errors': errors
+    }
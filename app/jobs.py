@@ -0,0 +1,276 @@
+"""
+Asynchronous shopping list calculation for very large plans.
+
+The ``calculation_jobs`` table doubles as the work queue: a ``JobWorker``
+thread (inside the web process, or a dedicated ``flask jobs-worker``
+process) claims queued jobs with a conditional UPDATE, compiles the
+selected recipes through ``recipe_vectors`` and sums the weighted
+ingredient rows in chunks on a process pool, recording progress after each
+chunk. Finished shopping lists are kept on the job, and a plan whose
+content hash matches an existing job reuses it instead of being recomputed.
+Finished jobs are deleted ``retention`` seconds after their last update.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from typing import Dict, Optional, Tuple, cast
+from sqlalchemy import CursorResult, and_, delete, func, or_, update
+from sqlalchemy.exc import IntegrityError
+from config import Config
+from .compiled import CompiledRecipe, plan_hash, recipe_vectors
+from .database import Session
+from .models import CalculationJob
+import json
+import logging
+import multiprocessing
+import numpy as np
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+class StreamSlots:
+    """Count of open progress streams, so they cannot take every worker thread."""
+
+    def __init__(self):
+        self.open = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, limit: int) -> bool:
+        with self._lock:
+            if self.open >= limit:
+                return False
+            self.open += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.open -= 1
+
+event_streams = StreamSlots()
+
+def sum_chunk(ids: np.ndarray, weights: np.ndarray, size: int) -> np.ndarray:
+    """Sum one chunk of weighted ingredient rows (runs in a pool process)."""
+    return np.bincount(ids, weights=weights, minlength=size)
+
+def submit_plan(session, compiled: Dict[int, CompiledRecipe],
+                servings_by_id: Dict[int, float]) -> Tuple[CalculationJob, bool]:
+    """
+    Queue a plan, or return the existing job for an identical plan.
+
+    Failed jobs are requeued when their plan is submitted again.
+
+    Args:
+        session: Database session
+        compiled: Compiled recipes for every selected id
+        servings_by_id: Requested servings per recipe id
+
+    Returns:
+        The job and whether it was (re)queued by this call
+    """
+    key = plan_hash(compiled, servings_by_id)
+    job = session.query(CalculationJob).filter_by(plan_hash=key).one_or_none()
+    if job is not None and job.status != CalculationJob.FAILED:
+        return job, False
+
+    if job is None:
+        job = CalculationJob(id=uuid.uuid4().hex, plan_hash=key, plan=json.dumps(list(servings_by_id.items())))
+        session.add(job)
+    job.status = CalculationJob.QUEUED
+    job.progress = 0.0
+    job.result = None
+    job.error = None
+    try:
+        session.commit()
+    except IntegrityError:
+        # A concurrent request queued the same plan first
+        session.rollback()
+        return session.query(CalculationJob).filter_by(plan_hash=key).one(), False
+    return job, True
+
+def _seconds_ago(dialect: str, seconds: float):
+    """
+    An updated_at cutoff computed in the database.
+
+    updated_at is written by the database clock (in the session time zone
+    on PostgreSQL), so cutoffs must come from the same clock.
+    """
+    if dialect == 'sqlite':
+        # CURRENT_TIMESTAMP text in UTC, as the column stores it
+        return func.datetime('now', f'-{int(seconds)} seconds')
+    return func.now() - timedelta(seconds=seconds)
+
+class JobWorker:
+    """
+    Claims and runs queued calculation jobs.
+
+    Any number of workers (threads or processes) may poll the same table;
+    a job is only run by the worker whose UPDATE moved it out of the queue.
+    Running jobs that report no progress for ``stale_after`` seconds are
+    assumed abandoned and claimed again. Done and failed jobs are purged
+    ``retention`` seconds after they finished, at most once a minute.
+    """
+
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self, processes: int, chunk_size: int, poll_interval: float, stale_after: float,
+                 retention: float):
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.retention = retention
+        self._purged_at = 0.0
+        self._executor: Optional[Executor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the background worker thread if it is not running."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.run_forever, name='calculation-jobs', daemon=True)
+                self._thread.start()
+
+    def notify(self) -> None:
+        """Wake the worker thread early, e.g. after a job was queued."""
+        self._wake.set()
+
+    def run_forever(self, stop: Optional[threading.Event] = None) -> None:
+        """Run jobs as they are queued, polling every ``poll_interval`` seconds."""
+        while stop is None or not stop.is_set():
+            try:
+                ran = self.run_pending()
+            except Exception as e:
+                logger.error(f"Error polling calculation jobs: {e}")
+                ran = 0
+            if not ran:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def run_pending(self) -> int:
+        """Claim and run jobs until the queue is empty; returns how many ran."""
+        if time.monotonic() - self._purged_at >= self.PURGE_INTERVAL:
+            self._purged_at = time.monotonic()
+            self.purge_finished()
+        ran = 0
+        while True:
+            job_id = self._claim()
+            if job_id is None:
+                return ran
+            self._run(job_id)
+            ran += 1
+
+    def purge_finished(self) -> int:
+        """Delete done and failed jobs older than ``retention``; returns how many went."""
+        with Session() as session:
+            purged = cast(CursorResult, session.execute(
+                delete(CalculationJob).where(
+                    CalculationJob.status.in_([CalculationJob.DONE, CalculationJob.FAILED]),
+                    CalculationJob.updated_at < _seconds_ago(session.get_bind().dialect.name, self.retention)
+                )
+            )).rowcount
+            session.commit()
+        if purged:
+            logger.info(f"Purged {purged} finished calculation jobs")
+        return purged
+
+    def _claimable(self, dialect: str):
+        return or_(
+            CalculationJob.status == CalculationJob.QUEUED,
+            and_(
+                CalculationJob.status == CalculationJob.RUNNING,
+                CalculationJob.updated_at < _seconds_ago(dialect, self.stale_after)
+            )
+        )
+
+    def _claim(self) -> Optional[str]:
+        with Session() as session:
+            dialect = session.get_bind().dialect.name
+            candidates = [
+                job_id for (job_id,) in session.query(CalculationJob.id)
+                .filter(self._claimable(dialect))
+                .order_by(CalculationJob.created_at)
+                .limit(10)
+            ]
+            for job_id in candidates:
+                claimed = cast(CursorResult, session.execute(
+                    update(CalculationJob)
+                    .where(CalculationJob.id == job_id, self._claimable(dialect))
+                    .values(status=CalculationJob.RUNNING, progress=0.0)
+                )).rowcount
+                session.commit()
+                if claimed:
+                    return job_id
+        return None
+
+    def _run(self, job_id: str) -> None:
+        with Session() as session:
+            job = session.get(CalculationJob, job_id)
+            if job is None:
+                # Purged or deleted between the claim and now
+                logger.warning(f"Calculation job {job_id} no longer exists")
+                return
+            try:
+                servings_by_id = {recipe_id: servings for recipe_id, servings in json.loads(job.plan)}
+                compiled = recipe_vectors.get_many(session, servings_by_id)
+                missing = [recipe_id for recipe_id in servings_by_id if recipe_id not in compiled]
+                if missing:
+                    raise LookupError(f'Recipes not found: {", ".join(str(recipe_id) for recipe_id in missing)}')
+
+                ids, weights = recipe_vectors.weighted_rows(compiled, servings_by_id)
+                # Sum over the groups the plan uses, not the whole ingredient index
+                groups, local = np.unique(ids, return_inverse=True)
+                totals = self._sum(session, job, local, weights, len(groups))
+                job.result = json.dumps(
+                    recipe_vectors.format_shopping_list(ids, dict(zip(groups.tolist(), totals.tolist())))
+                )
+                job.status = CalculationJob.DONE
+                job.progress = 1.0
+                session.commit()
+                logger.info(f"Calculation job {job_id} finished: {len(servings_by_id)} recipes, {len(ids)} rows")
+            except Exception as e:
+                session.rollback()
+                logger.error(f"Calculation job {job_id} failed: {e}")
+                job.status = CalculationJob.FAILED
+                job.error = str(e)
+                session.commit()
+
+    def _sum(self, session, job: CalculationJob, ids: np.ndarray, weights: np.ndarray, size: int) -> np.ndarray:
+        """Sum the rows in chunks on the process pool, committing progress per chunk."""
+        starts = range(0, len(ids), self.chunk_size)
+        executor = self._get_executor()
+        if executor is None or len(starts) <= 1:
+            return sum_chunk(ids, weights, size)
+
+        futures = [
+            executor.submit(sum_chunk, ids[start:start + self.chunk_size], weights[start:start + self.chunk_size], size)
+            for start in starts
+        ]
+        totals = np.zeros(size, dtype=np.float64)
+        for done, future in enumerate(as_completed(futures), start=1):
+            totals += future.result()
+            job.progress = done / len(futures)
+            session.commit()
+        return totals
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.processes < 1:
+            return None
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a threaded web worker can deadlock the child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+job_worker = JobWorker(
+    Config.JOBS_PROCESSES,
+    Config.JOBS_CHUNK_SIZE,
+    Config.JOBS_POLL_INTERVAL,
+    Config.JOBS_STALE_AFTER,
+    Config.JOBS_RETENTION
+)
@@ -0,0 +1,164 @@
+"""
+In-process performance metrics in Prometheus text format.
+
+Request latency is recorded per route in histograms, and every SQL
+statement is timed through SQLAlchemy cursor events, both globally and per
+request, so slow requests can log their query breakdown. Other modules
+expose their own counters (e.g. cache hits and misses) by registering a
+collector that is read at scrape time. Metrics are per process; scrape
+each worker or aggregate them in Prometheus.
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import threading
+import time
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[Dict[str, str], float]
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def format_family(name: str, kind: str, help_text: str, samples: Iterable[Sample]) -> Iterator[str]:
+    """Render one metric family in the Prometheus text exposition format."""
+    yield f'# HELP {name} {help_text}'
+    yield f'# TYPE {name} {kind}'
+    for labels, value in samples:
+        yield f'{name}{_format_labels(labels)} {_format_value(value)}'
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def collect(self) -> Iterator[str]:
+        with self._lock:
+            samples = [(dict(key), value) for key, value in self._values.items()]
+        return format_family(self.name, 'counter', self.help_text, samples)
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (non-cumulative, +Inf last), sum]
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(sorted(labels.items())))
+        return sum(series[0]) if series else 0
+
+    def collect(self) -> Iterator[str]:
+        with self._lock:
+            series = [(dict(key), list(counts), total[0]) for key, (counts, total) in self._series.items()]
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float('inf')), counts):
+                cumulative += count
+                bucket_labels = {**labels, 'le': _format_value(bound)}
+                yield f'{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(labels)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(labels)} {cumulative}'
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Request latency by route.'
+)
+requests_total = Counter(
+    'http_requests_total', 'Requests by route and status code.'
+)
+request_queries = Histogram(
+    'http_request_db_queries', 'Database queries per request by route.', QUERY_COUNT_BUCKETS
+)
+request_query_duration = Histogram(
+    'http_request_db_duration_seconds', 'Time spent in database queries per request by route.'
+)
+query_duration = Histogram(
+    'db_query_duration_seconds', 'Latency of individual database queries, including background work.'
+)
+slow_requests_total = Counter(
+    'http_slow_requests_total', 'Requests slower than SLOW_REQUEST_THRESHOLD_MS by route.'
+)
+
+_metrics: List[Union[Counter, Histogram]] = [request_duration, requests_total, request_queries, request_query_duration, query_duration, slow_requests_total]
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+def register_collector(collector: Callable[[], Iterable[str]]) -> Callable[[], Iterable[str]]:
+    """Register a callback yielding exposition lines (see ``format_family``) at scrape time."""
+    _collectors.append(collector)
+    return collector
+
+def render() -> str:
+    """Render every metric and registered collector."""
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.collect())
+    for collector in _collectors:
+        lines.extend(collector())
+    return '\n'.join(lines) + '\n'
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _stop_query_timer(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    query_duration.observe(elapsed)
+    if has_request_context():
+        queries: Optional[list] = g.get('queries')
+        if queries is not None:
+            queries.append((statement, elapsed))
+
+@event.listens_for(Engine, 'handle_error')
+def _discard_query_timer(exception_context) -> None:
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start'):
+        connection.info['query_start'].pop()
@@ -2,23 +2,55 @@ import time
 import logging
 from typing import Any
 from flask import Flask, request, g
+from . import metrics
+from .profiling import init_profiling
 
 logger = logging.getLogger(__name__)
 
 def init_middleware(app: Flask) -> None:
     """Initialize all middleware for the application."""
     
+    # Registered first so a profiled request also covers the hooks below
+    init_profiling(app)
+    
     @app.before_request
     def before_request() -> None:
-        g.start_time = time.time()
+        g.start_time = time.perf_counter()
+        g.queries = []
         
     @app.after_request
     def after_request(response: Any) -> Any:
-        if hasattr(g, 'start_time'):
-            elapsed = time.time() - g.start_time
-            logger.info(
-                f"Request: {request.method} {request.path} "
-                f"Status: {response.status_code} "
-                f"Duration: {elapsed:.2f}s"
+        if 'start_time' not in g:
+            return response
+        
+        elapsed = time.perf_counter() - g.start_time
+        queries = g.get('queries', [])
+        query_time = sum(duration for _, duration in queries)
+        # Route templates keep label cardinality bounded (no ids, no 404 paths)
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        
+        metrics.request_duration.observe(elapsed, method=request.method, route=route)
+        metrics.requests_total.inc(method=request.method, route=route, status=str(response.status_code))
+        metrics.request_queries.observe(len(queries), route=route)
+        metrics.request_query_duration.observe(query_time, route=route)
+        
+        logger.info(
+            f"Request: {request.method} {request.path} "
+            f"Status: {response.status_code} "
+            f"Duration: {elapsed * 1000:.2f}ms "
+            f"Queries: {len(queries)} ({query_time * 1000:.2f}ms)"
+        )
+        
+        threshold = app.config.get('SLOW_REQUEST_THRESHOLD_MS', 500)
+        if threshold is not None and elapsed * 1000 >= threshold:
+            metrics.slow_requests_total.inc(route=route)
+            slowest = sorted(queries, key=lambda query: query[1], reverse=True)[:10]
+            breakdown = '\n'.join(
+                f"  {duration * 1000:8.2f}ms  {' '.join(statement.split())[:200]}"
+                for statement, duration in slowest
+            )
+            logger.warning(
+                f"Slow request: {request.method} {request.path} took {elapsed * 1000:.2f}ms, "
+                f"{len(queries)} queries in {query_time * 1000:.2f}ms; slowest:\n{breakdown}"
             )
-        return response
\ No newline at end of file
+        return response
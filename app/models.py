@@ -1,24 +1,96 @@
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, ForeignKey, Table, Index, event, inspect
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, relationship
 from sqlalchemy.sql import func
+from datetime import datetime
 import json
-from typing import List, Set, Dict, Any
+from typing import List, Set, Dict, Any, Iterable, Optional
+from .validation import validate_recipe
 import logging
 
 logger = logging.getLogger(__name__)
 
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
+
+# Latest migration in migrations/versions; bump it with every new migration.
+# init_db stamps new databases with it and startup checks against it.
+SCHEMA_REVISION = 'recipe_version'
+
+recipe_categories = Table(
+    'recipe_categories',
+    Base.metadata,
+    Column('recipe_id', Integer, ForeignKey('recipes.id', ondelete='CASCADE'), primary_key=True),
+    Column('category_id', Integer, ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True),
+    Index('idx_recipe_categories_category', 'category_id', 'recipe_id')
+)
+
+def normalize_categories(categories: List[str]) -> List[str]:
+    """Drop duplicate category names while keeping their original order."""
+    return list(dict.fromkeys(categories))
+
+class Category(Base):
+    __tablename__ = 'categories'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String, nullable=False, unique=True)
+    recipe_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self) -> str:
+        """String representation of Category instance."""
+        return f"<Category {self.id}: {self.name}>"
+
+class RecipeIngredient(Base):
+    __tablename__ = 'recipe_ingredients'
+    __table_args__ = (
+        Index('idx_recipe_ingredients_name', 'name', 'recipe_id'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    recipe_id: Mapped[int] = mapped_column(Integer, ForeignKey('recipes.id', ondelete='CASCADE'), nullable=False, index=True)
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    amount: Mapped[float] = mapped_column(Float, nullable=False)
+    unit: Mapped[str] = mapped_column(String, nullable=False)
+
+    def __repr__(self) -> str:
+        """String representation of RecipeIngredient instance."""
+        return f"<RecipeIngredient {self.recipe_id}: {self.amount} {self.unit} {self.name}>"
+
+def build_ingredient_rows(ingredients: List[Dict[str, Any]]) -> List[RecipeIngredient]:
+    """Build normalized ingredient rows mirroring a recipe's ingredient list."""
+    return [
+        RecipeIngredient(
+            position=position,
+            name=ingredient['name'],
+            amount=ingredient['amount'],
+            unit=ingredient['unit']
+        )
+        for position, ingredient in enumerate(ingredients)
+    ]
 
 class Recipe(Base):
     __tablename__ = 'recipes'
+    # Fields that may be requested from to_dict()/GET /recipes?fields=
+    SERIALIZABLE_FIELDS = ('id', 'name', 'ingredients', 'servings', 'categories', 'created_at', 'updated_at')
     
-    id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
-    ingredients = Column(Text, nullable=False)
-    servings = Column(Integer, nullable=False)
-    categories = Column(Text, nullable=False)
-    created_at = Column(DateTime, nullable=False, server_default=func.now())
-    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String, nullable=False)
+    ingredients: Mapped[str] = mapped_column(Text, nullable=False)
+    servings: Mapped[int] = mapped_column(Integer, nullable=False)
+    categories: Mapped[str] = mapped_column(Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    # Bumped by every flush that changes the recipe; updated_at only has
+    # one-second resolution on SQLite, too coarse to validate caches with
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default='1')
+
+    category_links: Mapped[List[Category]] = relationship('Category', secondary=recipe_categories, lazy='select')
+    ingredient_rows: Mapped[List[RecipeIngredient]] = relationship(
+        'RecipeIngredient',
+        cascade='all, delete-orphan',
+        order_by='RecipeIngredient.position',
+        lazy='select'
+    )
 
     @property
     def ingredients_list(self) -> List[Dict[str, Any]]:
@@ -43,7 +115,7 @@ class Recipe(Base):
             return set()
 
     @classmethod
-    def from_dict(cls, data: Dict[str, Any]) -> 'Recipe':
+    def from_dict(cls, data: Dict[str, Any], validate: bool = True) -> 'Recipe':
         """
         Create a Recipe instance from a dictionary.
         
@@ -53,6 +125,8 @@ class Recipe(Base):
                 - ingredients: List[Dict[str, Any]]
                 - servings: int
                 - categories: List[str] (optional)
+            validate: Run validate_recipe first; callers that already did
+                may pass False
                 
         Returns:
             Recipe: New Recipe instance
@@ -61,59 +135,50 @@ class Recipe(Base):
             ValueError: If required fields are missing or invalid
         """
         try:
-            # Validate required fields
-            if not data.get('name'):
-                raise ValueError("Recipe name is required")
-            
-            if not isinstance(data.get('servings'), int) or data['servings'] < 1:
-                raise ValueError("Valid servings number is required")
-            
-            if not isinstance(data.get('ingredients'), list) or not data['ingredients']:
-                raise ValueError("At least one ingredient is required")
-            
-            # Validate each ingredient
-            for i, ingredient in enumerate(data['ingredients']):
-                if not isinstance(ingredient, dict):
-                    raise ValueError(f"Ingredient {i+1} must be a dictionary")
-                if not ingredient.get('name'):
-                    raise ValueError(f"Ingredient {i+1} name is required")
-                if not isinstance(ingredient.get('amount'), (int, float)) or ingredient['amount'] <= 0:
-                    raise ValueError(f"Ingredient {i+1} must have a valid amount")
-                if not isinstance(ingredient.get('unit'), str):
-                    raise ValueError(f"Ingredient {i+1} must have a valid unit")
+            if validate:
+                errors = validate_recipe(data)
+                if errors:
+                    raise ValueError('; '.join(errors))
             
             # Create Recipe instance
             return cls(
                 name=data['name'],
                 ingredients=json.dumps(data['ingredients']),
                 servings=data['servings'],
-                categories=json.dumps(data.get('categories', []))
+                categories=json.dumps(normalize_categories(data.get('categories', []))),
+                ingredient_rows=build_ingredient_rows(data['ingredients'])
             )
             
         except Exception as e:
             logger.error(f"Error creating recipe from dict: {e}")
             raise
 
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
         """
         Convert Recipe instance to dictionary.
         
+        Args:
+            fields: Optional subset of SERIALIZABLE_FIELDS to include. Only
+                these attributes are touched, so columns deferred with
+                ``load_only`` are never loaded.
+        
         Returns:
-            Dict containing all recipe data
+            Dict containing the requested recipe data (all fields by default)
             
         Raises:
             Exception: If there's an error converting data
         """
         try:
-            return {
-                'id': self.id,
-                'name': self.name,
-                'ingredients': self.ingredients_list,
-                'servings': self.servings,
-                'categories': list(self.categories_set),
-                'created_at': self.created_at.isoformat() if self.created_at else None,
-                'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            serializers = {
+                'id': lambda: self.id,
+                'name': lambda: self.name,
+                'ingredients': lambda: self.ingredients_list,
+                'servings': lambda: self.servings,
+                'categories': lambda: list(self.categories_set),
+                'created_at': lambda: self.created_at.isoformat() if self.created_at else None,
+                'updated_at': lambda: self.updated_at.isoformat() if self.updated_at else None
             }
+            return {field: serializers[field]() for field in (fields or self.SERIALIZABLE_FIELDS)}
         except Exception as e:
             logger.error(f"Error converting recipe {self.id} to dict: {e}")
             raise
@@ -133,36 +198,149 @@ class Recipe(Base):
             ValueError: If provided data is invalid
         """
         try:
+            errors = validate_recipe(data, partial=True)
+            if errors:
+                raise ValueError('; '.join(errors))
+            
             if 'name' in data:
-                if not data['name']:
-                    raise ValueError("Recipe name cannot be empty")
                 self.name = data['name']
             
             if 'servings' in data:
-                if not isinstance(data['servings'], int) or data['servings'] < 1:
-                    raise ValueError("Servings must be a positive integer")
                 self.servings = data['servings']
             
             if 'ingredients' in data:
-                if not isinstance(data['ingredients'], list) or not data['ingredients']:
-                    raise ValueError("At least one ingredient is required")
-                # Validate ingredients
-                for i, ingredient in enumerate(data['ingredients']):
-                    if not isinstance(ingredient, dict):
-                        raise ValueError(f"Ingredient {i+1} must be a dictionary")
-                    if not ingredient.get('name'):
-                        raise ValueError(f"Ingredient {i+1} name is required")
-                    if not isinstance(ingredient.get('amount'), (int, float)) or ingredient['amount'] <= 0:
-                        raise ValueError(f"Ingredient {i+1} must have a valid amount")
-                    if not isinstance(ingredient.get('unit'), str):
-                        raise ValueError(f"Ingredient {i+1} must have a valid unit")
                 self.ingredients = json.dumps(data['ingredients'])
+                self.ingredient_rows = build_ingredient_rows(data['ingredients'])
             
             if 'categories' in data:
-                if not isinstance(data['categories'], list):
-                    raise ValueError("Categories must be a list")
-                self.categories = json.dumps(data['categories'])
+                self.categories = json.dumps(normalize_categories(data['categories']))
                 
         except Exception as e:
             logger.error(f"Error updating recipe {self.id}: {e}")
-            raise
\ No newline at end of file
+            raise
+
+@event.listens_for(Session, 'before_flush')
+def bump_recipe_versions(session: Session, flush_context: Any, instances: Any) -> None:
+    """Increment ``version`` on every changed recipe, in SQL so concurrent writers both count."""
+    for obj in session.dirty:
+        if not isinstance(obj, Recipe):
+            continue
+        # Columns only: replaced ingredient_rows keep the recipe dirty for a
+        # second flush in the same commit, which must not count again
+        state = inspect(obj, raiseerr=True)
+        if any(
+            state.attrs[column.key].history.has_changes()
+            for column in state.mapper.column_attrs if column.key != 'version'
+        ):
+            # Applied as UPDATE ... SET version = version + 1
+            obj.version = Recipe.version + 1
+
+@event.listens_for(Session, 'before_flush')
+def sync_category_links(session: Session, flush_context: Any, instances: Any) -> None:
+    """
+    Mirror the JSON ``categories`` column into the normalized tables.
+
+    Runs for every new, deleted or category-changed recipe, so
+    ``recipe_categories`` always matches what ``from_dict``/``update`` wrote
+    and each ``Category.recipe_count`` is adjusted by the links gained or lost.
+    The ids of touched recipes are collected in ``session.info`` so caches
+    can be invalidated once the transaction commits.
+    """
+    touched = [obj for obj in (*session.new, *session.dirty, *session.deleted) if isinstance(obj, Recipe)]
+    if touched:
+        session.info.setdefault('recipes_changed', set()).update(
+            recipe.id for recipe in touched if recipe.id is not None
+        )
+
+    recipes = [obj for obj in session.new if isinstance(obj, Recipe)]
+    recipes.extend(
+        obj for obj in session.dirty
+        if isinstance(obj, Recipe) and inspect(obj, raiseerr=True).attrs.categories.history.has_changes()
+    )
+    deleted = [obj for obj in session.deleted if isinstance(obj, Recipe)]
+    if not recipes and not deleted:
+        return
+
+    wanted = {recipe: normalize_categories(json.loads(recipe.categories or '[]')) for recipe in recipes}
+    names = {name for cats in wanted.values() for name in cats}
+    deltas: Dict[Category, int] = {}
+
+    with session.no_autoflush:
+        existing = {}
+        if names:
+            existing = {
+                category.name: category
+                for category in session.query(Category).filter(Category.name.in_(names))
+            }
+        for name in names - existing.keys():
+            existing[name] = Category(name=name, recipe_count=0)
+            session.add(existing[name])
+
+        for recipe, cats in wanted.items():
+            previous = set() if recipe in session.new else set(recipe.category_links)
+            current = [existing[name] for name in cats]
+            for category in set(current) - previous:
+                deltas[category] = deltas.get(category, 0) + 1
+            for category in previous - set(current):
+                deltas[category] = deltas.get(category, 0) - 1
+            recipe.category_links = current
+
+        for recipe in deleted:
+            for category in recipe.category_links:
+                deltas[category] = deltas.get(category, 0) - 1
+
+    for category, delta in deltas.items():
+        if not delta:
+            continue
+        if category in session.new:
+            category.recipe_count += delta
+        else:
+            # Applied as UPDATE ... SET recipe_count = recipe_count + delta
+            category.recipe_count = Category.recipe_count + delta
+
+class CalculationJob(Base):
+    __tablename__ = 'calculation_jobs'
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    id: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # Content hash of the plan (see compiled.plan_hash); identical plans share a job
+    plan_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+    plan: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default=QUEUED, index=True)
+    progress: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    result: Mapped[Optional[str]] = mapped_column(Text)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.DONE, self.FAILED)
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        """
+        Convert CalculationJob instance to dictionary.
+
+        Args:
+            include_result: Include the stored shopping list once the job is done
+        """
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'progress': round(self.progress, 4),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        if self.status == self.FAILED:
+            data['error'] = self.error
+        if include_result and self.status == self.DONE and self.result is not None:
+            data['result'] = json.loads(self.result)
+        return data
+
+    def __repr__(self) -> str:
+        """String representation of CalculationJob instance."""
+        return f"<CalculationJob {self.id}: {self.status}>"
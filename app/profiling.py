@@ -0,0 +1,164 @@
+"""
+Opt-in profiling of individual requests.
+
+With PROFILING_ENABLED set, a request carrying a valid signed token (the
+``X-Profile-Token`` header or ``_profile`` query parameter) is profiled and
+the output written to PROFILING_DIR:
+
+- ``cprofile``: deterministic cProfile stats (``.prof``, open with pstats
+  or snakeviz)
+- ``sampling``: stacks sampled every PROFILING_SAMPLE_INTERVAL seconds in
+  collapsed format (``.collapsed``, one ``frame;frame;frame count`` line
+  per stack, for flamegraph.pl or speedscope)
+
+Tokens are ``<expiry>.<hmac>`` signed with PROFILING_SECRET; create one
+with ``flask profile-token``. When profiling is disabled no hooks are
+registered at all.
+"""
+from collections import Counter
+from datetime import datetime
+from typing import Any, Optional, Union
+from flask import Flask, current_app, g, request
+import cProfile
+import hashlib
+import hmac
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ('cprofile', 'sampling')
+
+def make_profile_token(secret: str, ttl: int = 3600) -> str:
+    """Create a profiling token valid for ttl seconds."""
+    expires = str(int(time.time()) + ttl)
+    signature = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f'{expires}.{signature}'
+
+def verify_profile_token(secret: str, token: Optional[str]) -> bool:
+    """Check a token's signature and expiry."""
+    if not secret or not token or '.' not in token:
+        return False
+    expires, signature = token.split('.', 1)
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(signature, expected):
+        return False
+    return expires.isdigit() and int(expires) >= time.time()
+
+class SamplingProfiler:
+    """
+    Samples one thread's Python stack from a background thread.
+
+    Stacks are aggregated into collapsed-stack counts; the profiled thread
+    itself runs unmodified.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._sampler.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+def _requested_mode(app: Flask) -> str:
+    mode = request.headers.get('X-Profile-Mode') or request.args.get('_profile_mode')
+    return mode if mode in PROFILE_MODES else app.config.get('PROFILING_MODE', 'cprofile')
+
+def _output_path(directory: str, mode: str) -> str:
+    route = request.url_rule.rule if request.url_rule else request.path
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'index'
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    suffix = 'prof' if mode == 'cprofile' else 'collapsed'
+    return os.path.join(directory, f'{stamp}-{request.method}-{slug}-{uuid.uuid4().hex[:8]}.{suffix}')
+
+def _stop(save: bool) -> Optional[str]:
+    """Stop the active request profiler, writing its output when save is set."""
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return None
+    mode = g.pop('profiler_mode')
+    if mode == 'cprofile':
+        profiler.disable()
+    else:
+        profiler.stop()
+    if not save:
+        return None
+
+    directory = current_app.config['PROFILING_DIR']
+    os.makedirs(directory, exist_ok=True)
+    path = _output_path(directory, mode)
+    if mode == 'cprofile':
+        profiler.dump_stats(path)
+    else:
+        profiler.dump(path)
+    logger.info(f"Profiled {request.method} {request.path} to {path}")
+    return path
+
+def init_profiling(app: Flask) -> None:
+    """Register the profiling hooks, only when PROFILING_ENABLED is set."""
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+    if not app.config.get('PROFILING_SECRET'):
+        logger.warning("PROFILING_ENABLED is set without PROFILING_SECRET; profiling stays off")
+        return
+
+    @app.before_request
+    def start_profiler() -> None:
+        token = request.headers.get('X-Profile-Token') or request.args.get('_profile')
+        if token is None or not verify_profile_token(app.config['PROFILING_SECRET'], token):
+            return
+        mode = _requested_mode(app)
+        profiler: Union[cProfile.Profile, SamplingProfiler]
+        if mode == 'cprofile':
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # Another profiler is already active in this thread
+                logger.warning(f"Could not profile {request.path}: {e}")
+                return
+        else:
+            profiler = SamplingProfiler(app.config.get('PROFILING_SAMPLE_INTERVAL', 0.001))
+            profiler.start()
+        g.profiler = profiler
+        g.profiler_mode = mode
+
+    @app.after_request
+    def save_profile(response: Any) -> Any:
+        path = _stop(save=True)
+        if path is not None:
+            response.headers['X-Profile-File'] = os.path.basename(path)
+        return response
+
+    @app.teardown_request
+    def discard_profile(exc: Optional[BaseException]) -> None:
+        # Requests that raised never reach after_request
+        _stop(save=exc is not None)
@@ -0,0 +1,290 @@
+"""
+Token-bucket rate limiting kept in process memory.
+
+``LocalBucketStorage`` holds one token bucket per rate limit key, so
+checking a limit never leaves the process. Two storage URIs are accepted:
+
+- ``local://``: buckets live in memory only, for single-node and test
+  deployments
+- ``local+redis://host:port/db``: a background thread also reconciles
+  consumption with Redis every ``sync_interval`` seconds in one pipelined
+  batch. Each node adds what it consumed to a per-period hash (one field
+  per node) and reads back what the other nodes consumed, which is then
+  withheld from its own buckets.
+
+Cluster-wide limits are approximate: other nodes' traffic is seen up to one
+sync interval late (and only for keys this node is already tracking), and
+while Redis is unreachable every node limits on its own. Use the storage
+with the ``token-bucket`` strategy (RATELIMIT_MODE=local or memory, see
+config.py), which ``TokenBucketLimiter`` accepts in place of Flask-Limiter's
+built-in strategies.
+"""
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, cast
+from flask import Flask
+from flask_limiter import Limiter
+from limits.limits import RateLimitItem
+from limits.storage import Storage
+from limits.strategies import RateLimiter
+from limits.util import WindowStats
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+
+if TYPE_CHECKING:
+    from redis import Redis
+
+logger = logging.getLogger(__name__)
+
+SWEEP_INTERVAL = 60  # seconds between evictions of idle buckets
+
+TOKEN_BUCKET = 'token-bucket'
+
+class TokenBucket:
+    """Up to ``capacity`` tokens, refilled continuously at capacity per period."""
+
+    __slots__ = ('capacity', 'period', 'tokens', 'updated', 'remote', 'pending')
+
+    def __init__(self, capacity: int, period: float, now: float):
+        self.capacity = capacity
+        self.period = period
+        self.tokens = float(capacity)
+        self.updated = now
+        self.remote = 0.0  # consumed by other nodes over the last period
+        self.pending = 0.0  # consumed here since the last sync
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.capacity / self.period)
+            self.updated = now
+
+    @property
+    def available(self) -> float:
+        return self.tokens - self.remote
+
+    @property
+    def idle(self) -> bool:
+        return self.tokens >= self.capacity and not self.pending and not self.remote
+
+class LocalBucketStorage(Storage):
+    """
+    Rate limit storage keeping token buckets in process memory.
+
+    The fixed-window counter methods required by ``limits`` are implemented
+    locally as well (never synced), so the storage also works with the
+    built-in strategies.
+    """
+
+    STORAGE_SCHEME = ['local', 'local+redis']
+
+    def __init__(self, uri: Optional[str] = None, sync_interval: float = 1.0, socket_timeout: float = 0.5,
+                 key_prefix: str = 'ratelimit', wrap_exceptions: bool = False, **options: Any):
+        self.sync_interval = sync_interval
+        self.key_prefix = key_prefix
+        self.node_id = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._counters: Dict[str, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+        self._sync_thread: Optional[threading.Thread] = None
+        self._sync_failing = False
+        self.redis: Optional['Redis'] = None
+        if uri and uri.startswith('local+redis://'):
+            import redis
+            self.redis = redis.Redis.from_url(
+                'redis://' + uri[len('local+redis://'):],
+                socket_timeout=socket_timeout,
+                socket_connect_timeout=socket_timeout
+            )
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self) -> Any:
+        import redis
+        return redis.RedisError
+
+    def _bucket(self, key: str, capacity: int, period: float, now: float) -> TokenBucket:
+        """Return the refilled bucket for key, creating it if needed. Call with the lock held."""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.refill(now)
+            return bucket
+        if now - self._last_sweep >= SWEEP_INTERVAL:
+            self._sweep(now)
+        if self.redis is not None and self._sync_thread is None:
+            self._sync_thread = threading.Thread(target=self._sync_forever, name='ratelimit-sync', daemon=True)
+            self._sync_thread.start()
+        bucket = self._buckets[key] = TokenBucket(capacity, period, now)
+        return bucket
+
+    def _sweep(self, now: float) -> None:
+        """Drop full, idle buckets and expired counters. Call with the lock held."""
+        for key, bucket in list(self._buckets.items()):
+            bucket.refill(now)
+            if bucket.idle:
+                del self._buckets[key]
+        for key, (_, expires) in list(self._counters.items()):
+            if expires <= now:
+                del self._counters[key]
+        self._last_sweep = now
+
+    def acquire(self, key: str, capacity: int, period: float, cost: int = 1) -> bool:
+        """Take cost tokens from key's bucket, returning False if too few are available."""
+        now = time.time()
+        with self._lock:
+            bucket = self._bucket(key, capacity, period, now)
+            if bucket.available < cost:
+                return False
+            bucket.tokens -= cost
+            bucket.pending += cost
+            return True
+
+    def peek(self, key: str, capacity: int, period: float) -> Tuple[float, float]:
+        """Return (available tokens, time the bucket is full again) without consuming."""
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return float(capacity), now
+            bucket.refill(now)
+            return bucket.available, now + (capacity - bucket.available) * period / capacity
+
+    def sync(self) -> None:
+        """Push local consumption to Redis and pull the other nodes' consumption."""
+        if self.redis is None:
+            return
+        now = time.time()
+        with self._lock:
+            batch = [(key, bucket.period, bucket.pending) for key, bucket in self._buckets.items()]
+            for bucket in self._buckets.values():
+                bucket.pending = 0.0
+        if not batch:
+            return
+
+        import redis
+        pipe = self.redis.pipeline(transaction=False)
+        reads: List[Tuple[str, float, int]] = []
+        position = 0
+        for key, period, delta in batch:
+            window = int(now // period)
+            current = f'{self.key_prefix}:{key}:{window}'
+            if delta:
+                pipe.hincrbyfloat(current, self.node_id, delta)
+                pipe.expire(current, int(period * 2) + 1)
+                position += 2
+            reads.append((key, period, position))
+            position += 2
+            pipe.hgetall(current)
+            pipe.hgetall(f'{self.key_prefix}:{key}:{window - 1}')
+        try:
+            replies = pipe.execute()
+        except redis.RedisError as e:
+            if not self._sync_failing:
+                logger.warning(f"Rate limit sync failed, limiting per node until Redis is back: {e}")
+            self._sync_failing = True
+            with self._lock:
+                for bucket in self._buckets.values():
+                    bucket.remote = 0.0
+            return
+        if self._sync_failing:
+            logger.info("Rate limit sync recovered")
+            self._sync_failing = False
+
+        with self._lock:
+            for key, period, offset in reads:
+                tracked = self._buckets.get(key)
+                if tracked is None:
+                    continue
+                # Sliding window estimate over the last period
+                overlap = 1 - (now % period) / period
+                tracked.remote = self._others(replies[offset]) + self._others(replies[offset + 1]) * overlap
+
+    def _others(self, counts: Dict[Any, Any]) -> float:
+        node = self.node_id.encode()
+        return sum(float(value) for field, value in counts.items() if field != node)
+
+    def _sync_forever(self) -> None:
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Rate limit sync error: {e}")
+
+    def incr(self, key: str, expiry: float, amount: int = 1, **kwargs: Any) -> int:
+        now = time.time()
+        with self._lock:
+            count, expires = self._counters.get(key, (0, 0.0))
+            if expires <= now:
+                count, expires = 0, now + expiry
+            count += amount
+            self._counters[key] = (count, expires)
+            return count
+
+    def get(self, key: str) -> int:
+        count, expires = self._counters.get(key, (0, 0.0))
+        return count if expires > time.time() else 0
+
+    def get_expiry(self, key: str) -> float:
+        return self._counters.get(key, (0, time.time()))[1]
+
+    def check(self) -> bool:
+        # Limits are enforced locally, so the storage is always usable
+        return True
+
+    def reset(self) -> Optional[int]:
+        with self._lock:
+            cleared = len(self._buckets) + len(self._counters)
+            self._buckets.clear()
+            self._counters.clear()
+        return cleared
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._buckets.pop(key, None)
+            self._counters.pop(key, None)
+
+class TokenBucketRateLimiter(RateLimiter):
+    """
+    Token bucket strategy: a limit of N per period allows bursts of up to N
+    requests and refills continuously at N per period.
+    """
+
+    def __init__(self, storage: Storage):
+        if not isinstance(storage, LocalBucketStorage):
+            raise NotImplementedError("The token-bucket strategy needs local:// or local+redis:// storage")
+        super().__init__(storage)
+        self.buckets = storage
+
+    def hit(self, item: RateLimitItem, *identifiers: str, cost: int = 1) -> bool:
+        return self.buckets.acquire(item.key_for(*identifiers), item.amount, item.get_expiry(), cost)
+
+    def test(self, item: RateLimitItem, *identifiers: str, cost: int = 1) -> bool:
+        available, _ = self.buckets.peek(item.key_for(*identifiers), item.amount, item.get_expiry())
+        return available >= cost
+
+    def get_window_stats(self, item: RateLimitItem, *identifiers: str) -> WindowStats:
+        available, reset_at = self.buckets.peek(item.key_for(*identifiers), item.amount, item.get_expiry())
+        return WindowStats(reset_at, max(0, math.floor(available)))
+
+class TokenBucketLimiter(Limiter):
+    """
+    Flask-Limiter extension that also accepts ``strategy='token-bucket'``.
+
+    Flask-Limiter only resolves strategies from limits' global registry.
+    Rather than adding to that registry, the extension is initialized with
+    the fixed-window strategy and its limiter replaced by a token bucket
+    over the same storage.
+    """
+
+    def init_app(self, app: Flask) -> None:
+        token_bucket = (self._strategy or app.config.get('RATELIMIT_STRATEGY')) == TOKEN_BUCKET
+        if token_bucket:
+            self._strategy = 'fixed-window'
+        super().init_app(app)
+        if token_bucket:
+            self._strategy = TOKEN_BUCKET
+            self._limiter = TokenBucketRateLimiter(cast(Storage, self._storage))
@@ -1,55 +1,120 @@
-from flask import Blueprint, render_template, request, jsonify, current_app
-from .models import Recipe
+from flask import Blueprint, Response, render_template, request, jsonify, current_app, url_for, stream_with_context
+from .models import Recipe, RecipeIngredient, Category, CalculationJob, recipe_categories
 from .security import require_csrf, sanitize_input, limiter, generate_csrf_token
-from .database import db_session, cache
-from typing import List, Dict, Any
-from sqlalchemy import or_
+from .validation import validate_recipe, parse_selections
+from .database import db_session, get_category_names
+from .cache import cache, cache_stats
+from .importer import import_recipes, iter_ndjson
+from .compiled import recipe_vectors, shopping_lists, plan_hash
+from .jobs import event_streams, job_worker, submit_plan
+from .search import search_recipe_ids
+from .serialization import recipe_json, recipes_json
+from . import metrics
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import load_only
 import json
 import logging
+import time
 
 bp = Blueprint('main', __name__)
 logger = logging.getLogger(__name__)
 
-def validate_recipe(data: Dict[str, Any]) -> List[str]:
-    """Validate recipe data and return list of errors if any."""
-    errors = []
+def category_filter(categories: List[str], filter_type: str = 'OR'):
+    """
+    Build a subquery of recipe ids matching the given categories.
+
+    OR matches recipes linked to any of the categories; AND keeps only recipes
+    linked to all of them via GROUP BY/HAVING COUNT. Both are exact name
+    matches resolved through the indexed ``recipe_categories`` join table.
+    """
+    names = set(categories)
+    subquery = (
+        select(recipe_categories.c.recipe_id)
+        .join(Category, Category.id == recipe_categories.c.category_id)
+        .where(Category.name.in_(names))
+    )
+    if filter_type == 'AND':
+        subquery = (
+            subquery
+            .group_by(recipe_categories.c.recipe_id)
+            .having(func.count(recipe_categories.c.category_id) == len(names))
+        )
+    return subquery
+
+def parse_fields(value: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a ``fields=`` projection into Recipe field names.
     
-    if not data.get('name'):
-        errors.append("Recipe name is required")
+    Returns:
+        The requested fields with ``id`` always first, or None for all fields
+        
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in Recipe.SERIALIZABLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(['id', *fields]))
+
+def recipe_page_query(categories: List[str], filter_type: str, ingredient: Optional[str],
+                      after: Optional[int], limit: int, fields: Optional[List[str]] = None):
+    """
+    Build the SELECT for one page of ``GET /recipes``.
+
+    One extra row is fetched so the caller can tell whether another page
+    follows. Shared by the WSGI route and the ASGI read path.
+    """
+    query = select(Recipe)
+    if fields:
+        query = query.options(load_only(*(getattr(Recipe, field) for field in fields)))
     
-    if not isinstance(data.get('servings'), int) or data['servings'] < 1:
-        errors.append("Servings must be a positive integer")
+    if categories:
+        query = query.where(Recipe.id.in_(category_filter(categories, filter_type)))
     
-    if not isinstance(data.get('ingredients'), list) or not data['ingredients']:
-        errors.append("At least one ingredient is required")
-    else:
-        for i, ingredient in enumerate(data['ingredients']):
-            if not isinstance(ingredient, dict):
-                errors.append(f"Ingredient {i+1} is invalid")
-                continue
-            if not ingredient.get('name'):
-                errors.append(f"Ingredient {i+1} name is required")
-            if not isinstance(ingredient.get('amount'), (int, float)) or ingredient['amount'] <= 0:
-                errors.append(f"Ingredient {i+1} amount must be a positive number")
-            if not isinstance(ingredient.get('unit'), str) or not ingredient['unit']:
-                errors.append(f"Ingredient {i+1} unit is required")
-    
-    if not isinstance(data.get('categories', []), list):
-        errors.append("Categories must be a list")
-    
-    return errors
+    if ingredient:
+        query = query.where(Recipe.id.in_(
+            select(RecipeIngredient.recipe_id).where(RecipeIngredient.name == ingredient)
+        ))
+    
+    if after is not None:
+        query = query.where(Recipe.id > after)
+    
+    return query.order_by(Recipe.id).limit(limit + 1)
+
+def plan_shopping_list(session, servings_by_id: Dict[int, float]
+                       ) -> Tuple[List[int], Optional[List[Dict[str, Any]]], Optional[str], bool]:
+    """
+    Compute the shopping list for one plan through the result cache.
+    
+    Returns:
+        The ids that do not exist, the shopping list, its result cache key
+        and whether it was a cache hit; the last three are None/False when
+        any recipe is missing
+    """
+    compiled = recipe_vectors.get_many(session, servings_by_id)
+    missing = [recipe_id for recipe_id in servings_by_id if recipe_id not in compiled]
+    if missing:
+        return missing, None, None, False
+    
+    key = plan_hash(compiled, servings_by_id)
+    total_ingredients = shopping_lists.get(key)
+    hit = total_ingredients is not None
+    if not hit:
+        total_ingredients = recipe_vectors.shopping_list(compiled, servings_by_id)
+        shopping_lists.set(key, servings_by_id, total_ingredients)
+        logger.info(f"Successfully calculated ingredients: {total_ingredients}")
+    return missing, total_ingredients, key, hit
 
 @bp.route('/')
 def index():
     """Home page route with CSRF token."""
-    with db_session() as session:
-        categories = session.query(Recipe.categories).distinct().all()
-        unique_categories = set()
-        for cat_json in categories:
-            cats = json.loads(cat_json[0])
-            unique_categories.update(cats)
+    with db_session(readonly=True) as session:
         return render_template('index.html', 
-                             categories=sorted(list(unique_categories)),
+                             categories=get_category_names(session),
                              csrf_token=generate_csrf_token())
 
 @bp.route('/recipes', methods=['POST'])
@@ -70,7 +135,7 @@ def add_recipe():
     
     try:
         with db_session() as session:
-            recipe = Recipe.from_dict(data)
+            recipe = Recipe.from_dict(data, validate=False)
             session.add(recipe)
             session.commit()
             logger.info(f"Successfully added recipe with ID: {recipe.id}")
@@ -87,31 +152,191 @@ def add_recipe():
             'message': 'Failed to add recipe'
         }), 500
 
+@bp.route('/recipes/import', methods=['POST'])
+@require_csrf
+@limiter.limit("5 per minute")
+def bulk_import_recipes():
+    """
+    Import many recipes in one request.
+    
+    Accepts a JSON array, or NDJSON (one recipe per line) when sent as
+    ``application/x-ndjson``. Every row is validated and sanitized like
+    ``add_recipe``; invalid rows are reported without aborting the import.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        rows = iter_ndjson(request.get_data(as_text=True).splitlines())
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({
+                'status': 'error',
+                'message': 'Expected a JSON array of recipes or NDJSON'
+            }), 400
+    
+    try:
+        with db_session() as session:
+            result = import_recipes(session, rows, current_app.config.get('IMPORT_BATCH_SIZE', 500))
+    except Exception as e:
+        logger.error(f"Error importing recipes: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to import recipes'
+        }), 500
+    
+    return jsonify({
+        'status': 'success' if not result['failed'] else 'partial',
+        **result
+    })
+
 @bp.route('/recipes', methods=['GET'])
 @limiter.limit("100 per minute")
+@cache()
 def get_recipes():
-    """API route returning JSON - removed cache temporarily for debugging."""
+    """
+    API route returning one page of recipes as JSON.
+    
+    Query parameters:
+        category, filter_type, ingredient: Optional filters
+        limit: Page size (defaults to RECIPES_PAGE_SIZE, capped at RECIPES_MAX_PAGE_SIZE)
+        after: Keyset cursor; only recipes with a larger id are returned
+        fields: Comma-separated subset of Recipe.SERIALIZABLE_FIELDS
+    
+    The cursor for the next page is returned in the ``X-Next-Cursor`` header
+    and as a ``Link: rel="next"`` URL; both are absent on the last page.
+    """
     categories = request.args.getlist('category')
     filter_type = request.args.get('filter_type', 'OR')
+    ingredient = request.args.get('ingredient')
     
     try:
-        with db_session() as session:
-            query = session.query(Recipe)
-            
-            if categories:
-                if filter_type == 'AND':
-                    for category in categories:
-                        query = query.filter(Recipe.categories.contains(category))
-                else:  # OR
-                    conditions = [Recipe.categories.contains(category) for category in categories]
-                    query = query.filter(or_(*conditions))
-            
-            recipes = query.all()
+        limit = request.args.get('limit', current_app.config.get('RECIPES_PAGE_SIZE', 100), type=int)
+        after = request.args.get('after', type=int)
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    limit = max(1, min(limit, current_app.config.get('RECIPES_MAX_PAGE_SIZE', 1000)))
+    
+    try:
+        with db_session(readonly=True) as session:
+            query = recipe_page_query(categories, filter_type, ingredient, after, limit, fields)
+            recipes = session.execute(query).scalars().all()
+            has_more = len(recipes) > limit
+            recipes = recipes[:limit]
             logger.info(f"Fetched {len(recipes)} recipes")
-            return jsonify([recipe.to_dict() for recipe in recipes])
+            
+            response = Response(recipes_json(recipes, fields), mimetype='application/json')
+            if has_more:
+                next_cursor = recipes[-1].id
+                args = request.args.to_dict(flat=False)
+                args.update(after=next_cursor, limit=limit)
+                response.headers['X-Next-Cursor'] = str(next_cursor)
+                response.headers['Link'] = f'<{url_for("main.get_recipes", **args)}>; rel="next"'
+            return response
     except Exception as e:
         logger.error(f"Error fetching recipes: {str(e)}")
-        return jsonify([])
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to fetch recipes'
+        }), 500
+
+@bp.route('/recipes/search', methods=['GET'])
+@limiter.limit("300 per minute")
+@cache()
+def search_recipes():
+    """
+    Full-text search over recipe names, ingredient names and categories.
+    
+    Query parameters:
+        q: Search text; each word matches as a prefix, so it suits typeahead
+        limit: Maximum results (defaults to SEARCH_PAGE_SIZE, capped at SEARCH_MAX_PAGE_SIZE)
+        fields: Comma-separated subset of Recipe.SERIALIZABLE_FIELDS
+    
+    Results are ordered by relevance (BM25 on SQLite).
+    """
+    q = request.args.get('q', '')
+    try:
+        limit = request.args.get('limit', current_app.config.get('SEARCH_PAGE_SIZE', 20), type=int)
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    limit = max(1, min(limit, current_app.config.get('SEARCH_MAX_PAGE_SIZE', 100)))
+    
+    try:
+        with db_session(readonly=True) as session:
+            recipe_ids = search_recipe_ids(
+                session, q, limit, current_app.config.get('SEARCH_MAX_CANDIDATES', 1000)
+            )
+            if not recipe_ids:
+                return jsonify([])
+            query = session.query(Recipe).filter(Recipe.id.in_(recipe_ids))
+            if fields:
+                query = query.options(load_only(*(getattr(Recipe, field) for field in fields)))
+            recipes = {recipe.id: recipe for recipe in query}
+            logger.info(f"Search {q!r} matched {len(recipe_ids)} recipes")
+            return Response(
+                recipes_json((recipes[recipe_id] for recipe_id in recipe_ids if recipe_id in recipes), fields),
+                mimetype='application/json'
+            )
+    except Exception as e:
+        logger.error(f"Error searching recipes: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Search failed'
+        }), 500
+
+@bp.route('/recipes/export', methods=['GET'])
+@limiter.limit("5 per minute")
+def export_recipes():
+    """
+    Stream the whole recipe catalog for bulk sync jobs.
+    
+    Query parameters:
+        format: ``ndjson`` (default, one recipe per line) or ``json`` (array)
+        fields: Comma-separated subset of Recipe.SERIALIZABLE_FIELDS
+    
+    Rows are read in EXPORT_BATCH_SIZE batches and written out as they are
+    serialized, so memory use does not grow with the catalog size.
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'json'):
+        return jsonify({
+            'status': 'error',
+            'message': 'format must be ndjson or json'
+        }), 400
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    
+    def generate():
+        with db_session(readonly=True) as session:
+            statement = select(Recipe).order_by(Recipe.id).execution_options(yield_per=batch_size)
+            if fields:
+                statement = statement.options(load_only(*(getattr(Recipe, field) for field in fields)))
+            
+            if export_format == 'json':
+                yield '['
+            for count, recipe in enumerate(session.execute(statement).scalars()):
+                item = recipe_json(recipe, fields)
+                if export_format == 'json':
+                    yield item if count == 0 else ',' + item
+                else:
+                    yield item + '\n'
+            if export_format == 'json':
+                yield ']'
+    
+    mimetype = 'application/x-ndjson' if export_format == 'ndjson' else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
 
 @bp.route('/calculate-ingredients', methods=['POST'])
 @require_csrf
@@ -120,54 +345,33 @@ def calculate_ingredients():
     data = request.get_json()
     logger.info(f"Calculating ingredients for recipes: {data}")
     
-    if not isinstance(data.get('recipes'), list):
-        logger.error("Invalid request format - recipes not a list")
+    try:
+        servings_by_id = parse_selections(data.get('recipes') if isinstance(data, dict) else None)
+    except ValueError as e:
+        logger.error(f"Invalid calculation request: {e}")
         return jsonify({
             'status': 'error',
-            'message': 'Invalid request format'
+            'message': str(e)
         }), 400
     
-    if not data['recipes']:
+    if not servings_by_id:
         return jsonify([])
     
-    total_ingredients = {}
-    
     try:
         with db_session() as session:
-            for recipe_selection in data['recipes']:
-                if not isinstance(recipe_selection.get('servings'), (int, float)) or recipe_selection['servings'] < 0:
-                    logger.error(f"Invalid servings for recipe {recipe_selection.get('id')}")
-                    return jsonify({
-                        'status': 'error',
-                        'message': f'Invalid servings for recipe {recipe_selection.get("id")}'
-                    }), 400
-                
-                recipe = session.query(Recipe).get(recipe_selection['id'])
-                if not recipe:
-                    logger.error(f"Recipe {recipe_selection['id']} not found")
-                    return jsonify({
-                        'status': 'error',
-                        'message': f'Recipe {recipe_selection["id"]} not found'
-                    }), 404
-                
-                multiplier = recipe_selection['servings'] / recipe.servings
-                
-                for ingredient in recipe.ingredients_list:
-                    key = f"{ingredient['name']}_{ingredient['unit']}"
-                    if key not in total_ingredients:
-                        total_ingredients[key] = {
-                            'name': ingredient['name'],
-                            'amount': 0,
-                            'unit': ingredient['unit']
-                        }
-                    total_ingredients[key]['amount'] += ingredient['amount'] * multiplier
-            
-            # Round amounts to 2 decimal places
-            for ingredient in total_ingredients.values():
-                ingredient['amount'] = round(ingredient['amount'], 2)
+            missing, total_ingredients, key, hit = plan_shopping_list(session, servings_by_id)
+            if missing:
+                logger.error(f"Recipes {missing} not found")
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Recipes not found: {", ".join(str(recipe_id) for recipe_id in missing)}',
+                    'missing_ids': missing
+                }), 404
             
-            logger.info(f"Successfully calculated ingredients: {list(total_ingredients.values())}")
-            return jsonify(list(total_ingredients.values()))
+            response = jsonify(total_ingredients)
+            response.headers['X-Result-Cache'] = 'HIT' if hit else 'MISS'
+            response.headers['X-Result-Cache-Key'] = key
+            return response
     except Exception as e:
         logger.error(f"Error calculating ingredients: {str(e)}")
         return jsonify({
@@ -175,18 +379,250 @@ def calculate_ingredients():
             'message': 'Failed to calculate ingredients'
         }), 500
 
+@bp.route('/calculate-ingredients/batch', methods=['POST'])
+@require_csrf
+@limiter.limit("20 per minute")
+def calculate_ingredients_batch():
+    """
+    Calculate shopping lists for several named plans in one request.
+
+    Expects ``{"plans": [{"name": ..., "recipes": [...]}, ...], "total": bool}``
+    where each ``recipes`` list follows the /calculate-ingredients format.
+    The union of all selected recipes is loaded once and every plan, plus
+    the grand total when requested, is aggregated together.
+    """
+    data = request.get_json(silent=True)
+    plans = data.get('plans') if isinstance(data, dict) else None
+    max_plans = current_app.config.get('BATCH_MAX_PLANS', 100)
+
+    if not isinstance(plans, list) or not plans:
+        return jsonify({
+            'status': 'error',
+            'message': 'At least one plan is required'
+        }), 400
+    if len(plans) > max_plans:
+        return jsonify({
+            'status': 'error',
+            'message': f'At most {max_plans} plans are allowed per request'
+        }), 400
+
+    names = []
+    selections = []
+    for position, plan in enumerate(plans):
+        name = plan.get('name') if isinstance(plan, dict) else None
+        if not isinstance(name, str) or not name.strip():
+            return jsonify({
+                'status': 'error',
+                'message': f'Plan {position} needs a name'
+            }), 400
+        if name in names:
+            return jsonify({
+                'status': 'error',
+                'message': f'Duplicate plan name: {name}'
+            }), 400
+        try:
+            selections.append(parse_selections(plan.get('recipes')))
+        except ValueError as e:
+            logger.error(f"Invalid batch calculation request: {e}")
+            return jsonify({
+                'status': 'error',
+                'message': f'Plan {name}: {e}'
+            }), 400
+        names.append(name)
+
+    recipe_ids = list(dict.fromkeys(recipe_id for plan in selections for recipe_id in plan))
+
+    try:
+        with db_session() as session:
+            compiled = recipe_vectors.get_many(session, recipe_ids)
+            missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in compiled]
+            if missing:
+                logger.error(f"Recipes {missing} not found")
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Recipes not found: {", ".join(str(recipe_id) for recipe_id in missing)}',
+                    'missing_ids': missing
+                }), 404
+
+            shopping, total = recipe_vectors.batch_shopping_lists(
+                compiled, selections, include_total=bool(data.get('total'))
+            )
+            logger.info(f"Calculated {len(names)} plans over {len(recipe_ids)} recipes")
+
+            result = {'plans': [
+                {'name': name, 'ingredients': ingredients} for name, ingredients in zip(names, shopping)
+            ]}
+            if total is not None:
+                result['total'] = total
+            return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error calculating batch ingredients: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to calculate ingredients'
+        }), 500
+
+@bp.route('/jobs/calculate', methods=['POST'])
+@require_csrf
+@limiter.limit("20 per minute")
+def submit_calculation_job():
+    """
+    Queue a shopping list calculation for a large plan.
+    
+    Identical plans (same recipes, servings and recipe contents) share one
+    job, so resubmitting returns the existing job and its stored result.
+    """
+    data = request.get_json(silent=True)
+    
+    try:
+        servings_by_id = parse_selections(data.get('recipes') if isinstance(data, dict) else None)
+    except ValueError as e:
+        logger.error(f"Invalid calculation job: {e}")
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
+    
+    if not servings_by_id:
+        return jsonify({
+            'status': 'error',
+            'message': 'At least one recipe is required'
+        }), 400
+    
+    try:
+        with db_session() as session:
+            compiled = recipe_vectors.get_many(session, servings_by_id)
+            missing = [recipe_id for recipe_id in servings_by_id if recipe_id not in compiled]
+            if missing:
+                logger.error(f"Recipes {missing} not found")
+                return jsonify({
+                    'status': 'error',
+                    'message': f'Recipes not found: {", ".join(str(recipe_id) for recipe_id in missing)}',
+                    'missing_ids': missing
+                }), 404
+            
+            job, queued = submit_plan(session, compiled, servings_by_id)
+            body = job.to_dict()
+            body['deduplicated'] = not queued
+    except Exception as e:
+        logger.error(f"Error submitting calculation job: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to submit calculation job'
+        }), 500
+    
+    if queued:
+        logger.info(f"Queued calculation job {body['job_id']} for {len(servings_by_id)} recipes")
+        if current_app.config.get('JOBS_INLINE_WORKER', True):
+            job_worker.start()
+        job_worker.notify()
+    
+    response = jsonify(body)
+    response.status_code = 200 if body['status'] == CalculationJob.DONE else 202
+    response.headers['Location'] = url_for('main.get_calculation_job', job_id=body['job_id'])
+    return response
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+@limiter.limit("300 per minute")
+def get_calculation_job(job_id):
+    """Job status and progress, plus the shopping list once done."""
+    # Job state is read from the primary: replicas may lag behind progress updates
+    with db_session() as session:
+        job = session.get(CalculationJob, job_id)
+        if job is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Job not found'
+            }), 404
+        return jsonify(job.to_dict())
+
+@bp.route('/jobs/<job_id>/events', methods=['GET'])
+@limiter.limit("30 per minute")
+def stream_calculation_job(job_id):
+    """
+    Stream job progress as server-sent events.
+    
+    An event named after the job status is sent whenever the status or
+    progress changes; the stream ends after the ``done`` or ``failed``
+    event (which carries the result or error) or after JOBS_EVENTS_TIMEOUT.
+    Each event carries an id, so a client reconnecting with
+    ``Last-Event-ID`` only gets changes it has not seen, and a 204 once it
+    already has the final event. Each worker serves at most
+    JOBS_EVENTS_MAX_STREAMS streams at a time; beyond that it answers 503.
+    """
+    last_event_id = request.headers.get('Last-Event-ID')
+    with db_session() as session:
+        job = session.get(CalculationJob, job_id)
+        if job is None:
+            return jsonify({
+                'status': 'error',
+                'message': 'Job not found'
+            }), 404
+        state = job.to_dict(include_result=False)
+        if job.finished and last_event_id == f"{state['status']}:{state['progress']}":
+            return '', 204
+    
+    if not event_streams.acquire(current_app.config.get('JOBS_EVENTS_MAX_STREAMS', 8)):
+        response = jsonify({
+            'status': 'error',
+            'message': 'Too many open progress streams; poll /jobs/<job_id> or retry shortly'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    
+    interval = current_app.config.get('JOBS_POLL_INTERVAL', 1.0)
+    deadline = time.monotonic() + current_app.config.get('JOBS_EVENTS_TIMEOUT', 25)
+    
+    def generate():
+        last = last_event_id
+        while True:
+            with db_session() as session:
+                job = session.get(CalculationJob, job_id)
+                if job is None:
+                    return
+                finished = job.finished
+                state = job.to_dict(include_result=finished)
+            event_id = f"{state['status']}:{state['progress']}"
+            if event_id != last:
+                last = event_id
+                yield f"event: {state['status']}\nid: {event_id}\ndata: {json.dumps(state)}\n\n"
+            if finished or time.monotonic() >= deadline:
+                return
+            time.sleep(interval)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.call_on_close(event_streams.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @bp.route('/categories', methods=['GET'])
 @limiter.limit("200 per minute")
+@cache()
 def get_categories():
     try:
-        with db_session() as session:
-            categories = session.query(Recipe.categories).distinct().all()
-            unique_categories = set()
-            for cat_json in categories:
-                cats = json.loads(cat_json[0])
-                unique_categories.update(cats)
-            logger.info(f"Fetched {len(unique_categories)} unique categories")
-            return jsonify(sorted(list(unique_categories)))
+        with db_session(readonly=True) as session:
+            categories = get_category_names(session, use_cache=False)
+            logger.info(f"Fetched {len(categories)} unique categories")
+            return jsonify(categories)
     except Exception as e:
         logger.error(f"Error fetching categories: {str(e)}")
-        return jsonify([])
\ No newline at end of file
+        return jsonify({
+            'status': 'error',
+            'message': 'Failed to fetch categories'
+        }), 500
+
+@bp.route('/cache/stats', methods=['GET'])
+@limiter.limit("100 per minute")
+def get_cache_stats():
+    """Hit/miss counters for the response cache tiers and the shopping list cache."""
+    stats = cache_stats()
+    stats['results'] = shopping_lists.stats()
+    return jsonify(stats)
+
+@bp.route('/metrics', methods=['GET'])
+@limiter.exempt
+def get_metrics():
+    """Request, database and cache metrics in Prometheus text format."""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
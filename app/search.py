@@ -0,0 +1,140 @@
+"""
+Full-text recipe search.
+
+On SQLite, recipe names, ingredient names and categories are indexed in the
+``recipe_search`` FTS5 table (rowid = recipe id). Triggers on ``recipes``
+keep it in sync for every write path, including bulk imports and raw SQL,
+and queries are ranked with BM25 with every term matched as a prefix for
+typeahead. Other backends fall back to case-insensitive substring matching.
+"""
+from typing import List
+from sqlalchemy import event, func, or_, select, text
+from sqlalchemy.engine import Connection, Engine
+from .models import Category, Recipe, RecipeIngredient, recipe_categories
+import re
+
+# Extract the searchable text from a recipe row's JSON columns
+_INGREDIENT_TEXT = (
+    "(SELECT group_concat(json_extract(value, '$.name'), ' ') "
+    "FROM json_each(CASE WHEN json_valid({row}.ingredients) THEN {row}.ingredients ELSE '[]' END))"
+)
+_CATEGORY_TEXT = (
+    "(SELECT group_concat(value, ' ') "
+    "FROM json_each(CASE WHEN json_valid({row}.categories) THEN {row}.categories ELSE '[]' END))"
+)
+
+def _index_row(row: str) -> str:
+    return (
+        f"INSERT INTO recipe_search(rowid, name, ingredients, categories) "
+        f"VALUES ({row}.id, {row}.name, {_INGREDIENT_TEXT.format(row=row)}, {_CATEGORY_TEXT.format(row=row)});"
+    )
+
+SEARCH_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS recipe_search USING fts5("
+    "name, ingredients, categories, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+    "CREATE TRIGGER IF NOT EXISTS recipes_search_insert AFTER INSERT ON recipes BEGIN "
+    f"{_index_row('new')} END",
+    "CREATE TRIGGER IF NOT EXISTS recipes_search_update AFTER UPDATE OF name, ingredients, categories ON recipes BEGIN "
+    f"DELETE FROM recipe_search WHERE rowid = old.id; {_index_row('new')} END",
+    "CREATE TRIGGER IF NOT EXISTS recipes_search_delete AFTER DELETE ON recipes BEGIN "
+    "DELETE FROM recipe_search WHERE rowid = old.id; END"
+]
+
+# Column weights for bm25(): name matches rank above ingredients, then categories
+BM25_WEIGHTS = (10.0, 3.0, 1.0)
+
+# Queries made only of prefixes this short rank a bounded set of candidates
+SHORT_PREFIX = 2
+
+_TERMS = re.compile(r'\w+', re.UNICODE)
+
+def install_search_index(connection: Connection) -> None:
+    """
+    Create the FTS5 table and its triggers if missing (SQLite only).
+
+    A newly created index is backfilled from the existing recipes.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recipe_search'")
+    ).first()
+    for statement in SEARCH_INDEX_DDL:
+        connection.exec_driver_sql(statement)
+    if not exists:
+        connection.exec_driver_sql(
+            "INSERT INTO recipe_search(rowid, name, ingredients, categories) "
+            f"SELECT r.id, r.name, {_INGREDIENT_TEXT.format(row='r')}, {_CATEGORY_TEXT.format(row='r')} "
+            "FROM recipes AS r"
+        )
+
+def ensure_search_index(engine: Engine) -> None:
+    """Install the search index on an existing database."""
+    with engine.begin() as connection:
+        install_search_index(connection)
+
+@event.listens_for(Recipe.__table__, 'after_create')
+def _create_search_index(target, connection: Connection, **kw) -> None:
+    install_search_index(connection)
+
+@event.listens_for(Recipe.__table__, 'after_drop')
+def _drop_search_index(target, connection: Connection, **kw) -> None:
+    # The triggers go with the recipes table; the index must go too
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql('DROP TABLE IF EXISTS recipe_search')
+
+def parse_terms(q: str) -> List[str]:
+    """Split a query into word terms, dropping FTS5 operators and punctuation."""
+    return _TERMS.findall(q.lower())
+
+def fts_query(terms: List[str]) -> str:
+    """Build an FTS5 MATCH expression requiring every term as a prefix."""
+    return ' '.join(f'"{term}"*' for term in terms)
+
+def search_recipe_ids(session, q: str, limit: int, candidates: int = 1000) -> List[int]:
+    """
+    Return the ids of the best matching recipes, best first.
+
+    Every term must match the start of a word in the name, an ingredient
+    name or a category, so "chick bre" finds "Chicken breast".
+
+    Args:
+        session: Database session
+        q: Search text
+        limit: Maximum number of ids returned
+        candidates: When every term is a prefix of at most SHORT_PREFIX
+            characters, only the newest this many matches are ranked with
+            BM25. Such prefixes ("c", "ch") match most of the catalog and
+            scoring is linear in the number of matches; any longer term
+            ranks all matches.
+    """
+    terms = parse_terms(q)
+    if not terms:
+        return []
+    if session.get_bind().dialect.name == 'sqlite':
+        params = {
+            'query': fts_query(terms),
+            'rank': f"bm25({', '.join(str(weight) for weight in BM25_WEIGHTS)})",
+            'limit': limit
+        }
+        matches = "SELECT rowid, rank FROM recipe_search WHERE recipe_search MATCH :query AND rank MATCH :rank"
+        if max(len(term) for term in terms) <= SHORT_PREFIX:
+            matches = f"SELECT rowid, rank FROM ({matches} ORDER BY rowid DESC LIMIT :candidates)"
+            params['candidates'] = max(candidates, limit)
+        return list(session.execute(text(f"{matches} ORDER BY rank, rowid DESC LIMIT :limit"), params).scalars())
+    return _search_fallback(session, terms, limit)
+
+def _search_fallback(session, terms: List[str], limit: int) -> List[int]:
+    query = select(Recipe.id)
+    for term in terms:
+        pattern = f'%{term}%'
+        query = query.where(or_(
+            Recipe.name.ilike(pattern),
+            Recipe.id.in_(select(RecipeIngredient.recipe_id).where(RecipeIngredient.name.ilike(pattern))),
+            Recipe.id.in_(
+                select(recipe_categories.c.recipe_id)
+                .join(Category, Category.id == recipe_categories.c.category_id)
+                .where(Category.name.ilike(pattern))
+            )
+        ))
+    return list(session.execute(query.order_by(func.length(Recipe.name), Recipe.id).limit(limit)).scalars())
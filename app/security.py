@@ -1,17 +1,24 @@
 from functools import wraps
 from flask import request, abort, current_app
-from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-import bleach
+from .ratelimit import TokenBucketLimiter
 import hashlib
 import hmac
+import re
 import time
-import os
 from typing import Any, Callable, Dict, Union, List
 
+# Characters bleach.clean may change: markup, and control characters other
+# than tab and newline. Strings without any are returned unchanged.
+MARKUP_CHARS = re.compile('[<>&\x00-\x08\x0b-\x1f]')
+
 def sanitize_input(data: Any) -> Any:
     """Sanitize user input."""
     if isinstance(data, str):
+        if not MARKUP_CHARS.search(data):
+            return data
+        # bleach is slow to import and most input never needs it
+        import bleach
         return bleach.clean(data)
     elif isinstance(data, dict):
         return {k: sanitize_input(v) for k, v in data.items()}
@@ -19,25 +26,25 @@ def sanitize_input(data: Any) -> Any:
         return [sanitize_input(v) for v in data]
     return data
     
-def generate_csrf_token() -> str:
-    """Generate a CSRF token using the current hour."""
+def csrf_token(secret: str) -> str:
+    """Return the CSRF token for secret and the current hour."""
     return hmac.new(
-        current_app.config['CSRF_SECRET_KEY'].encode(),
+        secret.encode(),
         msg=str(int(time.time()) // 3600).encode(),
         digestmod=hashlib.sha256
     ).hexdigest()
 
+def generate_csrf_token() -> str:
+    """Generate a CSRF token using the current hour."""
+    return csrf_token(current_app.config['CSRF_SECRET_KEY'])
+
 def validate_csrf_token() -> None:
     """Validate CSRF token."""
     token = request.headers.get('X-CSRF-Token')
     if not token:
         abort(403, 'CSRF token missing')
     
-    expected = hmac.new(
-        current_app.config['CSRF_SECRET_KEY'].encode(),
-        msg=str(int(time.time()) // 3600).encode(),
-        digestmod=hashlib.sha256
-    ).hexdigest()
+    expected = csrf_token(current_app.config['CSRF_SECRET_KEY'])
     
     if not hmac.compare_digest(token, expected):
         abort(403, 'Invalid CSRF token')
@@ -50,14 +57,9 @@ def require_csrf(f: Callable) -> Callable:
         return f(*args, **kwargs)
     return decorated_function
 
-# Initialize rate limiter with Redis storage
-redis_host = os.getenv('REDIS_HOST', 'localhost')
-redis_port = os.getenv('REDIS_PORT', '6379')
-
-limiter = Limiter(
+# Storage and strategy come from the RATELIMIT_* settings (see config.py);
+# TokenBucketLimiter adds the local token-bucket strategy
+limiter = TokenBucketLimiter(
     key_func=get_remote_address,
-    storage_uri=f"redis://{redis_host}:{redis_port}",
-    storage_options={"socket_connect_timeout": 30},
-    strategy="fixed-window",
     default_limits=["100 per minute"]
-)
\ No newline at end of file
+)
@@ -0,0 +1,70 @@
+"""
+Fast JSON serialization of recipes for list and export responses.
+
+``ingredients`` and ``categories`` are stored as JSON text written by
+``Recipe.from_dict``/``Recipe.update``, so they are spliced into the output
+as-is instead of being decoded into Python objects and encoded again. The
+remaining scalar fields are encoded with orjson when it is installed and
+with the standard library otherwise.
+"""
+from typing import Any, Iterable, Optional, Sequence
+from .models import Recipe
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore[assignment]
+
+def dumps(value: Any) -> str:
+    """Encode a value as compact JSON text."""
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, separators=(',', ':'))
+
+def _stored_list(text: Optional[str]) -> Optional[str]:
+    """Return stored JSON list text if it can be spliced, else None."""
+    if text and text[0] == '[' and text[-1] == ']':
+        return text
+    return None
+
+def _timestamp(value: Any) -> str:
+    return dumps(value.isoformat()) if value is not None else 'null'
+
+def recipe_json(recipe: Recipe, fields: Optional[Sequence[str]] = None) -> str:
+    """
+    Serialize a recipe to JSON text with the same fields as ``to_dict``.
+
+    Args:
+        recipe: Recipe to serialize
+        fields: Optional subset of Recipe.SERIALIZABLE_FIELDS (all by default);
+            only these attributes are touched
+
+    Categories are emitted in their stored order. Stored JSON that does not
+    look like a list falls back to the decoding properties, which log the
+    problem and return an empty list.
+    """
+    parts = []
+    for field in fields or Recipe.SERIALIZABLE_FIELDS:
+        if field == 'id':
+            value = str(recipe.id)
+        elif field == 'name':
+            value = dumps(recipe.name)
+        elif field == 'servings':
+            value = str(recipe.servings)
+        elif field == 'ingredients':
+            value = _stored_list(recipe.ingredients) or dumps(recipe.ingredients_list)
+        elif field == 'categories':
+            value = _stored_list(recipe.categories) or dumps(list(recipe.categories_set))
+        elif field == 'created_at':
+            value = _timestamp(recipe.created_at)
+        elif field == 'updated_at':
+            value = _timestamp(recipe.updated_at)
+        else:
+            raise ValueError(f"Unknown field: {field}")
+        parts.append(f'"{field}":{value}')
+    return '{' + ','.join(parts) + '}'
+
+def recipes_json(recipes: Iterable[Recipe], fields: Optional[Sequence[str]] = None) -> str:
+    """Serialize recipes to a JSON array."""
+    return '[' + ','.join(recipe_json(recipe, fields) for recipe in recipes) + ']'
@@ -2,6 +2,10 @@
 let recipes = [];
 let selectedRecipes = new Map();
 let categories = new Set();
+// Query of the listed recipes and the cursor of their next page (null on the last page)
+let recipeParams = new URLSearchParams();
+let nextRecipeCursor = null;
+let loadingMoreRecipes = false;
 
 // Utility functions
 function showLoading() {
@@ -37,6 +41,71 @@ function getCsrfToken() {
     return meta.content;
 }
 
+// Recipe fetching
+const RECIPE_LIST_FIELDS = 'id,name,servings,categories';
+const RECIPE_PAGE_SIZE = 200;
+
+async function fetchRecipePage(params, cursor = null, fetchOptions = {}, limit = RECIPE_PAGE_SIZE) {
+    const pageParams = new URLSearchParams(params);
+    pageParams.set('fields', RECIPE_LIST_FIELDS);
+    pageParams.set('limit', limit);
+    if (cursor !== null) {
+        pageParams.set('after', cursor);
+    }
+    
+    const response = await fetch(`/recipes?${pageParams.toString()}`, fetchOptions);
+    if (!response.ok) throw new Error('Failed to fetch recipes');
+    return {
+        recipes: await response.json(),
+        nextCursor: response.headers.get('X-Next-Cursor')
+    };
+}
+
+// Replace the list with the first page for params; later pages load on demand
+async function loadRecipes(params = new URLSearchParams(), fetchOptions = {}) {
+    const page = await fetchRecipePage(params, null, fetchOptions);
+    recipeParams = params;
+    recipes = page.recipes;
+    nextRecipeCursor = page.nextCursor;
+    displayRecipes();
+    return recipes;
+}
+
+async function loadMoreRecipes() {
+    if (nextRecipeCursor === null || loadingMoreRecipes) return;
+    loadingMoreRecipes = true;
+    try {
+        const page = await fetchRecipePage(recipeParams, nextRecipeCursor);
+        // Recipes added in this session are already listed at the top
+        const listed = new Set(recipes.map(recipe => recipe.id));
+        recipes.push(...page.recipes.filter(recipe => !listed.has(recipe.id)));
+        nextRecipeCursor = page.nextCursor;
+        displayRecipes();
+    } catch (error) {
+        console.error('Error loading more recipes:', error);
+        showNotification('Failed to load more recipes. Please try again.', 'error');
+    } finally {
+        loadingMoreRecipes = false;
+    }
+}
+
+// Show a recipe just created in this session; new ids land on the last page,
+// so it is fetched on its own under the current filter and listed first
+async function showAddedRecipe(recipeId) {
+    const page = await fetchRecipePage(recipeParams, recipeId - 1, {
+        headers: {
+            'Cache-Control': 'no-cache',
+            'Pragma': 'no-cache'
+        }
+    }, 1);
+    const recipe = page.recipes.find(r => r.id === recipeId);
+    if (recipe && !recipes.some(r => r.id === recipeId)) {
+        recipes.unshift(recipe);
+        displayRecipes();
+    }
+    return recipe;
+}
+
 // Recipe form handling
 function addIngredientInput() {
     const container = document.getElementById('ingredientInputs');
@@ -100,6 +169,7 @@ function updateCategoryFilters() {
 // Recipe list handling
 function displayRecipes() {
     const recipeList = document.getElementById('recipeList');
+    document.getElementById('loadMoreRecipes').classList.toggle('hidden', nextRecipeCursor === null);
     
     if (!recipes || recipes.length === 0) {
         recipeList.innerHTML = `
@@ -174,26 +244,11 @@ function filterRecipes() {
     const selectedCategories = Array.from(document.querySelectorAll('#categoryFilters input:checked'))
         .map(input => input.value);
     
-    const queryString = selectedCategories
-        .map(cat => `category=${encodeURIComponent(cat)}`)
-        .join('&');
+    const params = new URLSearchParams();
+    selectedCategories.forEach(cat => params.append('category', cat));
     
-    fetch(`/recipes?${queryString || ''}`)
-        .then(response => {
-            if (!response.ok) throw new Error('Failed to fetch filtered recipes');
-            return response.json();
-        })
-        .then(data => {
-            recipes = data;
-            // Update selected recipes to maintain only valid selections
-            const validRecipeIds = new Set(recipes.map(r => r.id));
-            for (const [recipeId] of selectedRecipes) {
-                if (!validRecipeIds.has(recipeId)) {
-                    selectedRecipes.delete(recipeId);
-                }
-            }
-            displayRecipes();
-        })
+    // Selections are kept: recipes on pages not loaded yet may still match
+    loadRecipes(params)
         .catch(error => {
             console.error('Filter error:', error);
             showNotification('Failed to filter recipes. Please try again.', 'error');
@@ -261,22 +316,10 @@ document.getElementById('addRecipeForm').onsubmit = function(e) {
     .then(data => {
         console.log('Recipe added successfully:', data);
         
-        return fetch('/recipes', {
-            method: 'GET',
-            headers: {
-                'Cache-Control': 'no-cache',
-                'Pragma': 'no-cache'
-            }
-        });
-    })
-    .then(response => {
-        if (!response.ok) throw new Error('Failed to fetch updated recipes');
-        return response.json();
+        return showAddedRecipe(data.recipe_id);
     })
     .then(data => {
-        console.log('Fetched updated recipes:', data);
-        recipes = data;
-        displayRecipes();
+        console.log('Fetched added recipe:', data);
         
         // Reset form
         e.target.reset();
@@ -353,10 +396,7 @@ async function initializeApp() {
         console.log('Fetching initial data...');
         
         const [recipesData, categoriesData] = await Promise.all([
-            fetch('/recipes').then(r => {
-                if (!r.ok) throw new Error('Failed to fetch recipes');
-                return r.json();
-            }),
+            loadRecipes(),
             fetch('/categories').then(r => {
                 if (!r.ok) throw new Error('Failed to fetch categories');
                 return r.json();
@@ -366,10 +406,8 @@ async function initializeApp() {
         console.log('Received initial recipes:', recipesData);
         console.log('Received categories:', categoriesData);
         
-        recipes = recipesData;
         categories = new Set(categoriesData);
         
-        displayRecipes();
         updateCategoryFilters();
     } catch (error) {
         console.error('Initialization error:', error);
@@ -384,4 +422,11 @@ document.addEventListener('DOMContentLoaded', function() {
     console.log('Initializing app...');
     addIngredientInput();
     initializeApp();
+    
+    // Load the next page as the "more" button scrolls into view
+    if ('IntersectionObserver' in window) {
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) loadMoreRecipes();
+        }).observe(document.getElementById('loadMoreRecipes'));
+    }
 });
\ No newline at end of file
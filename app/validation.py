@@ -0,0 +1,136 @@
+"""
+Request validation.
+
+Recipe payloads are checked against a declarative schema (RECIPE_SCHEMA)
+of fields with precompiled predicates, so ``validate_recipe`` walks a
+recipe and its ingredients in a single pass.
+``Recipe.from_dict`` and ``Recipe.update`` use the same validator.
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Union
+
+class Field(NamedTuple):
+    """
+    One key of a validation schema.
+
+    Args:
+        name: Key in the validated dict
+        check: Predicate the value must satisfy
+        message: Error reported when the value is missing or fails check
+        required: Whether the key must be present (ignored for partial updates)
+        items: Schema each dict element of a list value must satisfy (one
+            level deep), or a single Field each scalar element must pass
+        label: Prefix for item errors, e.g. "Ingredient" gives "Ingredient 2 ..."
+    """
+    name: str
+    check: Callable[[Any], bool]
+    message: str
+    required: bool = True
+    items: Optional[Union[Sequence['Field'], 'Field']] = None
+    label: str = ''
+
+# Checks for Field; JSON true/false are not numbers here
+def is_non_empty_string(value: Any) -> bool:
+    return isinstance(value, str) and bool(value)
+
+def is_positive_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 1
+
+def is_positive_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+def is_non_empty_list(value: Any) -> bool:
+    return isinstance(value, list) and bool(value)
+
+def is_list(value: Any) -> bool:
+    return isinstance(value, list)
+
+INGREDIENT_SCHEMA = (
+    Field('name', is_non_empty_string, "name is required"),
+    Field('amount', is_positive_number, "amount must be a positive number"),
+    Field('unit', is_non_empty_string, "unit is required")
+)
+
+RECIPE_SCHEMA = (
+    Field('name', is_non_empty_string, "Recipe name is required"),
+    Field('servings', is_positive_int, "Servings must be a positive integer"),
+    Field('ingredients', is_non_empty_list, "At least one ingredient is required",
+          items=INGREDIENT_SCHEMA, label='Ingredient'),
+    Field('categories', is_list, "Categories must be a list", required=False,
+          items=Field('', is_non_empty_string, "must be a non-empty string"), label='Category')
+)
+
+_MISSING = object()
+
+def validate_schema(schema: Sequence[Field], data: Dict[str, Any], partial: bool = False) -> List[str]:
+    """
+    Check a dict against a schema and return every error found.
+
+    Partial validation (for updates) only checks the keys that are present.
+    """
+    errors = []
+    for field in schema:
+        value = data.get(field.name, _MISSING)
+        if value is _MISSING:
+            if field.required and not partial:
+                errors.append(field.message)
+        elif not field.check(value):
+            errors.append(field.message)
+        elif isinstance(field.items, Field):
+            errors.extend(
+                f"{field.label} {i} {field.items.message}"
+                for i, item in enumerate(value, start=1) if not field.items.check(item)
+            )
+        elif field.items:
+            for i, item in enumerate(value, start=1):
+                if not isinstance(item, dict):
+                    errors.append(f"{field.label} {i} is invalid")
+                    continue
+                for item_field in field.items:
+                    item_value = item.get(item_field.name, _MISSING)
+                    if item_value is _MISSING and not item_field.required:
+                        continue
+                    if item_value is _MISSING or not item_field.check(item_value):
+                        errors.append(f"{field.label} {i} {item_field.message}")
+    return errors
+
+def validate_recipe(data: Any, partial: bool = False) -> List[str]:
+    """
+    Validate recipe data and return list of errors if any.
+
+    Args:
+        data: Recipe payload
+        partial: Only validate the fields present, as for an update
+    """
+    if not isinstance(data, dict):
+        return ["Recipe must be a JSON object"]
+    return validate_schema(RECIPE_SCHEMA, data, partial)
+
+def parse_selections(selections: Any) -> Dict[int, float]:
+    """
+    Validate a plan's recipe selections and merge repeated recipes.
+
+    Args:
+        selections: List of {'id': int, 'servings': number} dicts
+
+    Returns:
+        Requested servings per recipe id, in first-seen order
+
+    Raises:
+        ValueError: If the list or any selection is invalid
+    """
+    if not isinstance(selections, list):
+        raise ValueError("Invalid request format")
+
+    servings_by_id: Dict[int, float] = {}
+    for selection in selections:
+        if not isinstance(selection, dict):
+            raise ValueError("Invalid request format")
+        recipe_id = selection.get('id')
+        servings = selection.get('servings')
+        if not isinstance(servings, (int, float)) or isinstance(servings, bool) or servings < 0:
+            raise ValueError(f"Invalid servings for recipe {recipe_id}")
+        if not isinstance(recipe_id, int) or isinstance(recipe_id, bool):
+            raise ValueError(f"Invalid recipe id {recipe_id}")
+        # Repeated selections of the same recipe are merged before aggregating
+        servings_by_id[recipe_id] = servings_by_id.get(recipe_id, 0) + servings
+    return servings_by_id
@@ -0,0 +1,202 @@
+"""
+Load comparison of the WSGI deployment and the ASGI read path.
+
+Usage:
+    python -m benchmarks.asgi_load [--recipes 2000] [--ingredients 8] [--categories 20]
+                                   [--connections 256] [--think-ms 0] [--seconds 5]
+                                   [--workers 2] [--threads 8] [--output results.json]
+
+Builds a synthetic catalog in a temporary SQLite database and serves it
+twice over HTTP: with gunicorn (gthread, --workers x --threads) running the
+Flask app, and with uvicorn (--workers) running ``asgi:app``. For each read
+scenario, --connections keep-alive clients on one event loop send requests
+back to back (pausing --think-ms between them) for a fixed time, and
+throughput and p50/p95/p99 latency are reported per deployment. With more
+connections than WSGI threads, the WSGI latencies include queueing for a
+thread. Rate limiting is switched off; without a Redis server the response
+cache runs on its local tier. Results are stored as JSON (see
+benchmarks.compare).
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from benchmarks.catalog import generate_recipes
+from benchmarks.results import percentiles, save
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+Request = Tuple[str, str, bytes]
+
+def scenarios(recipes: int, categories: int) -> Dict[str, Any]:
+    """Request generators per scenario: (method, target, body)."""
+    return {
+        'GET /recipes': lambda rng: ('GET', f'/recipes?after={rng.randrange(recipes)}&limit=20', b''),
+        'GET /recipes?category': lambda rng: (
+            'GET', f'/recipes?category=Category+{rng.randrange(categories)}&limit=50', b''
+        ),
+        'GET /categories': lambda rng: ('GET', '/categories', b''),
+        'POST /calculate-ingredients': lambda rng: ('POST', '/calculate-ingredients', json.dumps({'recipes': [
+            {'id': rng.randint(1, recipes), 'servings': rng.randint(1, 12)} for _ in range(7)
+        ]}).encode())
+    }
+
+def deployments(workers: int, threads: int) -> Dict[str, List[str]]:
+    """Server command lines per deployment; {port} is filled in at start."""
+    return {
+        'wsgi': [sys.executable, '-m', 'gunicorn', '--bind', '127.0.0.1:{port}', '--workers', str(workers),
+                 '--threads', str(threads), '--worker-class', 'gthread', 'run:app'],
+        'asgi': [sys.executable, '-m', 'uvicorn', '--host', '127.0.0.1', '--port', '{port}', '--workers', str(workers),
+                 '--log-level', 'warning', '--no-access-log', 'asgi:app']
+    }
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+async def fetch(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: Request,
+                headers: Dict[str, str]) -> int:
+    """Send one HTTP/1.1 request on a keep-alive connection and read the whole response."""
+    method, target, body = request
+    head = f'{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n'
+    if body:
+        head += 'Content-Type: application/json\r\n'
+    head += ''.join(f'{name}: {value}\r\n' for name, value in headers.items())
+    writer.write(head.encode() + b'\r\n' + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def run_scenario(port: int, make_request: Any, headers: Dict[str, str], connections: int,
+                       think: float, seconds: float) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + seconds
+
+    async def client_loop(seed: int) -> None:
+        nonlocal errors
+        rng = random.Random(seed)
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                status = await fetch(reader, writer, make_request(rng), headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                errors += status >= 400
+                if think:
+                    await asyncio.sleep(think)
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(seed) for seed in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        **percentiles(latencies)
+    }
+
+def start_server(command: List[str], env: Dict[str, str]) -> Tuple[subprocess.Popen, int]:
+    """Start a server and wait until it answers on its port."""
+    port = free_port()
+    process = subprocess.Popen(
+        [part.replace('{port}', str(port)) for part in command],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}: {' '.join(command)}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Server did not start: {' '.join(command)}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--recipes', type=int, default=2000)
+    parser.add_argument('--ingredients', type=int, default=8)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--connections', type=int, default=256, help='Concurrent keep-alive clients')
+    parser.add_argument('--think-ms', type=float, default=0, help='Pause between requests per client')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--workers', type=int, default=2, help='Server processes per deployment')
+    parser.add_argument('--threads', type=int, default=8, help='Threads per WSGI worker')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/asgi_load-<timestamp>.json)')
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    env = {
+        **os.environ,
+        'DATABASE_URL': f'sqlite:///{path}',
+        'RATELIMIT_ENABLED': 'false',
+        'RATELIMIT_MODE': 'memory',
+        'JOBS_INLINE_WORKER': 'false',
+        'PYTHONPATH': ROOT
+    }
+    os.environ['DATABASE_URL'] = env['DATABASE_URL']
+    from app.database import get_engine, init_db
+    from app.importer import import_recipes
+    from app.security import csrf_token
+    from config import Config
+    from sqlalchemy.orm import sessionmaker
+
+    init_db()
+    engine = get_engine()
+    with sessionmaker(bind=engine)() as session:
+        import_recipes(session, generate_recipes(args.recipes, args.ingredients, args.categories), batch_size=1000)
+    engine.dispose()
+    headers = {'X-CSRF-Token': csrf_token(Config.CSRF_SECRET_KEY)}
+
+    results = {}
+    process: Optional[subprocess.Popen] = None
+    try:
+        for deployment, command in deployments(args.workers, args.threads).items():
+            process, port = start_server(command, env)
+            for name, make_request in scenarios(args.recipes, args.categories).items():
+                label = f'{deployment} {name}'
+                results[label] = asyncio.run(
+                    run_scenario(port, make_request, headers, args.connections, args.think_ms / 1000, args.seconds)
+                )
+                print(f"{label:<35} {json.dumps(results[label])}")
+            process.terminate()
+            process.wait()
+            process = None
+    finally:
+        if process is not None:
+            process.terminate()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    params = vars(args).copy()
+    output = params.pop('output')
+    print(f"Saved to {save('asgi_load', params, results, output)}")
+
+if __name__ == '__main__':
+    main()
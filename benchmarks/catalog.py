@@ -0,0 +1,68 @@
+"""
+Synthetic recipe catalog generator for benchmarks.
+
+Recipes are generated deterministically from a seed, with configurable
+recipe count, ingredients per recipe and category cardinality, and mix
+mass, volume and count units so aggregation does real unit conversion.
+"""
+from typing import Any, Dict, Iterator, List
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+import random
+
+ADJECTIVES = ['Spicy', 'Creamy', 'Smoky', 'Zesty', 'Hearty', 'Crispy', 'Roasted', 'Herbed', 'Sticky', 'Fresh']
+DISHES = ['Curry', 'Stew', 'Salad', 'Soup', 'Bowl', 'Bake', 'Stir Fry', 'Wrap', 'Pasta', 'Risotto', 'Tacos', 'Chili']
+BASE_INGREDIENTS = [
+    'chicken breast', 'beef mince', 'tofu', 'salmon', 'lentils', 'chickpeas', 'rice', 'quinoa', 'noodles',
+    'potato', 'tomato', 'bell pepper', 'spinach', 'broccoli', 'carrot', 'onion', 'garlic', 'ginger', 'lemon',
+    'basil', 'coconut milk', 'olive oil', 'soy sauce', 'stock', 'yoghurt', 'cheddar', 'eggs', 'oats'
+]
+UNITS = [('g', 50, 500), ('kg', 0.25, 2), ('ml', 15, 400), ('l', 0.25, 1.5), ('tbsp', 1, 4), ('tsp', 1, 3), ('whole', 1, 6)]
+
+def ingredient_vocabulary(size: int) -> List[str]:
+    """Ingredient names: the base list, then numbered variants up to size."""
+    names = list(BASE_INGREDIENTS[:size])
+    i = 0
+    while len(names) < size:
+        names.append(f'{BASE_INGREDIENTS[i % len(BASE_INGREDIENTS)]} {i // len(BASE_INGREDIENTS) + 2}')
+        i += 1
+    return names
+
+def generate_recipes(count: int, ingredients_per_recipe: int = 8, categories: int = 20,
+                     categories_per_recipe: int = 2, vocabulary: int = 500, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """
+    Yield recipe dicts in the shape accepted by POST /recipes.
+
+    Args:
+        count: Number of recipes
+        ingredients_per_recipe: Ingredients in each recipe
+        categories: Number of distinct category names (cardinality)
+        categories_per_recipe: Categories attached to each recipe
+        vocabulary: Number of distinct ingredient names
+        seed: Random seed; equal arguments always yield the same catalog
+    """
+    rng = random.Random(seed)
+    names = ingredient_vocabulary(vocabulary)
+    category_names = [f'Category {i}' for i in range(categories)]
+    for i in range(count):
+        ingredients = []
+        for name in rng.sample(names, min(ingredients_per_recipe, len(names))):
+            unit, low, high = rng.choice(UNITS)
+            ingredients.append({'name': name, 'amount': round(rng.uniform(low, high), 2), 'unit': unit})
+        yield {
+            'name': f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)} {i}',
+            'servings': rng.randint(1, 8),
+            'ingredients': ingredients,
+            'categories': rng.sample(category_names, min(categories_per_recipe, len(category_names)))
+        }
+
+def populate(engine: Engine, recipes: List[Dict[str, Any]], batch_size: int = 1000) -> None:
+    """Insert recipes through the ORM so the normalized tables are filled too."""
+    from app.models import Base, Recipe
+
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        for start in range(0, len(recipes), batch_size):
+            session.add_all(Recipe.from_dict(data) for data in recipes[start:start + batch_size])
+            session.commit()
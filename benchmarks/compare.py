@@ -0,0 +1,32 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Usage:
+    python -m benchmarks.compare BASELINE.json CURRENT.json [--threshold 0.1]
+
+Exits with status 1 when any latency grew, or throughput fell, by more
+than the threshold (a fraction; 0.1 = 10%).
+"""
+from benchmarks.results import compare, load
+import argparse
+import sys
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    args = parser.parse_args()
+
+    rows = compare(load(args.baseline), load(args.current), args.threshold)
+    width = max((len(row['benchmark']) for row in rows), default=10)
+    for row in rows:
+        flag = 'REGRESSION' if row['regression'] else ''
+        print(f"{row['benchmark']:<{width}}  {row['metric']:<12} {row['baseline']:>12g} -> {row['current']:>12g}  "
+              f"{row['change']:+8.1%}  {flag}")
+    regressions = [row for row in rows if row['regression']]
+    print(f"{len(regressions)} regression(s) over {args.threshold:.0%} in {len(rows)} metrics")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Load test of the API routes against the in-process WSGI app.
+
+Usage:
+    python -m benchmarks.load [--recipes 2000] [--ingredients 8] [--categories 20]
+                              [--threads 8] [--seconds 5] [--output results.json]
+
+Builds a synthetic catalog in a temporary SQLite database, then for each
+scenario runs concurrent clients (Flask test clients, one per thread) for a
+fixed time and reports throughput and p50/p95/p99 latency. Rate limiting
+is switched off; without a Redis server the response cache runs on its
+local tier. Results are stored as JSON (see benchmarks.compare).
+"""
+from typing import Any, Callable, Dict, List, Tuple
+from benchmarks.catalog import generate_recipes
+from benchmarks.results import percentiles, save
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+def scenarios(recipes: int, categories: int) -> Dict[str, Callable[[random.Random], Request]]:
+    """Request generators per scenario: (method, url, client kwargs)."""
+    return {
+        'GET /recipes': lambda rng: (
+            'GET', '/recipes', {'query_string': {'after': rng.randrange(recipes)}}
+        ),
+        'GET /recipes?fields': lambda rng: (
+            'GET', '/recipes', {'query_string': {'after': rng.randrange(recipes), 'fields': 'id,name,servings,categories'}}
+        ),
+        'GET /recipes?category': lambda rng: (
+            'GET', '/recipes', {'query_string': {'category': f'Category {rng.randrange(categories)}', 'limit': 50}}
+        ),
+        'GET /recipes/search': lambda rng: (
+            'GET', '/recipes/search', {'query_string': {'q': rng.choice(['chi', 'rice', 'spicy cur', 'tof', 'lemon', 'pas'])}}
+        ),
+        'GET /categories': lambda rng: ('GET', '/categories', {}),
+        'POST /calculate-ingredients': lambda rng: (
+            'POST', '/calculate-ingredients', {'json': {'recipes': [
+                {'id': rng.randint(1, recipes), 'servings': rng.randint(1, 12)} for _ in range(7)
+            ]}}
+        )
+    }
+
+def run_scenario(app, make_request: Callable[[random.Random], Request], headers: Dict[str, str],
+                 threads: int, seconds: float) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client_loop(seed: int) -> None:
+        rng = random.Random(seed)
+        client = app.test_client()
+        local: List[float] = []
+        failed = 0
+        while time.perf_counter() < deadline:
+            method, url, kwargs = make_request(rng)
+            start = time.perf_counter()
+            response = client.open(url, method=method, headers=headers, **kwargs)
+            response.get_data()
+            local.append((time.perf_counter() - start) * 1000)
+            failed += response.status_code >= 400
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    workers = [threading.Thread(target=client_loop, args=(seed,)) for seed in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / elapsed, 1),
+        **percentiles(latencies)
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--recipes', type=int, default=2000)
+    parser.add_argument('--ingredients', type=int, default=8)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/load-<timestamp>.json)')
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    # Config reads DATABASE_URL when it is imported
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    from config import Config
+    Config.RATELIMIT_ENABLED = False
+    Config.JOBS_INLINE_WORKER = False
+    from app import create_app
+    from app.database import get_engine, init_db
+    from app.importer import import_recipes
+    from app.security import generate_csrf_token
+    from sqlalchemy.orm import sessionmaker
+
+    init_db()
+    app = create_app()
+    engine = get_engine()
+    # Per-request INFO logging would dominate the measurements
+    logging.getLogger('app').setLevel(logging.WARNING)
+    with sessionmaker(bind=engine)() as session:
+        import_recipes(session, generate_recipes(args.recipes, args.ingredients, args.categories), batch_size=1000)
+    with app.app_context():
+        headers = {'X-CSRF-Token': generate_csrf_token()}
+
+    results = {}
+    for name, make_request in scenarios(args.recipes, args.categories).items():
+        results[name] = run_scenario(app, make_request, headers, args.threads, args.seconds)
+        print(f"{name:<30} {json.dumps(results[name])}")
+
+    engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    params = vars(args).copy()
+    output = params.pop('output')
+    print(f"Saved to {save('load', params, results, output)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Micro-benchmarks for the per-recipe hot paths.
+
+Usage:
+    python -m benchmarks.micro [--recipes 2000] [--ingredients 8] [--categories 20]
+                               [--plan-size 50] [--large-ingredients 200] [--output results.json]
+
+Times Recipe.to_dict (full and projected) and the spliced recipes_json
+serializer, the ingestion path (validate_recipe, sanitize_input and
+Recipe.from_dict, also on large recipes of --large-ingredients ingredients
+and on input containing markup) and shopping list aggregation through
+the compiled-vector path used by /calculate-ingredients over a synthetic
+catalog, and stores the results as JSON (see benchmarks.compare).
+"""
+from datetime import datetime
+from typing import Any, Callable, Dict
+from sqlalchemy.orm import sessionmaker
+from benchmarks.catalog import generate_recipes, populate
+from benchmarks.results import save
+from app.compiled import RecipeVectorCache
+from app.database import create_db_engine
+from app.models import Recipe
+from app.security import sanitize_input
+from app.serialization import recipes_json
+from app.validation import validate_recipe
+import argparse
+import json
+import random
+import timeit
+
+def measure(func: Callable[[], Any], ops: int = 1, repeat: int = 5) -> Dict[str, float]:
+    """
+    Time func, returning the best of several runs.
+
+    Args:
+        func: Callable performing ``ops`` operations per call
+        ops: Operations per call, to report a per-operation time
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number / ops
+    return {'us_per_op': round(best * 1e6, 3), 'ops_per_sec': round(1 / best, 1)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--recipes', type=int, default=2000)
+    parser.add_argument('--ingredients', type=int, default=8)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--plan-size', type=int, default=50)
+    parser.add_argument('--large-ingredients', type=int, default=200, help='Ingredients per large recipe')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/micro-<timestamp>.json)')
+    args = parser.parse_args()
+
+    catalog = list(generate_recipes(args.recipes, args.ingredients, args.categories))
+    recipes = []
+    for recipe_id, data in enumerate(catalog, start=1):
+        recipe = Recipe.from_dict(data)
+        recipe.id = recipe_id
+        recipe.created_at = recipe.updated_at = datetime(2026, 1, 1)
+        recipes.append(recipe)
+    sample = recipes[:200]
+    sample_data = catalog[:200]
+    large_data = list(generate_recipes(20, args.large_ingredients, args.categories, seed=11))
+    markup_data = [
+        {**data, 'name': f"<b>{data['name']}</b> & more",
+         'ingredients': [{**ingredient, 'name': f"{ingredient['name']} <i>fresh</i>"} for ingredient in data['ingredients']]}
+        for data in sample_data
+    ]
+
+    engine = create_db_engine('sqlite://')
+    populate(engine, catalog)
+    rng = random.Random(7)
+    plan = {recipe_id: rng.randint(1, 20) for recipe_id in rng.sample(range(1, args.recipes + 1), args.plan_size)}
+    vectors = RecipeVectorCache(max_recipes=args.recipes)
+
+    with sessionmaker(bind=engine)() as session:
+        compiled = vectors.get_many(session, plan)
+        results = {
+            'Recipe.to_dict': measure(lambda: [recipe.to_dict() for recipe in sample], len(sample)),
+            'Recipe.to_dict(fields)': measure(
+                lambda: [recipe.to_dict(['id', 'name', 'servings', 'categories']) for recipe in sample], len(sample)
+            ),
+            'recipes_json': measure(lambda: recipes_json(sample), len(sample)),
+            'json.dumps(to_dict)': measure(lambda: json.dumps([recipe.to_dict() for recipe in sample]), len(sample)),
+            'validate_recipe': measure(lambda: [validate_recipe(data) for data in sample_data], len(sample_data)),
+            'sanitize_input': measure(lambda: [sanitize_input(data) for data in sample_data], len(sample_data)),
+            'sanitize_input (markup)': measure(lambda: [sanitize_input(data) for data in markup_data], len(markup_data)),
+            'Recipe.from_dict': measure(lambda: [Recipe.from_dict(data) for data in sample_data], len(sample_data)),
+            'validate_recipe (large)': measure(lambda: [validate_recipe(data) for data in large_data], len(large_data)),
+            'sanitize_input (large)': measure(lambda: [sanitize_input(data) for data in large_data], len(large_data)),
+            'Recipe.from_dict (large)': measure(lambda: [Recipe.from_dict(data) for data in large_data], len(large_data)),
+            'RecipeVectorCache.get_many (warm)': measure(lambda: vectors.get_many(session, plan)),
+            'RecipeVectorCache.shopping_list': measure(lambda: vectors.shopping_list(compiled, plan))
+        }
+    engine.dispose()
+
+    params = vars(args).copy()
+    output = params.pop('output')
+    path = save('micro', params, results, output)
+    print(json.dumps(results, indent=2))
+    print(f"Saved to {path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Per-request overhead of the rate limiter.
+
+Usage:
+    python -m benchmarks.ratelimit [--clients 1000] [--redis redis://localhost:6379/0]
+                                   [--output results.json]
+
+For each storage/strategy pair, times a bare strategy hit (spread over
+--clients keys) and a request to a limited Flask route, reporting the
+latter's overhead against the same route without a limit. The Redis-backed
+configurations run only when --redis is given and reachable. Results are
+stored as JSON (see benchmarks.compare).
+"""
+from typing import Dict, List, Optional, Tuple, cast
+from flask import Flask
+from limits import parse
+from limits.storage import Storage, storage_from_string
+from limits.strategies import STRATEGIES
+from benchmarks.micro import measure
+from benchmarks.results import save
+from app.ratelimit import TOKEN_BUCKET, TokenBucketLimiter, TokenBucketRateLimiter
+import argparse
+import itertools
+import json
+import redis
+
+LIMIT = '1000000 per minute'
+
+def configurations(redis_url: Optional[str]) -> List[Tuple[str, str, str]]:
+    """(name, storage URI, strategy) pairs to benchmark."""
+    configs = [
+        ('memory fixed-window', 'memory://', 'fixed-window'),
+        ('local token-bucket', 'local://', 'token-bucket')
+    ]
+    if redis_url:
+        try:
+            redis.Redis.from_url(redis_url, socket_connect_timeout=1).ping()
+        except redis.RedisError as e:
+            print(f"Skipping Redis configurations: {e}")
+        else:
+            configs += [
+                ('redis fixed-window', redis_url, 'fixed-window'),
+                ('local+redis token-bucket', 'local+' + redis_url, 'token-bucket')
+            ]
+    return configs
+
+def request_overhead(uri: str, strategy: str, clients: int) -> Dict[str, float]:
+    flask_app = Flask(__name__)
+    limiter = TokenBucketLimiter(lambda: f'client-{next(keys)}', app=flask_app, storage_uri=uri, strategy=strategy)
+    keys = itertools.cycle(range(clients))
+
+    @flask_app.route('/limited')
+    @limiter.limit(LIMIT)
+    def limited():
+        return 'ok'
+
+    @flask_app.route('/unlimited')
+    @limiter.exempt
+    def unlimited():
+        return 'ok'
+
+    client = flask_app.test_client()
+    with_limit = measure(lambda: client.get('/limited'))
+    without_limit = measure(lambda: client.get('/unlimited'))
+    return {
+        'request_us': with_limit['us_per_op'],
+        'unlimited_request_us': without_limit['us_per_op'],
+        'overhead_us': round(with_limit['us_per_op'] - without_limit['us_per_op'], 3)
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--clients', type=int, default=1000, help='Distinct rate limit keys')
+    parser.add_argument('--redis', help='Redis URL for the Redis-backed configurations')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/ratelimit-<timestamp>.json)')
+    args = parser.parse_args()
+
+    item = parse(LIMIT)
+    results = {}
+    for name, uri, strategy in configurations(args.redis):
+        limiter = {**STRATEGIES, TOKEN_BUCKET: TokenBucketRateLimiter}[strategy](cast(Storage, storage_from_string(uri)))
+        keys = itertools.cycle([f'client-{i}' for i in range(args.clients)])
+        hit = measure(lambda: limiter.hit(item, next(keys)))
+        results[name] = {'hit_us': hit['us_per_op'], **request_overhead(uri, strategy, args.clients)}
+        print(f"{name:<26} {json.dumps(results[name])}")
+
+    params = vars(args).copy()
+    output = params.pop('output')
+    print(f"Saved to {save('ratelimit', params, results, output)}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Storing and comparing benchmark results.
+
+Results are JSON files holding the run's environment, parameters and a
+``results`` mapping of benchmark name -> {metric: value}. Metrics ending in
+``_ms`` or ``_us`` are latencies (lower is better); ``rps`` and
+``ops_per_sec`` are throughputs (higher is better).
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import os
+import platform
+import statistics
+import subprocess
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+HIGHER_IS_BETTER = {'rps', 'ops_per_sec'}
+
+def percentiles(samples_ms: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99 of latency samples in milliseconds."""
+    if len(samples_ms) < 2:
+        value = round(samples_ms[0], 3) if samples_ms else 0.0
+        return {'p50_ms': value, 'p95_ms': value, 'p99_ms': value}
+    cuts = statistics.quantiles(samples_ms, n=100, method='inclusive')
+    return {'p50_ms': round(cuts[49], 3), 'p95_ms': round(cuts[94], 3), 'p99_ms': round(cuts[98], 3)}
+
+def environment() -> Dict[str, Any]:
+    """Describe where a run happened, so comparisons can be judged fairly."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count()
+    }
+
+def save(kind: str, params: Dict[str, Any], results: Dict[str, Dict[str, float]],
+         output: Optional[str] = None) -> str:
+    """Write a run to output (default: benchmarks/results/<kind>-<timestamp>.json)."""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{kind}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'kind': kind, 'environment': environment(), 'params': params, 'results': results}, f, indent=2)
+    return output
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) -> List[Dict[str, Any]]:
+    """
+    Compare the metrics two runs have in common.
+
+    Returns:
+        One row per metric with the relative change (positive = worse) and
+        whether it exceeds threshold
+    """
+    rows = []
+    for name, metrics in current['results'].items():
+        for metric, value in metrics.items():
+            before = baseline['results'].get(name, {}).get(metric)
+            if before is None or metric not in HIGHER_IS_BETTER and not metric.endswith(('_ms', '_us')):
+                continue
+            if before == 0:
+                change = 0.0
+            elif metric in HIGHER_IS_BETTER:
+                change = (before - value) / before
+            else:
+                change = (value - before) / before
+            rows.append({
+                'benchmark': name,
+                'metric': metric,
+                'baseline': before,
+                'current': value,
+                'change': round(change, 4),
+                'regression': change > threshold
+            })
+    return rows
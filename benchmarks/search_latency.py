@@ -0,0 +1,88 @@
+"""
+Typeahead latency of GET /recipes/search's FTS5 query.
+
+Usage:
+    python -m benchmarks.search_latency [--recipes 100000] [--queries 2000]
+
+Fills a fresh SQLite database with synthetic recipes (inserted in bulk, so
+only the search triggers run), then times ``search_recipe_ids`` for short
+prefixes like those a search box sends while the user types, reporting
+latency percentiles in milliseconds. The vocabulary is deliberately small,
+so most prefixes match a large share of the catalog: a worst case for
+ranking cost.
+"""
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from config import Config
+from app.database import create_db_engine
+from app.models import Base, Recipe
+from app.search import search_recipe_ids
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+WORDS = [
+    'chicken', 'beef', 'tofu', 'salmon', 'lentil', 'chickpea', 'rice', 'quinoa', 'noodle', 'potato',
+    'tomato', 'pepper', 'spinach', 'broccoli', 'carrot', 'onion', 'garlic', 'ginger', 'lemon', 'basil',
+    'curry', 'stew', 'salad', 'soup', 'bowl', 'roast', 'bake', 'stir', 'fry', 'wrap'
+]
+CATEGORIES = ['Asian', 'Italian', 'Mexican', 'Indian', 'Vegetarian', 'Vegan', 'Quick Meals', 'High-Protein']
+
+def make_row(rng: random.Random, i: int) -> dict:
+    return {
+        'name': f"{' '.join(rng.sample(WORDS, 3)).title()} {i}",
+        'servings': 4,
+        'ingredients': json.dumps([{'name': word, 'amount': 100, 'unit': 'g'} for word in rng.sample(WORDS, 6)]),
+        'categories': json.dumps(rng.sample(CATEGORIES, 2))
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--recipes', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--limit', type=int, default=Config.SEARCH_PAGE_SIZE)
+    parser.add_argument('--candidates', type=int, default=Config.SEARCH_MAX_CANDIDATES)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    engine = create_db_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    rng = random.Random(42)
+    with engine.begin() as connection:
+        connection.execute(insert(Recipe), [make_row(rng, i) for i in range(args.recipes)])
+
+    queries = []
+    for _ in range(args.queries):
+        words = rng.sample(WORDS, rng.choice([1, 2]))
+        queries.append(' '.join(word[:rng.randint(2, len(word))] for word in words))
+
+    timings = []
+    with factory() as session:
+        for q in queries:
+            start = time.perf_counter()
+            search_recipe_ids(session, q, args.limit, args.candidates)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    percentiles = statistics.quantiles(timings, n=100)
+    print(json.dumps({
+        'recipes': args.recipes,
+        'queries': args.queries,
+        'p50_ms': round(percentiles[49], 2),
+        'p95_ms': round(percentiles[94], 2),
+        'p99_ms': round(percentiles[98], 2),
+        'max_ms': round(max(timings), 2)
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Read throughput during concurrent writes, default SQLite settings vs tuned.
+
+Usage:
+    python -m benchmarks.sqlite_concurrency [--recipes 5000] [--readers 4] [--writers 2] [--seconds 5]
+
+Runs the same workload twice against a fresh file database: once with
+SQLite's defaults (rollback journal, synchronous=FULL, no busy timeout) and
+once with the settings from Config (WAL, synchronous=NORMAL, mmap, cache,
+busy timeout). Readers page through recipes like GET /recipes while writers
+insert recipes like add_recipe.
+"""
+from sqlalchemy import select, text
+from sqlalchemy.orm import sessionmaker
+from config import Config
+from app.database import create_db_engine
+from app.models import Base, Recipe
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+class DefaultSQLiteSettings(Config):
+    SQLITE_JOURNAL_MODE = 'DELETE'
+    SQLITE_SYNCHRONOUS = 'FULL'
+    SQLITE_MMAP_SIZE = 0
+    SQLITE_CACHE_SIZE = -2000
+    SQLITE_BUSY_TIMEOUT = 0
+
+def make_recipe(i: int) -> Recipe:
+    return Recipe.from_dict({
+        'name': f'Benchmark recipe {i}',
+        'servings': 4,
+        'ingredients': [{'name': f'ingredient {j}', 'amount': 100, 'unit': 'g'} for j in range(8)],
+        'categories': [f'Category {i % 20}']
+    })
+
+def run(settings, recipes: int, readers: int, writers: int, seconds: float) -> dict:
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    engine = create_db_engine(f'sqlite:///{path}', settings)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as session:
+        session.add_all(make_recipe(i) for i in range(recipes))
+        session.commit()
+
+    counts = {'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def count(key: str) -> None:
+        with lock:
+            counts[key] += 1
+
+    def reader() -> None:
+        while not stop.is_set():
+            try:
+                with factory() as session:
+                    session.execute(select(Recipe).order_by(Recipe.id).limit(100)).scalars().all()
+                count('reads')
+            except Exception:
+                count('read_errors')
+
+    def writer() -> None:
+        i = recipes
+        while not stop.is_set():
+            try:
+                with factory() as session:
+                    session.add(make_recipe(i))
+                    session.commit()
+                count('writes')
+            except Exception:
+                count('write_errors')
+            i += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with engine.connect() as connection:
+        journal_mode = connection.execute(text('PRAGMA journal_mode')).scalar()
+    engine.dispose()
+    for suffix in ('', '-wal', '-shm', '-journal'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    return {
+        'journal_mode': journal_mode,
+        'reads_per_second': round(counts['reads'] / seconds, 1),
+        'writes_per_second': round(counts['writes'] / seconds, 1),
+        'read_errors': counts['read_errors'],
+        'write_errors': counts['write_errors']
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--recipes', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    results = {
+        'default': run(DefaultSQLiteSettings, args.recipes, args.readers, args.writers, args.seconds),
+        'tuned': run(Config, args.recipes, args.readers, args.writers, args.seconds)
+    }
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Cold-start time of the application.
+
+Usage:
+    python -m benchmarks.startup [--runs 10] [--ratelimit-mode memory] [--importtime 15]
+                                 [--output results.json]
+
+Each run starts a fresh interpreter against a temporary SQLite database
+(initialized once beforehand, as ``flask init-db`` would) and times
+``import app``, ``create_app()`` and the first request. Rate limiting uses
+the in-memory mode by default so no Redis server is needed. With --importtime
+the slowest modules of one extra ``python -X importtime -c 'import app'``
+run are printed as well. Results are stored as JSON (see benchmarks.compare).
+"""
+from typing import Dict, List
+from benchmarks.results import percentiles, save
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+response = application.test_client().get('/categories')
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+print(json.dumps({
+    'import': (imported - start) * 1000,
+    'create_app': (created - imported) * 1000,
+    'first_request': (served - created) * 1000,
+    'total': (served - start) * 1000
+}))
+'''
+
+def run(code: str, env: Dict[str, str], *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+def slowest_imports(env: Dict[str, str], count: int) -> List[Dict[str, object]]:
+    """Modules with the largest cumulative import time, from -X importtime."""
+    modules = []
+    for line in run('import app', env, '-X', 'importtime').stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        modules.append({'module': name.strip(), 'cumulative_ms': int(cumulative) / 1000})
+    return sorted(modules, key=lambda module: module['cumulative_ms'], reverse=True)[:count]
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--ratelimit-mode', default='memory', choices=['redis', 'local', 'memory'])
+    parser.add_argument('--importtime', type=int, default=0, metavar='N', help='Print the N slowest imports')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/startup-<timestamp>.json)')
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    env = {**os.environ, 'DATABASE_URL': f'sqlite:///{path}', 'RATELIMIT_MODE': args.ratelimit_mode}
+    try:
+        run('from app.database import init_db; init_db()', env)
+        samples: Dict[str, List[float]] = {'import': [], 'create_app': [], 'first_request': [], 'total': []}
+        for _ in range(args.runs):
+            timings = json.loads(run(PROBE, env).stdout.strip().splitlines()[-1])
+            for phase, value in timings.items():
+                samples[phase].append(value)
+        if args.importtime:
+            for module in slowest_imports(env, args.importtime):
+                print(f"{module['cumulative_ms']:>9.1f} ms  {module['module']}")
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    results = {phase: percentiles(values) for phase, values in samples.items()}
+    for phase, stats in results.items():
+        print(f"{phase:<15} {json.dumps(stats)}")
+
+    params = vars(args).copy()
+    output = params.pop('output')
+    print(f"Saved to {save('startup', params, results, output)}")
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,4 @@
+from typing import Dict
 import os
 
 class Config:
@@ -6,16 +7,99 @@ class Config:
     SQLITE_URI = f'sqlite:///{DATABASE_PATH}'
     DEBUG = True
     
+    # Database backend: any SQLAlchemy URL (SQLite or PostgreSQL), plus
+    # optional comma-separated read replica URLs for GET routes
+    DATABASE_URL = os.getenv('DATABASE_URL', SQLITE_URI)
+    DATABASE_REPLICA_URLS = [url for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url]
+    # Startup only checks the stamped schema revision; `flask init-db` creates
+    # the schema, or set DATABASE_AUTO_CREATE to create it on first boot
+    DATABASE_CHECK_SCHEMA = os.getenv('DATABASE_CHECK_SCHEMA', 'true').lower() == 'true'
+    DATABASE_AUTO_CREATE = os.getenv('DATABASE_AUTO_CREATE', 'false').lower() == 'true'
+    
+    # SQLite tuning, applied to every connection
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.getenv('SQLITE_CACHE_SIZE', -64000))  # negative = KiB
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # milliseconds
+    SQLITE_POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', 5))
+    SQLITE_MAX_OVERFLOW = int(os.getenv('SQLITE_MAX_OVERFLOW', 10))
+    
     # Redis configuration
     REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
     REDIS_PORT = int(os.getenv('REDIS_PORT', 6379))
     REDIS_DB = int(os.getenv('REDIS_DB', 0))
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 0.5))
+    REDIS_FAILURE_THRESHOLD = 3
+    REDIS_RETRY_AFTER = 30
+    
+    # Response cache (seconds)
+    CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))
+    CACHE_LOCK_TIMEOUT = 5
+    CACHE_LOCAL_MAX_ENTRIES = int(os.getenv('CACHE_LOCAL_MAX_ENTRIES', 1024))
+    CACHE_LOCAL_TTL = int(os.getenv('CACHE_LOCAL_TTL', 5))
+    
+    # In-process category registry cache (seconds)
+    CATEGORY_CACHE_TTL = int(os.getenv('CATEGORY_CACHE_TTL', 60))
+    
+    # Recipe listing pagination
+    RECIPES_PAGE_SIZE = 100
+    RECIPES_MAX_PAGE_SIZE = 1000
+    SEARCH_PAGE_SIZE = 20
+    SEARCH_MAX_PAGE_SIZE = 100
+    SEARCH_MAX_CANDIDATES = int(os.getenv('SEARCH_MAX_CANDIDATES', 1000))  # matches ranked for 1-2 letter prefixes
+    EXPORT_BATCH_SIZE = 1000
+    IMPORT_BATCH_SIZE = 500
+    
+    # Compiled recipe vectors and computed shopping lists kept in memory per worker
+    RECIPE_VECTOR_CACHE_SIZE = int(os.getenv('RECIPE_VECTOR_CACHE_SIZE', 250000))
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 4096))
+    BATCH_MAX_PLANS = int(os.getenv('BATCH_MAX_PLANS', 100))
+    
+    # Asynchronous calculation jobs
+    JOBS_PROCESSES = int(os.getenv('JOBS_PROCESSES', min(4, os.cpu_count() or 1)))  # 0 = no process pool
+    JOBS_CHUNK_SIZE = int(os.getenv('JOBS_CHUNK_SIZE', 100000))  # ingredient rows per pool task
+    JOBS_INLINE_WORKER = os.getenv('JOBS_INLINE_WORKER', 'true').lower() == 'true'
+    JOBS_POLL_INTERVAL = 1.0
+    JOBS_STALE_AFTER = 300  # seconds without progress before a running job is requeued
+    JOBS_RETENTION = int(os.getenv('JOBS_RETENTION', 7 * 24 * 3600))  # seconds finished jobs are kept
+    # Streams hold a worker thread: keep them short (clients reconnect with
+    # Last-Event-ID) and cap how many each worker serves at once
+    JOBS_EVENTS_TIMEOUT = int(os.getenv('JOBS_EVENTS_TIMEOUT', 25))  # seconds a progress stream stays open
+    JOBS_EVENTS_MAX_STREAMS = int(os.getenv('JOBS_EVENTS_MAX_STREAMS', 8))  # per worker process
+    
+    # Requests slower than this log their query breakdown (milliseconds)
+    SLOW_REQUEST_THRESHOLD_MS = float(os.getenv('SLOW_REQUEST_THRESHOLD_MS', 500))
+    
+    # Opt-in per-request profiling (see app/profiling.py)
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_SECRET = os.getenv('PROFILING_SECRET', '')
+    PROFILING_MODE = os.getenv('PROFILING_MODE', 'cprofile')  # cprofile or sampling
+    PROFILING_DIR = os.getenv('PROFILING_DIR', os.path.join(BASE_DIR, 'profiles'))
+    PROFILING_SAMPLE_INTERVAL = 0.001  # seconds
     
     # Security settings
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev')
     CSRF_ENABLED = True
     CSRF_SECRET_KEY = os.getenv('CSRF_SECRET_KEY', 'csrf-dev')
     
-    # Rate limiting
+    # Rate limiting (see app/ratelimit.py):
+    # redis: exact fixed windows in Redis, one round-trip per limited request
+    # local: token buckets in memory, reconciled with Redis in the background
+    # memory: token buckets in memory only, for single-node and test setups
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_MODE = os.getenv('RATELIMIT_MODE', 'redis')
+    if RATELIMIT_MODE not in ('redis', 'local', 'memory'):
+        raise ValueError(f"RATELIMIT_MODE must be 'redis', 'local' or 'memory', not {RATELIMIT_MODE!r}")
     RATELIMIT_DEFAULT = "100 per minute"
-    RATELIMIT_STORAGE_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
\ No newline at end of file
+    RATELIMIT_SYNC_INTERVAL = float(os.getenv('RATELIMIT_SYNC_INTERVAL', 1.0))  # seconds
+    RATELIMIT_STORAGE_URI = {
+        'redis': f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}",
+        'local': f"local+redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}",
+        'memory': "local://"
+    }[RATELIMIT_MODE]
+    RATELIMIT_STRATEGY = 'fixed-window' if RATELIMIT_MODE == 'redis' else 'token-bucket'
+    RATELIMIT_STORAGE_OPTIONS: Dict[str, float] = (
+        {'socket_connect_timeout': 30} if RATELIMIT_MODE == 'redis'
+        else {'sync_interval': RATELIMIT_SYNC_INTERVAL, 'socket_timeout': REDIS_SOCKET_TIMEOUT}
+    )
\ No newline at end of file
@@ -9,7 +9,7 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
-config.set_main_option('sqlalchemy.url', Config.SQLITE_URI)
+config.set_main_option('sqlalchemy.url', Config.DATABASE_URL)
 target_metadata = Base.metadata
 
 def run_migrations_offline():
@@ -0,0 +1,33 @@
+"""Asynchronous shopping list calculation jobs
+
+Revision ID: calculation_jobs
+Revises: postgres_json_indexes
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'calculation_jobs'
+down_revision = 'postgres_json_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'calculation_jobs',
+        sa.Column('id', sa.String(32), primary_key=True),
+        sa.Column('plan_hash', sa.String(64), nullable=False, unique=True),
+        sa.Column('plan', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(16), nullable=False),
+        sa.Column('progress', sa.Float(), nullable=False),
+        sa.Column('result', sa.Text()),
+        sa.Column('error', sa.Text()),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now())
+    )
+    op.create_index('ix_calculation_jobs_status', 'calculation_jobs', ['status'])
+
+def downgrade():
+    op.drop_index('ix_calculation_jobs_status', table_name='calculation_jobs')
+    op.drop_table('calculation_jobs')
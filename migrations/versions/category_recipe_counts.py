@@ -0,0 +1,29 @@
+"""Per-category recipe counts
+
+Revision ID: category_recipe_counts
+Revises: recipe_ingredients
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'category_recipe_counts'
+down_revision = 'recipe_ingredients'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table('categories') as batch_op:
+        batch_op.add_column(sa.Column('recipe_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill counts from the join table
+    op.execute(
+        'UPDATE categories SET recipe_count = ('
+        'SELECT COUNT(*) FROM recipe_categories '
+        'WHERE recipe_categories.category_id = categories.id)'
+    )
+
+def downgrade():
+    with op.batch_alter_table('categories') as batch_op:
+        batch_op.drop_column('recipe_count')
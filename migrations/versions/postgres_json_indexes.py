@@ -0,0 +1,26 @@
+"""Drop the categories text index on PostgreSQL
+
+Revision ID: postgres_json_indexes
+Revises: category_recipe_counts
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = 'postgres_json_indexes'
+down_revision = 'category_recipe_counts'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # A btree over the whole JSON text is useless for lookups and can exceed
+    # PostgreSQL's index row size. Category and ingredient filters use the
+    # normalized recipe_categories and recipe_ingredients tables instead.
+    op.drop_index('idx_recipe_categories', table_name='recipes')
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.create_index('idx_recipe_categories', 'recipes', ['categories'])
@@ -0,0 +1,63 @@
+"""Normalized recipe categories
+
+Revision ID: recipe_categories
+Revises: initial_schema
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+# revision identifiers, used by Alembic
+revision = 'recipe_categories'
+down_revision = 'initial_schema'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Create categories and join tables
+    op.create_table(
+        'categories',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_table(
+        'recipe_categories',
+        sa.Column('recipe_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('recipe_id', 'category_id')
+    )
+    op.create_index('idx_recipe_categories_category', 'recipe_categories', ['category_id', 'recipe_id'])
+
+    # Backfill from the JSON categories column. Category ids are left to the
+    # database and read back, so PostgreSQL's id sequence stays in step.
+    bind = op.get_bind()
+    recipe_names = []
+    for recipe_id, categories_json in bind.execute(sa.text('SELECT id, categories FROM recipes')):
+        try:
+            names = json.loads(categories_json or '[]')
+        except ValueError:
+            continue
+        recipe_names.append((recipe_id, list(dict.fromkeys(names))))
+
+    categories_table = sa.table('categories', sa.column('name', sa.String))
+    links_table = sa.table('recipe_categories', sa.column('recipe_id', sa.Integer), sa.column('category_id', sa.Integer))
+    all_names = list(dict.fromkeys(name for _, names in recipe_names for name in names))
+    if not all_names:
+        return
+    op.bulk_insert(categories_table, [{'name': name} for name in all_names])
+    category_ids = {name: category_id for category_id, name in bind.execute(sa.text('SELECT id, name FROM categories'))}
+    links = [
+        {'recipe_id': recipe_id, 'category_id': category_ids[name]}
+        for recipe_id, names in recipe_names for name in names
+    ]
+    op.bulk_insert(links_table, links)
+
+def downgrade():
+    op.drop_index('idx_recipe_categories_category')
+    op.drop_table('recipe_categories')
+    op.drop_table('categories')
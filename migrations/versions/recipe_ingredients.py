@@ -0,0 +1,64 @@
+"""Normalized recipe ingredients
+
+Revision ID: recipe_ingredients
+Revises: recipe_categories
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+# revision identifiers, used by Alembic
+revision = 'recipe_ingredients'
+down_revision = 'recipe_categories'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Create recipe_ingredients table
+    op.create_table(
+        'recipe_ingredients',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('recipe_id', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('unit', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_recipe_ingredients_recipe_id', 'recipe_ingredients', ['recipe_id'])
+    op.create_index('idx_recipe_ingredients_name', 'recipe_ingredients', ['name', 'recipe_id'])
+
+    # Backfill from the JSON ingredients column
+    bind = op.get_bind()
+    rows = []
+    for recipe_id, ingredients_json in bind.execute(sa.text('SELECT id, ingredients FROM recipes')):
+        try:
+            ingredients = json.loads(ingredients_json or '[]')
+        except ValueError:
+            continue
+        for position, ingredient in enumerate(ingredients):
+            rows.append({
+                'recipe_id': recipe_id,
+                'position': position,
+                'name': ingredient['name'],
+                'amount': ingredient['amount'],
+                'unit': ingredient['unit']
+            })
+
+    ingredients_table = sa.table(
+        'recipe_ingredients',
+        sa.column('recipe_id', sa.Integer),
+        sa.column('position', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('amount', sa.Float),
+        sa.column('unit', sa.String)
+    )
+    if rows:
+        op.bulk_insert(ingredients_table, rows)
+
+def downgrade():
+    op.drop_index('idx_recipe_ingredients_name')
+    op.drop_index('ix_recipe_ingredients_recipe_id')
+    op.drop_table('recipe_ingredients')
@@ -0,0 +1,58 @@
+"""SQLite FTS5 recipe search index
+
+Revision ID: recipe_search
+Revises: calculation_jobs
+Create Date: 2026-10-17 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = 'recipe_search'
+down_revision = 'calculation_jobs'
+branch_labels = None
+depends_on = None
+
+INGREDIENT_TEXT = (
+    "(SELECT group_concat(json_extract(value, '$.name'), ' ') "
+    "FROM json_each(CASE WHEN json_valid({row}.ingredients) THEN {row}.ingredients ELSE '[]' END))"
+)
+CATEGORY_TEXT = (
+    "(SELECT group_concat(value, ' ') "
+    "FROM json_each(CASE WHEN json_valid({row}.categories) THEN {row}.categories ELSE '[]' END))"
+)
+INDEX_NEW_ROW = (
+    "INSERT INTO recipe_search(rowid, name, ingredients, categories) "
+    f"VALUES (new.id, new.name, {INGREDIENT_TEXT.format(row='new')}, {CATEGORY_TEXT.format(row='new')});"
+)
+
+def upgrade():
+    # Search falls back to substring matching on other backends
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE recipe_search USING fts5("
+        "name, ingredients, categories, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+    )
+    op.execute(f"CREATE TRIGGER recipes_search_insert AFTER INSERT ON recipes BEGIN {INDEX_NEW_ROW} END")
+    op.execute(
+        "CREATE TRIGGER recipes_search_update AFTER UPDATE OF name, ingredients, categories ON recipes BEGIN "
+        f"DELETE FROM recipe_search WHERE rowid = old.id; {INDEX_NEW_ROW} END"
+    )
+    op.execute(
+        "CREATE TRIGGER recipes_search_delete AFTER DELETE ON recipes BEGIN "
+        "DELETE FROM recipe_search WHERE rowid = old.id; END"
+    )
+
+    # Backfill the index from existing recipes
+    op.execute(
+        "INSERT INTO recipe_search(rowid, name, ingredients, categories) "
+        f"SELECT r.id, r.name, {INGREDIENT_TEXT.format(row='r')}, {CATEGORY_TEXT.format(row='r')} FROM recipes AS r"
+    )
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute('DROP TRIGGER recipes_search_delete')
+    op.execute('DROP TRIGGER recipes_search_update')
+    op.execute('DROP TRIGGER recipes_search_insert')
+    op.execute('DROP TABLE recipe_search')
@@ -0,0 +1,21 @@
+"""Recipe version counter for compiled vector validation
+
+Revision ID: recipe_version
+Revises: recipe_search
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic
+revision = 'recipe_version'
+down_revision = 'recipe_search'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Plain ADD COLUMN: a batch table rebuild would drop the search triggers
+    op.add_column('recipes', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+def downgrade():
+    op.drop_column('recipes', 'version')
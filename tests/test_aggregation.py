@@ -0,0 +1,63 @@
+from sqlalchemy.orm import sessionmaker
+from app.aggregation import canonical_unit
+from app.compiled import RecipeVectorCache
+from app.database import create_db_engine
+from app.models import Base, Recipe
+
+def shopping_list(tmp_path, recipes, servings):
+    """Store the recipes and aggregate them through the compiled-vector path."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'aggregation.db'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        for servings_per_recipe, ingredients in recipes:
+            session.add(Recipe.from_dict({
+                'name': 'Recipe', 'servings': servings_per_recipe, 'categories': [],
+                'ingredients': [{'name': name, 'amount': amount, 'unit': unit} for name, amount, unit in ingredients]
+            }))
+        session.commit()
+        vectors = RecipeVectorCache(max_recipes=10)
+        lines = vectors.shopping_list(vectors.get_many(session, servings), servings)
+    engine.dispose()
+    return lines
+
+def test_converts_units_and_canonicalizes_names(tmp_path):
+    recipes = [
+        (2, [('chicken breast', 500, 'g'), ('soy sauce', 2, 'tbsp')]),
+        (2, [('Chicken  Breast', 1, 'kg'), ('soy sauce', 1, 'l'), ('garlic', 2, 'cloves')])
+    ]
+    assert shopping_list(tmp_path, recipes, {1: 2, 2: 1}) == [
+        {'name': 'chicken breast', 'amount': 1.0, 'unit': 'kg'},
+        {'name': 'soy sauce', 'amount': 530, 'unit': 'ml'},
+        {'name': 'garlic', 'amount': 1, 'unit': 'cloves'}
+    ]
+
+def test_incompatible_dimensions_stay_separate(tmp_path):
+    recipes = [(1, [('milk', 1, 'cup'), ('milk', 100, 'g'), ('eggs', 2, 'whole'), ('eggs', 1, 'piece')])]
+    assert shopping_list(tmp_path, recipes, {1: 1}) == [
+        {'name': 'milk', 'amount': 240, 'unit': 'ml'},
+        {'name': 'milk', 'amount': 100, 'unit': 'g'},
+        {'name': 'eggs', 'amount': 3, 'unit': 'whole'}
+    ]
+    assert canonical_unit('Kg') == ('mass', 1000.0)
+
+def test_recipe_vectors_are_cached_and_invalidated(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'vectors.db'}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    recipe = Recipe.from_dict({'name': 'Porridge', 'servings': 2, 'categories': [],
+                               'ingredients': [{'name': 'oats', 'amount': 100, 'unit': 'g'}]})
+    session.add(recipe)
+    session.commit()
+
+    vectors = RecipeVectorCache(max_recipes=10)
+    first = vectors.get_many(session, [recipe.id])[recipe.id]
+    assert vectors.get_many(session, [recipe.id])[recipe.id] is first
+    assert vectors.shopping_list({recipe.id: first}, {recipe.id: 3}) == [{'name': 'oats', 'amount': 150, 'unit': 'g'}]
+
+    recipe.update({'ingredients': [{'name': 'oats', 'amount': 1, 'unit': 'kg'}]})
+    session.commit()
+    vectors.invalidate([recipe.id])
+    updated = vectors.get_many(session, [recipe.id])
+    assert vectors.shopping_list(updated, {recipe.id: 1}) == [{'name': 'oats', 'amount': 500, 'unit': 'g'}]
+    session.close()
+    engine.dispose()
@@ -1,19 +1,33 @@
 import pytest
+import json
+import uuid
 from app import create_app
 from app.database import init_db, get_db
 
 @pytest.fixture
-def app():
-    app = create_app()
-    app.config.update({
-        'TESTING': True,
-        'DATABASE': ':memory:'
-    })
+def app(tmp_path):
+    """An app on a throwaway database; the previous database and caches are restored afterwards."""
+    from app import database
+    from app.cache import local_cache
+    from app.compiled import recipe_vectors, shopping_lists
+    from config import Config
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    previous = database._database['primary'] or Config.DATABASE_URL, list(database._database['replicas'])
+    settings = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    settings.update(TESTING=True, DATABASE_URL=url, DATABASE_REPLICA_URLS=[], DATABASE_CHECK_SCHEMA=False)
+    app = create_app(settings)
+    caches = (local_cache.clear, recipe_vectors.invalidate, shopping_lists.invalidate, database.invalidate_category_cache)
+    for clear in caches:
+        clear()
     
     with app.app_context():
         init_db()
     
     yield app
+    for clear in caches:
+        clear()
+    database.configure_database(*previous)
+    database._engines.pop(url).dispose()
 
 @pytest.fixture
 def client(app):
@@ -39,4 +53,631 @@ def test_add_recipe(client):
 def test_get_recipes(client):
     response = client.get('/recipes')
     assert response.status_code == 200
-    assert isinstance(response.json, list)
\ No newline at end of file
+    assert isinstance(response.json, list)
+
+@pytest.fixture
+def csrf_headers(app):
+    from app.security import generate_csrf_token
+    with app.app_context():
+        return {'X-CSRF-Token': generate_csrf_token()}
+
+def add_recipe(client, csrf_headers, name, categories, ingredients=None, servings=4):
+    response = client.post('/recipes', headers=csrf_headers, json={
+        'name': name,
+        'servings': servings,
+        'ingredients': ingredients or [{'name': 'rice', 'amount': 100, 'unit': 'g'}],
+        'categories': categories
+    })
+    assert response.status_code == 200
+    return response.json['recipe_id']
+
+@pytest.mark.parametrize('categories', [[['x']], [None], [1], ['']])
+def test_invalid_category_items_are_rejected(client, csrf_headers, categories):
+    response = client.post('/recipes', headers=csrf_headers, json={
+        'name': 'Bad categories',
+        'servings': 2,
+        'ingredients': [{'name': 'rice', 'amount': 100, 'unit': 'g'}],
+        'categories': categories
+    })
+    assert response.status_code == 400
+    assert response.json['errors'] == ['Category 1 must be a non-empty string']
+    assert client.get('/categories').json == []
+
+def test_category_filters_are_exact(client, csrf_headers):
+    tag = uuid.uuid4().hex[:8]
+    asian = f'Asian-{tag}'
+    fusion = f'Asian-{tag}-Fusion'
+    quick = f'Quick-{tag}'
+    both = add_recipe(client, csrf_headers, 'Both', [asian, quick])
+    only_asian = add_recipe(client, csrf_headers, 'Asian only', [asian, asian])
+    only_fusion = add_recipe(client, csrf_headers, 'Fusion', [fusion])
+
+    response = client.get('/recipes', query_string={'category': asian})
+    assert {r['id'] for r in response.json} == {both, only_asian}
+
+    response = client.get('/recipes', query_string={'category': [asian, quick], 'filter_type': 'AND'})
+    assert {r['id'] for r in response.json} == {both}
+
+    response = client.get('/recipes', query_string={'category': [quick, fusion]})
+    assert {r['id'] for r in response.json} == {both, only_fusion}
+
+def test_calculate_ingredients_merges_repeated_selections(client, csrf_headers):
+    recipe_id = add_recipe(client, csrf_headers, 'Rice bowl', [],
+                           ingredients=[{'name': 'rice', 'amount': 100, 'unit': 'g'}], servings=2)
+    response = client.post('/calculate-ingredients', headers=csrf_headers, json={
+        'recipes': [{'id': recipe_id, 'servings': 2}, {'id': recipe_id, 'servings': 4}]
+    })
+    assert response.status_code == 200
+    assert response.json == [{'name': 'rice', 'amount': 300, 'unit': 'g'}]
+
+def test_calculate_ingredients_reports_all_missing_ids(client, csrf_headers):
+    response = client.post('/calculate-ingredients', headers=csrf_headers, json={
+        'recipes': [{'id': 10 ** 9, 'servings': 1}, {'id': 10 ** 9 + 1, 'servings': 1}]
+    })
+    assert response.status_code == 404
+    assert response.json['missing_ids'] == [10 ** 9, 10 ** 9 + 1]
+
+def test_calculate_ingredients_sums_across_recipes(client, csrf_headers):
+    tag = uuid.uuid4().hex[:8]
+    first = add_recipe(client, csrf_headers, 'First', [], servings=2, ingredients=[
+        {'name': f'oats-{tag}', 'amount': 100, 'unit': 'g'},
+        {'name': f'milk-{tag}', 'amount': 200, 'unit': 'ml'}
+    ])
+    second = add_recipe(client, csrf_headers, 'Second', [], servings=1, ingredients=[
+        {'name': f'oats-{tag}', 'amount': 30, 'unit': 'g'}
+    ])
+    response = client.post('/calculate-ingredients', headers=csrf_headers, json={
+        'recipes': [{'id': first, 'servings': 1}, {'id': second, 'servings': 3}]
+    })
+    assert response.json == [
+        {'name': f'oats-{tag}', 'amount': 140, 'unit': 'g'},
+        {'name': f'milk-{tag}', 'amount': 100, 'unit': 'ml'}
+    ]
+
+    response = client.get('/recipes', query_string={'ingredient': f'milk-{tag}'})
+    assert [r['id'] for r in response.json] == [first]
+
+def test_calculate_ingredients_memoizes_results(app, client, csrf_headers):
+    from app.database import db_session
+    from app.models import Recipe
+    recipe_id = add_recipe(client, csrf_headers, 'Memo', [], servings=1,
+                           ingredients=[{'name': 'lentils', 'amount': 50, 'unit': 'g'}])
+    calculate = lambda selections: client.post('/calculate-ingredients', headers=csrf_headers,
+                                               json={'recipes': selections})
+
+    first = calculate([{'id': recipe_id, 'servings': 2}])
+    assert first.headers['X-Result-Cache'] == 'MISS'
+    repeat = calculate([{'id': recipe_id, 'servings': 1}, {'id': recipe_id, 'servings': 1}])
+    assert repeat.headers['X-Result-Cache'] == 'HIT'
+    assert repeat.headers['X-Result-Cache-Key'] == first.headers['X-Result-Cache-Key']
+    assert repeat.json == first.json == [{'name': 'lentils', 'amount': 100, 'unit': 'g'}]
+
+    with app.app_context():
+        with db_session() as session:
+            session.get(Recipe, recipe_id).update({'ingredients': [{'name': 'lentils', 'amount': 80, 'unit': 'g'}]})
+
+    updated = calculate([{'id': recipe_id, 'servings': 2}])
+    assert updated.headers['X-Result-Cache'] == 'MISS'
+    assert updated.json == [{'name': 'lentils', 'amount': 160, 'unit': 'g'}]
+    assert client.get('/cache/stats').json['results']['hits'] >= 1
+
+def test_calculate_ingredients_batch(client, csrf_headers):
+    tag = uuid.uuid4().hex[:8]
+    porridge = add_recipe(client, csrf_headers, 'Porridge', [], servings=1, ingredients=[
+        {'name': f'oats-{tag}', 'amount': 50, 'unit': 'g'},
+        {'name': f'milk-{tag}', 'amount': 200, 'unit': 'ml'}
+    ])
+    flapjack = add_recipe(client, csrf_headers, 'Flapjack', [], servings=4, ingredients=[
+        {'name': f'oats-{tag}', 'amount': 0.4, 'unit': 'kg'}
+    ])
+    batch = lambda body: client.post('/calculate-ingredients/batch', headers=csrf_headers, json=body)
+
+    response = batch({'total': True, 'plans': [
+        {'name': 'Monday', 'recipes': [{'id': porridge, 'servings': 2}]},
+        {'name': 'Tuesday', 'recipes': [{'id': flapjack, 'servings': 1}, {'id': porridge, 'servings': 1}]},
+        {'name': 'Empty', 'recipes': []}
+    ]})
+    assert response.status_code == 200
+    assert response.json['plans'] == [
+        {'name': 'Monday', 'ingredients': [
+            {'name': f'oats-{tag}', 'amount': 100, 'unit': 'g'},
+            {'name': f'milk-{tag}', 'amount': 400, 'unit': 'ml'}
+        ]},
+        {'name': 'Tuesday', 'ingredients': [
+            {'name': f'oats-{tag}', 'amount': 150, 'unit': 'g'},
+            {'name': f'milk-{tag}', 'amount': 200, 'unit': 'ml'}
+        ]},
+        {'name': 'Empty', 'ingredients': []}
+    ]
+    assert response.json['total'] == [
+        {'name': f'oats-{tag}', 'amount': 250, 'unit': 'g'},
+        {'name': f'milk-{tag}', 'amount': 600, 'unit': 'ml'}
+    ]
+
+    single = client.post('/calculate-ingredients', headers=csrf_headers,
+                         json={'recipes': [{'id': porridge, 'servings': 2}]})
+    assert single.json == response.json['plans'][0]['ingredients']
+
+    response = batch({'plans': [{'name': 'Monday', 'recipes': [{'id': porridge, 'servings': 1}]}]})
+    assert 'total' not in response.json
+
+    response = batch({'plans': [{'name': 'Bad', 'recipes': [{'id': porridge, 'servings': -1}]}]})
+    assert response.status_code == 400
+    assert response.json['message'] == f'Plan Bad: Invalid servings for recipe {porridge}'
+    assert batch({'plans': [{'name': 'A', 'recipes': []}, {'name': 'A', 'recipes': []}]}).status_code == 400
+    assert batch({'plans': []}).status_code == 400
+    assert batch([{'name': 'A', 'recipes': []}]).status_code == 400
+    assert batch('plans').status_code == 400
+
+    response = batch({'plans': [{'name': 'Missing', 'recipes': [{'id': 10 ** 9, 'servings': 1}]}]})
+    assert response.status_code == 404
+    assert response.json['missing_ids'] == [10 ** 9]
+
+def test_categories_track_recipe_counts(app, client, csrf_headers):
+    from app.database import db_session
+    from app.models import Recipe
+    tag = uuid.uuid4().hex[:8]
+    old, new = f'Old-{tag}', f'New-{tag}'
+    recipe_id = add_recipe(client, csrf_headers, 'Moving', [old])
+    assert old in client.get('/categories').json
+
+    with app.app_context():
+        with db_session() as session:
+            session.get(Recipe, recipe_id).update({'categories': [new]})
+
+    categories = client.get('/categories').json
+    assert new in categories
+    assert old not in categories
+
+def test_cache_key_covers_full_query_string(app):
+    from app.cache import make_cache_key
+    with app.test_request_context('/recipes?category=A&category=B&filter_type=AND'):
+        key = make_cache_key('get_recipes')
+    with app.test_request_context('/recipes?filter_type=AND&category=B&category=A'):
+        assert make_cache_key('get_recipes') == key
+    with app.test_request_context('/recipes?category=A'):
+        assert make_cache_key('get_recipes') != key
+
+def test_local_cache_tier_serves_repeat_requests(client):
+    client.get('/categories', query_string={'tier': 'local'})
+    response = client.get('/categories', query_string={'tier': 'local'})
+    assert response.headers['X-Cache'] == 'HIT'
+    assert response.headers['X-Cache-Tier'] == 'local'
+    assert client.get('/cache/stats').json['local']['hits'] >= 1
+
+def test_failed_reads_are_not_cached_and_release_the_redis_lock(client, monkeypatch):
+    from app import cache, routes
+
+    class FakeRedis:
+        def __init__(self):
+            self.values = {}
+
+        def mget(self, *keys):
+            return [self.values.get(key) for key in keys]
+
+        def set(self, key, value, nx=False, px=None):
+            if nx and key in self.values:
+                return False
+            self.values[key] = value
+            return True
+
+        def setex(self, key, ttl, value):
+            self.values[key] = value
+
+        def delete(self, key):
+            self.values.pop(key, None)
+
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, 'get_redis', lambda: redis)
+    cache.redis_breaker.record_success()
+
+    def broken_query(*args, **kwargs):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(routes, 'recipe_page_query', broken_query)
+    response = client.get('/recipes', query_string={'transient': 1})
+    assert response.status_code == 500
+    assert redis.values == {}
+
+    monkeypatch.undo()
+    response = client.get('/recipes', query_string={'transient': 1})
+    assert response.status_code == 200 and response.headers['X-Cache'] == 'MISS'
+
+def test_category_writes_on_another_worker_reach_the_response_cache(client, monkeypatch):
+    from sqlalchemy.orm import sessionmaker
+    from app import cache, database
+    from app.models import Recipe
+
+    class FakeRedis:
+        def __init__(self):
+            self.values = {}
+
+        def mget(self, *keys):
+            return [self.values.get(key) for key in keys]
+
+        def set(self, key, value, nx=False, px=None):
+            if nx and key in self.values:
+                return False
+            self.values[key] = value
+            return True
+
+        def setex(self, key, ttl, value):
+            self.values[key] = value
+
+        def delete(self, key):
+            self.values.pop(key, None)
+
+        def incr(self, key):
+            self.values[key] = str(int(self.values.get(key, 0)) + 1)
+
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, 'get_redis', lambda: redis)
+    cache.redis_breaker.record_success()
+    # This worker lists categories, warming its in-process category list
+    assert client.get('/categories').json == []
+
+    # Another worker adds a recipe: its own session, so only the shared
+    # generation in Redis tells this worker about the write
+    with sessionmaker(bind=database.get_engine())() as other_worker:
+        other_worker.add(Recipe.from_dict({
+            'name': 'Pho', 'servings': 2, 'categories': ['Soup'],
+            'ingredients': [{'name': 'noodles', 'amount': 200, 'unit': 'g'}]
+        }))
+        other_worker.commit()
+    redis.incr(cache.GENERATION_KEY)
+    cache.local_cache.clear()  # this worker's local tier expires within CACHE_LOCAL_TTL
+
+    response = client.get('/categories')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.json == ['Soup']
+    entry = json.loads(redis.values[cache.cache_key('get_categories', '/categories', [])])
+    assert json.loads(entry['body']) == ['Soup']
+
+def test_local_cache_evicts_least_recently_used():
+    from app.cache import LocalCache
+    local = LocalCache(max_entries=2, ttl=60)
+    local.set('a', 1)
+    local.set('b', 2)
+    local.get('a')
+    local.set('c', 3)
+    assert local.get('b') is None
+    assert local.get('a') == 1 and local.get('c') == 3
+
+def test_circuit_breaker_opens_after_repeated_failures():
+    from app.cache import CircuitBreaker
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+
+def test_get_recipes_pages_with_keyset_cursor(client, csrf_headers):
+    tag = f'Paged-{uuid.uuid4().hex[:8]}'
+    ids = [add_recipe(client, csrf_headers, f'Paged {i}', [tag]) for i in range(3)]
+
+    first = client.get('/recipes', query_string={'category': tag, 'limit': 2})
+    assert [r['id'] for r in first.json] == ids[:2]
+    cursor = first.headers['X-Next-Cursor']
+
+    second = client.get('/recipes', query_string={'category': tag, 'limit': 2, 'after': cursor})
+    assert [r['id'] for r in second.json] == ids[2:]
+    assert 'X-Next-Cursor' not in second.headers
+
+def test_get_recipes_projects_fields(client, csrf_headers):
+    tag = f'Fields-{uuid.uuid4().hex[:8]}'
+    add_recipe(client, csrf_headers, 'Projected', [tag])
+    response = client.get('/recipes', query_string={'category': tag, 'fields': 'name,servings'})
+    assert response.json == [{'id': response.json[0]['id'], 'name': 'Projected', 'servings': 4}]
+
+    response = client.get('/recipes', query_string={'fields': 'name,secret'})
+    assert response.status_code == 400
+
+def test_search_ranks_prefix_matches_and_tracks_writes(app, client, csrf_headers):
+    from app.database import db_session
+    from app.models import Recipe
+    tag = uuid.uuid4().hex[:8]
+    by_name = add_recipe(client, csrf_headers, f'Zest{tag} Cake', ['Baking'])
+    by_ingredient = add_recipe(client, csrf_headers, 'Plain Cake', [f'Zest{tag}'],
+                               ingredients=[{'name': f'zest{tag} of lemon', 'amount': 1, 'unit': 'whole'}])
+
+    response = client.get('/recipes/search', query_string={'q': f'zest{tag[:4]}', 'fields': 'name'})
+    assert response.status_code == 200
+    assert [r['id'] for r in response.json] == [by_name, by_ingredient]
+    assert response.json[0] == {'id': by_name, 'name': f'Zest{tag} Cake'}
+    assert client.get('/recipes/search', query_string={'q': f'zest{tag} lemon'}).json[0]['id'] == by_ingredient
+    assert client.get('/recipes/search', query_string={'q': '" OR *'}).json == []
+
+    with app.app_context():
+        with db_session() as session:
+            session.get(Recipe, by_name).update({'name': 'Renamed Cake'})
+            session.delete(session.get(Recipe, by_ingredient))
+    assert client.get('/recipes/search', query_string={'q': f'zest{tag}'}).json == []
+
+def test_export_streams_ndjson_and_json(client, csrf_headers):
+    recipe_id = add_recipe(client, csrf_headers, 'Exported', [])
+
+    response = client.get('/recipes/export', query_string={'fields': 'name'})
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert {'id': recipe_id, 'name': 'Exported'} in rows
+
+    response = client.get('/recipes/export', query_string={'format': 'json'})
+    assert recipe_id in [recipe['id'] for recipe in response.json]
+
+def test_bulk_import_reports_row_errors(client, csrf_headers):
+    tag = f'Imported-{uuid.uuid4().hex[:8]}'
+    good = {'name': 'Imported', 'servings': 2, 'categories': [tag],
+            'ingredients': [{'name': 'beans', 'amount': 1, 'unit': 'can'}]}
+    body = '\n'.join([json.dumps(good), '{not json', json.dumps({**good, 'servings': 0}), json.dumps(good)])
+    response = client.post('/recipes/import', headers=csrf_headers,
+                           data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert response.json['status'] == 'partial'
+    assert response.json['imported'] == 2
+    assert [error['row'] for error in response.json['errors']] == [2, 3]
+    assert len(client.get('/recipes', query_string={'category': tag}).json) == 2
+
+def test_import_recipes_cli(app, tmp_path):
+    tag = f'Cli-{uuid.uuid4().hex[:8]}'
+    path = tmp_path / 'recipes.ndjson'
+    path.write_text(json.dumps({'name': 'From CLI', 'servings': 1, 'categories': [tag],
+                                'ingredients': [{'name': 'salt', 'amount': 1, 'unit': 'g'}]}) + '\n')
+    result = app.test_cli_runner().invoke(args=['import-recipes', str(path)])
+    assert 'Imported 1 recipes, 0 failed' in result.output
+
+def test_sqlite_engine_applies_pragmas(tmp_path):
+    from sqlalchemy import text
+    from app.database import create_db_engine
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+    with engine.connect() as connection:
+        assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert connection.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+        assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 5000
+    engine.dispose()
+
+def wait_for_job(client, job_id, timeout=30):
+    import time
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f'/jobs/{job_id}').json
+        if job['status'] in ('done', 'failed') or time.monotonic() > deadline:
+            return job
+        time.sleep(0.1)
+
+def test_calculation_jobs_are_deduplicated_and_stored(client, csrf_headers):
+    from app.jobs import job_worker
+    first = add_recipe(client, csrf_headers, 'Job A', [], [{'name': 'oats', 'amount': 500, 'unit': 'g'}], servings=1)
+    second = add_recipe(client, csrf_headers, 'Job B', [], [{'name': 'Oats', 'amount': 1, 'unit': 'kg'}], servings=2)
+    plan = {'recipes': [{'id': first, 'servings': 300}, {'id': second, 'servings': 40}]}
+
+    # Force several pool tasks for this small plan
+    chunk_size, job_worker.chunk_size = job_worker.chunk_size, 1
+    try:
+        response = client.post('/jobs/calculate', headers=csrf_headers, json=plan)
+        assert response.status_code == 202
+        assert response.json['deduplicated'] is False
+        job_id = response.json['job_id']
+        job = wait_for_job(client, job_id)
+    finally:
+        job_worker.chunk_size = chunk_size
+    assert job['status'] == 'done'
+    assert job['result'] == client.post('/calculate-ingredients', headers=csrf_headers, json=plan).json
+    assert job['result'] == [{'name': 'oats', 'amount': 170, 'unit': 'kg'}]
+
+    plan['recipes'].reverse()
+    response = client.post('/jobs/calculate', headers=csrf_headers, json=plan)
+    assert response.status_code == 200
+    assert response.json['job_id'] == job_id
+    assert response.json['deduplicated'] is True
+
+    response = client.get(f'/jobs/{job_id}/events')
+    events = response.get_data(as_text=True)
+    response.close()
+    assert events.startswith('event: done\nid: done:1.0\n')
+    assert client.get(f'/jobs/{job_id}/events', headers={'Last-Event-ID': 'done:1.0'}).status_code == 204
+
+def test_job_event_streams_are_capped_per_worker(app, client, monkeypatch):
+    from app.database import db_session
+    from app.jobs import event_streams
+    from app.models import CalculationJob
+    with app.app_context(), db_session() as session:
+        job_id = uuid.uuid4().hex
+        session.add(CalculationJob(id=job_id, plan_hash=uuid.uuid4().hex, plan='[]', status=CalculationJob.DONE, progress=1.0, result='[]'))
+
+    monkeypatch.setattr(event_streams, 'open', app.config['JOBS_EVENTS_MAX_STREAMS'])
+    response = client.get(f'/jobs/{job_id}/events')
+    assert response.status_code == 503 and response.headers['Retry-After'] == '5'
+
+    monkeypatch.undo()
+    opened = event_streams.open
+    response = client.get(f'/jobs/{job_id}/events')
+    assert event_streams.open == opened + 1
+    assert response.get_data(as_text=True).startswith('event: done')
+    response.close()
+    assert event_streams.open == opened
+
+def test_stale_running_jobs_are_reclaimed_by_the_database_clock(app):
+    from datetime import datetime, timedelta
+    from app.database import db_session
+    from app.jobs import job_worker
+    from app.models import CalculationJob
+    stale, fresh = uuid.uuid4().hex, uuid.uuid4().hex
+    with app.app_context(), db_session() as session:
+        for job_id, age in ((stale, job_worker.stale_after + 60), (fresh, 0)):
+            session.add(CalculationJob(
+                id=job_id, plan_hash=uuid.uuid4().hex, plan='[]', status=CalculationJob.RUNNING,
+                updated_at=datetime.utcnow() - timedelta(seconds=age)
+            ))
+        session.flush()
+        claimable = {
+            job_id for (job_id,) in session.query(CalculationJob.id)
+            .filter(CalculationJob.id.in_([stale, fresh]), job_worker._claimable(session.get_bind().dialect.name))
+        }
+        session.rollback()
+    assert claimable == {stale}
+
+def test_finished_jobs_are_purged_after_retention(app):
+    from datetime import datetime, timedelta
+    from app.database import db_session
+    from app.jobs import job_worker
+    from app.models import CalculationJob
+    expired, recent, queued = uuid.uuid4().hex, uuid.uuid4().hex, uuid.uuid4().hex
+    with app.app_context():
+        with db_session() as session:
+            for job_id, status, age in (
+                (expired, CalculationJob.DONE, job_worker.retention + 60),
+                (recent, CalculationJob.FAILED, 0),
+                (queued, CalculationJob.QUEUED, job_worker.retention + 60)
+            ):
+                session.add(CalculationJob(
+                    id=job_id, plan_hash=uuid.uuid4().hex, plan='[]', status=status,
+                    updated_at=datetime.utcnow() - timedelta(seconds=age)
+                ))
+            session.commit()
+
+        assert job_worker.purge_finished() == 1
+        # A job that vanished after being claimed is skipped, not crashed on
+        job_worker._run(expired)
+        with db_session() as session:
+            assert {job_id for (job_id,) in session.query(CalculationJob.id)} == {recent, queued}
+
+def test_calculation_job_validation(client, csrf_headers):
+    response = client.post('/jobs/calculate', headers=csrf_headers, json={'recipes': [{'id': 'x', 'servings': 1}]})
+    assert response.status_code == 400
+    response = client.post('/jobs/calculate', headers=csrf_headers, json={'recipes': [{'id': 10 ** 9, 'servings': 1}]})
+    assert response.status_code == 404
+    assert client.get('/jobs/unknown').status_code == 404
+    for path in ('/jobs/calculate', '/calculate-ingredients'):
+        for body in ([{'id': 1, 'servings': 1}], 'recipes'):
+            response = client.post(path, headers=csrf_headers, json=body)
+            assert response.status_code == 400
+            assert response.json['message'] == 'Invalid request format'
+
+def test_metrics_endpoint_reports_routes_queries_and_caches(client):
+    client.get('/recipes', query_string={'limit': 1, 'nonce': uuid.uuid4().hex})
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    body = response.get_data(as_text=True)
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/recipes",le="0.001"}' in body
+    assert 'http_requests_total{method="GET",route="/recipes",status="200"}' in body
+    assert 'http_request_db_queries_count{route="/recipes"}' in body
+    assert 'cache_requests_total{tier="local",result="miss"}' in body
+    assert 'result_cache_requests_total{result="hit"}' in body
+
+def test_slow_requests_log_query_breakdown(app, client, caplog):
+    import logging
+    app.config['SLOW_REQUEST_THRESHOLD_MS'] = 0
+    with caplog.at_level(logging.WARNING, logger='app.middleware'):
+        client.get('/recipes', query_string={'nonce': uuid.uuid4().hex})
+    assert any('Slow request: GET /recipes' in record.message and 'SELECT' in record.message
+               for record in caplog.records)
+
+def test_histogram_buckets_are_cumulative():
+    from app.metrics import Histogram
+    histogram = Histogram('test_seconds', 'Test.', buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, route='/x')
+    lines = list(histogram.collect())
+    assert 'test_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/x",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{route="/x"} 4' in lines
+
+def make_profiled_app(tmp_path, **config):
+    from flask import Flask
+    from app.profiling import init_profiling
+    profiled = Flask(__name__)
+    profiled.config.update(PROFILING_DIR=str(tmp_path), PROFILING_SECRET='profile-secret', **config)
+    init_profiling(profiled)
+
+    @profiled.route('/work/<int:n>')
+    def work(n):
+        import time
+        time.sleep(0.02)
+        return str(sum(range(n)))
+    return profiled
+
+def test_profiling_is_off_unless_enabled(tmp_path):
+    profiled = make_profiled_app(tmp_path)
+    assert not profiled.before_request_funcs
+    assert 'X-Profile-File' not in profiled.test_client().get('/work/10', headers={'X-Profile-Token': 'x'}).headers
+
+def test_profiling_requires_signed_token_and_writes_output(tmp_path):
+    import pstats
+    from app.profiling import make_profile_token
+    client = make_profiled_app(tmp_path, PROFILING_ENABLED=True).test_client()
+
+    assert 'X-Profile-File' not in client.get('/work/10', headers={'X-Profile-Token': '9999999999.bad'}).headers
+    assert 'X-Profile-File' not in client.get('/work/10', query_string={
+        '_profile': make_profile_token('profile-secret', ttl=-1)
+    }).headers
+
+    token = make_profile_token('profile-secret')
+    response = client.get('/work/1000', headers={'X-Profile-Token': token})
+    assert response.data == b'499500'
+    name = response.headers['X-Profile-File']
+    assert '-GET-work-int-n-' in name and name.endswith('.prof')
+    assert any('work' in func[2] for func in pstats.Stats(str(tmp_path / name)).stats)
+
+    response = client.get('/work/1000', query_string={'_profile': token, '_profile_mode': 'sampling'})
+    collapsed = (tmp_path / response.headers['X-Profile-File']).read_text()
+    assert 'work (test_app.py' in collapsed
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in collapsed.splitlines())
+
+def test_recipe_json_matches_to_dict():
+    from datetime import datetime
+    from app.models import Recipe
+    from app.serialization import recipe_json, recipes_json
+    recipe = Recipe.from_dict({
+        'name': 'Crème "brûlée"',
+        'servings': 2,
+        'ingredients': [{'name': 'cream', 'amount': 0.5, 'unit': 'l'}],
+        'categories': ['Dessert', 'French']
+    })
+    recipe.id = 7
+    recipe.created_at = recipe.updated_at = datetime(2026, 1, 2, 3, 4, 5)
+    assert json.loads(recipe_json(recipe)) == {**recipe.to_dict(), 'categories': ['Dessert', 'French']}
+    assert json.loads(recipes_json([recipe], ['id', 'name'])) == [{'id': 7, 'name': 'Crème "brûlée"'}]
+
+    recipe.categories = 'not json'
+    assert json.loads(recipe_json(recipe, ['categories'])) == {'categories': []}
+
+def test_recipe_validation_is_shared_and_reports_every_error():
+    from app.models import Recipe
+    from app.validation import validate_recipe
+    data = {
+        'name': '',
+        'servings': 0,
+        'ingredients': [{'name': 'rice', 'amount': 100, 'unit': 'g'}, 'salt', {'name': 'oil', 'amount': -1}],
+        'categories': 'Dinner'
+    }
+    errors = [
+        'Recipe name is required',
+        'Servings must be a positive integer',
+        'Ingredient 2 is invalid',
+        'Ingredient 3 amount must be a positive number',
+        'Ingredient 3 unit is required',
+        'Categories must be a list'
+    ]
+    assert validate_recipe(data) == errors
+    assert validate_recipe(None) == ['Recipe must be a JSON object']
+    with pytest.raises(ValueError, match='; '.join(errors[:2])):
+        Recipe.from_dict(data)
+
+    recipe = Recipe.from_dict({'name': 'Rice', 'servings': 2, 'ingredients': data['ingredients'][:1]})
+    assert validate_recipe({'servings': 3}, partial=True) == []
+    assert validate_recipe({'servings': True}, partial=True) == ['Servings must be a positive integer']
+    with pytest.raises(ValueError, match='Servings must be a positive integer'):
+        recipe.update({'name': 'Renamed', 'servings': 'two'})
+    assert recipe.name == 'Rice'
+
+def test_sanitize_input_skips_bleach_for_plain_strings():
+    import bleach
+    from app.security import sanitize_input
+    values = ['plain "quoted" text\tand\nnewline', '<b>bold</b> & more', 'carriage\rreturn', 'bell\x07']
+    assert sanitize_input(values) == [bleach.clean(value) for value in values]
+    plain = 'tablespoon'
+    assert sanitize_input({'unit': plain})['unit'] is plain
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+pytest.importorskip('aiosqlite')
+
+from app import database
+from app.asgi import create_asgi_app
+from app.cache import local_cache
+from app.compiled import recipe_vectors, shopping_lists
+from app.models import Recipe
+from app.security import csrf_token
+from config import Config
+
+@pytest.fixture
+def database_url(tmp_path):
+    """A seeded throwaway database; the app's sessions are restored afterwards."""
+    url = f"sqlite:///{tmp_path / 'asgi.db'}"
+    previous = database._database['primary'] or Config.DATABASE_URL, list(database._database['replicas'])
+    engine = database.get_engine(url)
+    database.init_db(engine)
+    with sessionmaker(bind=engine)() as session:
+        for name, categories, amount in [('Stir fry', ['Asian'], 200), ('Curry', ['Indian'], 100), ('Pho', ['Asian'], 50)]:
+            session.add(Recipe.from_dict({
+                'name': name,
+                'servings': 2,
+                'ingredients': [{'name': 'rice', 'amount': amount, 'unit': 'g'}],
+                'categories': categories
+            }))
+        session.commit()
+    caches = (local_cache.clear, recipe_vectors.invalidate, shopping_lists.invalidate)
+    for clear in caches:
+        clear()
+    yield url
+    for clear in caches:
+        clear()
+    database.configure_database(*previous)
+    database._engines.pop(url).dispose()
+
+async def call(app, method, path, query_string=b'', body=b'', headers=()):
+    """Run one request through the ASGI app, returning status, headers and body."""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': query_string,
+        'headers': [(name.encode(), value.encode()) for name, value in headers], 'client': ('127.0.0.1', 5000)
+    }
+    await app(scope, receive, send)
+    return sent[0]['status'], {name.decode(): value.decode() for name, value in sent[0]['headers']}, sent[1]['body']
+
+def run(app, *requests):
+    async def main():
+        try:
+            return [await call(app, *request) for request in requests]
+        finally:
+            await app.close()
+    return asyncio.run(main())
+
+def test_async_reads_match_the_wsgi_app(database_url):
+    from app import create_app
+    settings = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    settings.update(DATABASE_URL=database_url, DATABASE_REPLICA_URLS=[], RATELIMIT_ENABLED=False)
+    client = create_app(settings).test_client()
+    csrf = {'X-CSRF-Token': csrf_token(Config.CSRF_SECRET_KEY)}
+    plan = json.dumps({'recipes': [{'id': 1, 'servings': 4}, {'id': 2, 'servings': 2}]})
+
+    wsgi = [
+        client.get('/recipes?category=Asian&limit=1'),
+        client.get('/categories'),
+        client.post('/calculate-ingredients', data=plan, headers=csrf, content_type='application/json')
+    ]
+    local_cache.clear()
+    asgi = run(
+        create_asgi_app(settings),
+        ('GET', '/recipes', b'category=Asian&limit=1'),
+        ('GET', '/categories'),
+        ('POST', '/calculate-ingredients', b'', plan.encode(), csrf.items())
+    )
+
+    for expected, (status, headers, body) in zip(wsgi, asgi):
+        assert status == expected.status_code
+        assert json.loads(body) == expected.json
+    assert asgi[0][1]['x-next-cursor'] == wsgi[0].headers['X-Next-Cursor'] == '1'
+    assert json.loads(asgi[1][2]) == ['Asian', 'Indian']
+    assert json.loads(asgi[2][2]) == [{'name': 'rice', 'amount': 500, 'unit': 'g'}]
+
+def test_async_recipes_are_cached_and_paged(database_url):
+    app = create_asgi_app({'DATABASE_URL': database_url, 'DATABASE_REPLICA_URLS': [], 'RATELIMIT_ENABLED': False})
+    first, second, unknown = run(
+        app,
+        ('GET', '/recipes', b'limit=2&fields=name'),
+        ('GET', '/recipes', b'limit=2&fields=name'),
+        ('GET', '/recipes', b'fields=nope')
+    )
+
+    assert json.loads(first[2]) == [{'id': 1, 'name': 'Stir fry'}, {'id': 2, 'name': 'Curry'}]
+    assert first[1]['link'] == '</recipes?fields=name&after=2&limit=2>; rel="next"'
+    assert (first[1]['x-cache'], second[1]['x-cache'], second[1]['x-cache-tier']) == ('MISS', 'HIT', 'local')
+    assert second[2] == first[2] and second[1]['etag'] == first[1]['etag']
+    assert unknown[0] == 400 and 'nope' in json.loads(unknown[2])['message']
+
+def test_async_calculation_requires_csrf_and_is_rate_limited(database_url):
+    app = create_asgi_app({
+        'DATABASE_URL': database_url,
+        'DATABASE_REPLICA_URLS': [],
+        'RATELIMIT_ENABLED': True,
+        'RATELIMIT_STORAGE_URI': 'local://',
+        'RATELIMIT_STRATEGY': 'token-bucket',
+        'RATELIMIT_STORAGE_OPTIONS': {}
+    })
+    csrf = [('X-CSRF-Token', csrf_token(Config.CSRF_SECRET_KEY))]
+    missing = json.dumps({'recipes': [{'id': 1, 'servings': 2}, {'id': 99, 'servings': 2}]}).encode()
+    responses = run(
+        app,
+        ('POST', '/calculate-ingredients', b'', missing),
+        ('POST', '/calculate-ingredients', b'', missing, [('X-CSRF-Token', 'forged')]),
+        ('POST', '/calculate-ingredients', b'', missing, csrf),
+        *[('GET', '/categories')] * 201
+    )
+
+    assert [status for status, _, _ in responses[:3]] == [403, 403, 404]
+    assert json.loads(responses[2][2])['missing_ids'] == [99]
+    statuses = [status for status, _, _ in responses[3:]]
+    assert statuses.count(200) == 200 and statuses[-1] == 429
+
+def test_concurrent_category_misses_do_not_block_the_loop(database_url):
+    import threading
+    from app.database import invalidate_category_cache
+    app = create_asgi_app({'DATABASE_URL': database_url, 'DATABASE_REPLICA_URLS': [], 'RATELIMIT_ENABLED': False})
+    invalidate_category_cache()
+    results = []
+
+    async def main():
+        try:
+            results.extend(await asyncio.gather(*(
+                call(app, 'GET', '/categories', f'v={i}'.encode()) for i in range(8)
+            )))
+        finally:
+            await app.close()
+
+    # A deadlocked loop never returns, so run it where the test can give up on it
+    worker = threading.Thread(target=asyncio.run, args=(main(),), daemon=True)
+    worker.start()
+    worker.join(10)
+    assert not worker.is_alive(), 'event loop blocked on concurrent category cache misses'
+    assert [status for status, _, _ in results] == [200] * 8
+    assert all(json.loads(body) == ['Asian', 'Indian'] for _, _, body in results)
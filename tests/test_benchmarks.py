@@ -0,0 +1,21 @@
+from benchmarks.catalog import generate_recipes
+from benchmarks.results import compare, percentiles
+from app.validation import validate_recipe
+
+def test_catalog_is_deterministic_and_valid():
+    recipes = list(generate_recipes(50, ingredients_per_recipe=5, categories=3))
+    assert recipes == list(generate_recipes(50, ingredients_per_recipe=5, categories=3))
+    assert all(not validate_recipe(recipe) for recipe in recipes)
+    assert all(len(recipe['ingredients']) == 5 for recipe in recipes)
+    assert {name for recipe in recipes for name in recipe['categories']} == {'Category 0', 'Category 1', 'Category 2'}
+
+def test_compare_flags_latency_and_throughput_regressions():
+    baseline = {'results': {'GET /recipes': {'p95_ms': 10.0, 'rps': 100.0, 'requests': 500}}}
+    current = {'results': {'GET /recipes': {'p95_ms': 12.0, 'rps': 95.0, 'requests': 400}}}
+    rows = {row['metric']: row for row in compare(baseline, current, threshold=0.1)}
+    assert set(rows) == {'p95_ms', 'rps'}
+    assert rows['p95_ms']['regression'] and rows['p95_ms']['change'] == 0.2
+    assert not rows['rps']['regression']
+
+def test_percentiles():
+    assert percentiles([float(i) for i in range(1, 101)]) == {'p50_ms': 50.5, 'p95_ms': 95.05, 'p99_ms': 99.01}
@@ -0,0 +1,148 @@
+import os
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
+from app.database import create_db_engine
+from app.models import Base, Recipe
+from app.compiled import RecipeVectorCache
+from app.routes import category_filter
+from app.search import search_recipe_ids
+
+# Set TEST_POSTGRES_URL (e.g. postgresql://postgres@localhost/meal_prep_test)
+# to also run these tests against a local PostgreSQL server.
+BACKENDS = ['sqlite']
+if os.getenv('TEST_POSTGRES_URL'):
+    BACKENDS.append('postgresql')
+
+@pytest.fixture(params=BACKENDS)
+def engine(request, tmp_path):
+    if request.param == 'sqlite':
+        url = f"sqlite:///{tmp_path / 'backend.db'}"
+    else:
+        url = os.environ['TEST_POSTGRES_URL']
+    engine = create_db_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+@pytest.fixture
+def session(engine):
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+def make_recipe(name, categories, ingredients, servings=2):
+    return Recipe.from_dict({
+        'name': name,
+        'servings': servings,
+        'ingredients': ingredients,
+        'categories': categories
+    })
+
+def test_category_filters_and_aggregation(session):
+    stir_fry = make_recipe('Stir fry', ['Asian', 'Quick'], [{'name': 'rice', 'amount': 200, 'unit': 'g'}])
+    curry = make_recipe('Curry', ['Asian-Fusion'], [{'name': 'rice', 'amount': 100, 'unit': 'g'}])
+    session.add_all([stir_fry, curry])
+    session.commit()
+
+    ids = lambda subquery: {r.id for r in session.query(Recipe).filter(Recipe.id.in_(subquery))}
+    assert ids(category_filter(['Asian'])) == {stir_fry.id}
+    assert ids(category_filter(['Asian', 'Quick'], 'AND')) == {stir_fry.id}
+    assert ids(category_filter(['Quick', 'Asian-Fusion'])) == {stir_fry.id, curry.id}
+
+    vectors = RecipeVectorCache(max_recipes=10)
+    servings = {stir_fry.id: 2, curry.id: 4}
+    shopping_list = vectors.shopping_list(vectors.get_many(session, servings), servings)
+    assert shopping_list == [{'name': 'rice', 'amount': 400, 'unit': 'g'}]
+
+def test_compiled_vectors_follow_edits_within_the_same_second(session):
+    recipe = make_recipe('Risotto', [], [{'name': 'rice', 'amount': 100, 'unit': 'g'}])
+    session.add(recipe)
+    session.commit()
+    other_worker = RecipeVectorCache(max_recipes=10)
+    servings = {recipe.id: 2}
+    assert other_worker.shopping_list(other_worker.get_many(session, servings), servings)[0]['amount'] == 100
+
+    # Edited without leaving the second, so updated_at alone cannot tell
+    recipe.update({'ingredients': [{'name': 'rice', 'amount': 900, 'unit': 'g'}]})
+    session.commit()
+    assert recipe.version == 2
+    assert other_worker.shopping_list(other_worker.get_many(session, servings), servings)[0]['amount'] == 900
+
+def test_search_matches_names_ingredients_and_categories(session):
+    stir_fry = make_recipe('Stir fry', ['Asian'], [{'name': 'Jasmine rice', 'amount': 200, 'unit': 'g'}])
+    curry = make_recipe('Curry', ['Indian'], [{'name': 'basmati rice', 'amount': 100, 'unit': 'g'}])
+    session.add_all([stir_fry, curry])
+    session.commit()
+
+    assert set(search_recipe_ids(session, 'rice', 10)) == {stir_fry.id, curry.id}
+    assert search_recipe_ids(session, 'jasm', 10) == [stir_fry.id]
+    assert search_recipe_ids(session, 'ind cur', 10) == [curry.id]
+    assert search_recipe_ids(session, 'rice', 1) in ([stir_fry.id], [curry.id])
+
+def test_search_ranks_all_matches_beyond_the_candidate_cap(session):
+    lasagne = make_recipe('Lasagne', ['Italian'], [{'name': 'pasta', 'amount': 250, 'unit': 'g'}])
+    session.add(lasagne)
+    session.add_all([
+        make_recipe(f'Bake {i}', ['Italian'], [{'name': 'lasagne sheets', 'amount': 100, 'unit': 'g'}])
+        for i in range(5)
+    ])
+    session.commit()
+
+    assert search_recipe_ids(session, 'lasagne', 1, candidates=3) == [lasagne.id]
+    # Only 1-2 letter prefixes are capped to the newest candidates
+    assert lasagne.id not in search_recipe_ids(session, 'la', 5, candidates=3)
+
+def test_json_text_columns_are_not_indexed(engine):
+    # Filters go through the normalized tables, so indexes on the JSON text would only slow writes
+    indexed = {column for index in inspect(engine).get_indexes('recipes') for column in index['column_names']}
+    assert not indexed & {'categories', 'ingredients'}
+
+@pytest.fixture
+def databases(tmp_path):
+    """Point the app's sessions at throwaway databases, restoring them afterwards."""
+    from app import database
+    uris = {name: f"sqlite:///{tmp_path / name}.db" for name in ('primary', 'replica')}
+    previous = database._database['primary'] or database.Config.DATABASE_URL, list(database._database['replicas'])
+    yield uris
+    database.configure_database(*previous)
+    for uri in uris.values():
+        engine = database._engines.pop(uri, None)
+        if engine is not None:
+            engine.dispose()
+
+def test_read_sessions_are_routed_to_replicas(databases):
+    from flask import Flask
+    from app import database
+    database.configure_database(databases['primary'], [databases['replica']])
+
+    with Flask(__name__).app_context():
+        with database.db_session(readonly=True) as session:
+            assert session.get_bind() is database.get_engine(databases['replica'])
+        with database.db_session() as session:
+            assert session.get_bind() is database.get_engine(databases['primary'])
+
+def test_schema_is_created_explicitly_and_checked_at_startup(databases, caplog):
+    from alembic.config import Config as AlembicConfig
+    from alembic.script import ScriptDirectory
+    from app import create_app
+    from app.database import get_engine, schema_revision
+    from app.models import SCHEMA_REVISION
+    from config import Config
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    alembic_config = AlembicConfig(os.path.join(root, 'alembic.ini'))
+    alembic_config.set_main_option('script_location', os.path.join(root, 'migrations'))
+    assert ScriptDirectory.from_config(alembic_config).get_current_head() == SCHEMA_REVISION
+
+    settings = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    app = create_app({**settings, 'DATABASE_URL': databases['primary'], 'DATABASE_REPLICA_URLS': []})
+    engine = get_engine(databases['primary'])
+    assert not inspect(engine).has_table('recipes')
+    assert 'flask init-db' in caplog.text
+
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert 'Initialized the database' in result.output
+    assert inspect(engine).has_table('recipes') and schema_revision(engine) == SCHEMA_REVISION
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert f'already initialized at revision {SCHEMA_REVISION}' in result.output
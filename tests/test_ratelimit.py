@@ -0,0 +1,100 @@
+import pytest
+from flask import Flask
+from flask_limiter.util import get_remote_address
+from limits import parse
+from limits.strategies import STRATEGIES
+from app import ratelimit
+from app.ratelimit import LocalBucketStorage, TokenBucketLimiter, TokenBucketRateLimiter
+
+class FakeRedis:
+    """Just enough of a Redis pipeline to reconcile two storages in one process."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.commands = []
+
+    def pipeline(self, transaction=True):
+        self.commands = []
+        return self
+
+    def hincrbyfloat(self, key, field, amount):
+        self.commands.append(('hincrbyfloat', key, field.encode(), amount))
+
+    def expire(self, key, seconds):
+        self.commands.append(('expire', key))
+
+    def hgetall(self, key):
+        self.commands.append(('hgetall', key))
+
+    def execute(self):
+        replies = []
+        for command, key, *args in self.commands:
+            values = self.hashes.setdefault(key, {})
+            if command == 'hincrbyfloat':
+                field, amount = args
+                values[field] = values.get(field, 0.0) + amount
+                replies.append(values[field])
+            elif command == 'expire':
+                replies.append(True)
+            else:
+                replies.append(dict(values))
+        return replies
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, 'time', lambda: now[0])
+    return now
+
+def test_token_bucket_allows_bursts_and_refills(clock):
+    limiter = TokenBucketRateLimiter(LocalBucketStorage('local://'))
+    limit = parse('10 per minute')
+
+    assert all(limiter.hit(limit, 'client') for _ in range(10))
+    assert not limiter.hit(limit, 'client')
+    assert limiter.hit(limit, 'other')
+    assert limiter.get_window_stats(limit, 'client').remaining == 0
+
+    clock[0] += 12  # two tokens at 10 per minute
+    assert limiter.test(limit, 'client')
+    assert limiter.hit(limit, 'client') and limiter.hit(limit, 'client')
+    assert not limiter.hit(limit, 'client')
+
+def test_token_bucket_reconciles_other_nodes(clock):
+    shared = FakeRedis()
+    first, second = LocalBucketStorage('local://'), LocalBucketStorage('local://')
+    for storage in (first, second):
+        storage.redis = shared
+        storage._sync_thread = object()  # sync by hand instead of in the background
+    limit = parse('10 per minute')
+
+    assert TokenBucketRateLimiter(second).hit(limit, 'client')
+    assert all(TokenBucketRateLimiter(first).hit(limit, 'client') for _ in range(6))
+    first.sync()
+    second.sync()
+    allowed = sum(TokenBucketRateLimiter(second).hit(limit, 'client') for _ in range(10))
+    assert allowed == 3
+
+def test_token_bucket_limits_locally_when_redis_is_down(clock):
+    storage = LocalBucketStorage('local+redis://localhost:1/0', socket_timeout=0.1)
+    storage._sync_thread = object()
+    limiter = TokenBucketRateLimiter(storage)
+    limit = parse('2 per minute')
+
+    assert limiter.hit(limit, 'client') and limiter.hit(limit, 'client')
+    storage.sync()
+    assert not limiter.hit(limit, 'client')
+
+def test_flask_limiter_uses_token_buckets():
+    app = Flask(__name__)
+    limiter = TokenBucketLimiter(get_remote_address, app=app, storage_uri='local://', strategy='token-bucket')
+
+    @app.route('/ping')
+    @limiter.limit('3 per minute')
+    def ping():
+        return 'pong'
+
+    client = app.test_client()
+    assert [client.get('/ping').status_code for _ in range(4)] == [200, 200, 200, 429]
+    # limits' own strategy registry is left alone
+    assert 'token-bucket' not in STRATEGIES